@@ -8,11 +8,15 @@ from scout.utils.storage.postgres_database import Base
 from scout.utils.storage.postgres_models import Chunk  # noqa: F401 Unused import needed for alembic build
 from scout.utils.storage.postgres_models import Criterion  # noqa: F401 Unused import needed for alembic build
 from scout.utils.storage.postgres_models import CriterionGate  # noqa: F401 Unused import needed for alembic build
+from scout.utils.storage.postgres_models import EvaluationEvent  # noqa: F401 Unused import needed for alembic build
+from scout.utils.storage.postgres_models import EvaluationJob  # noqa: F401 Unused import needed for alembic build
+from scout.utils.storage.postgres_models import EvaluationTask  # noqa: F401 Unused import needed for alembic build
 from scout.utils.storage.postgres_models import File  # noqa: F401 Unused import needed for alembic build
 from scout.utils.storage.postgres_models import Project  # noqa: F401 Unused import needed for alembic build
 from scout.utils.storage.postgres_models import project_criterions  # noqa: F401 Unused import needed for alembic build
 from scout.utils.storage.postgres_models import project_users  # noqa: F401 Unused import needed for alembic build
 from scout.utils.storage.postgres_models import Rating  # noqa: F401 Unused import needed for alembic build
+from scout.utils.storage.postgres_models import RateBudget  # noqa: F401 Unused import needed for alembic build
 from scout.utils.storage.postgres_models import Result  # noqa: F401 Unused import needed for alembic build
 from scout.utils.storage.postgres_models import result_chunks  # noqa: F401 Unused import needed for alembic build
 from scout.utils.storage.postgres_models import User  # noqa: F401 Unused import needed for alembic build
@@ -0,0 +1,27 @@
+"""add_evidence_fingerprint_to_result
+
+Revision ID: a1f3c9d2b7e4
+Revises: 0123b9ebc5a6
+Create Date: 2026-10-19 09:12:41.208431
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a1f3c9d2b7e4"
+down_revision: Union[str, None] = "0123b9ebc5a6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("result", sa.Column("evidence_fingerprint", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("result", "evidence_fingerprint")
@@ -0,0 +1,36 @@
+"""add_category_summary_table
+
+Revision ID: a3c7e9d1f052
+Revises: f1b8d3e6a279
+Create Date: 2026-10-20 14:37:51.228940
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a3c7e9d1f052"
+down_revision: Union[str, None] = "f1b8d3e6a279"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "category_summary",
+        sa.Column("project_id", sa.UUID(), nullable=False),
+        sa.Column("category", sa.String(), nullable=False),
+        sa.Column("input_hash", sa.String(), nullable=False),
+        sa.Column("summary", sa.Text(), nullable=False),
+        sa.Column("created_datetime", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.ForeignKeyConstraint(["project_id"], ["project.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("project_id", "category", "input_hash"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("category_summary")
@@ -0,0 +1,26 @@
+"""add_chunk_file_id_idx_index
+
+Revision ID: a4c7e2b19d53
+Revises: f3a8c1d94e62
+Create Date: 2026-10-19 17:03:11.204518
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a4c7e2b19d53"
+down_revision: Union[str, None] = "f3a8c1d94e62"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_chunk_file_id_idx", "chunk", ["file_id", "idx"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_chunk_file_id_idx", table_name="chunk")
@@ -0,0 +1,58 @@
+"""add_evaluation_job_table
+
+Revision ID: b7d2e8f41c90
+Revises: a1f3c9d2b7e4
+Create Date: 2026-10-19 10:03:17.552904
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b7d2e8f41c90"
+down_revision: Union[str, None] = "a1f3c9d2b7e4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+job_status_enum = postgresql.ENUM(
+    "QUEUED", "RUNNING", "COMPLETED", "FAILED", "CANCELLED", name="job_status_enum", create_type=False
+)
+
+
+def upgrade() -> None:
+    job_status_enum.create(op.get_bind(), checkfirst=True)
+    op.create_table(
+        "evaluation_job",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("status", job_status_enum, nullable=False, server_default="QUEUED"),
+        sa.Column("parameters", postgresql.JSONB(), nullable=True),
+        sa.Column("total_criteria", sa.Integer(), nullable=True),
+        sa.Column("processed_criteria", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("cancel_requested", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("worker_id", sa.String(), nullable=True),
+        sa.Column("heartbeat_datetime", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("started_datetime", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("finished_datetime", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created_datetime", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_datetime", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("project_id", sa.UUID(), nullable=False),
+        sa.Column("user_id", sa.UUID(), nullable=True),
+        sa.ForeignKeyConstraint(["project_id"], ["project.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    # Workers poll for the oldest claimable job
+    op.create_index("ix_evaluation_job_status_created", "evaluation_job", ["status", "created_datetime"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_evaluation_job_status_created", table_name="evaluation_job")
+    op.drop_table("evaluation_job")
+    job_status_enum.drop(op.get_bind(), checkfirst=True)
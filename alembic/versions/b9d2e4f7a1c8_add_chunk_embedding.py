@@ -0,0 +1,89 @@
+"""add_chunk_embedding
+
+Revision ID: b9d2e4f7a1c8
+Revises: a4c7e2b19d53
+Create Date: 2026-10-19 17:48:02.913377
+
+Adds a pgvector embedding column to chunk with an HNSW index. Set SCOUT_CHROMA_BACKFILL_DIR to a
+persisted Chroma directory to copy its embeddings onto the matching chunk rows, by chunk ID.
+
+From this revision on, Postgres needs the pgvector extension whichever vector store is used, as the chunk
+and file tables have vector columns.
+
+"""
+
+import logging
+import os
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b9d2e4f7a1c8"
+down_revision: Union[str, None] = "a4c7e2b19d53"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIMENSION = int(os.getenv("SCOUT_EMBEDDING_DIMENSION", "1024"))
+HNSW_M = int(os.getenv("SCOUT_HNSW_M", "16"))
+HNSW_CONSTRUCTION_EF = int(os.getenv("SCOUT_HNSW_CONSTRUCTION_EF", "200"))
+BACKFILL_BATCH_SIZE = 1000
+
+
+def upgrade() -> None:
+    available = op.get_bind().execute(sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'vector'"))
+    if available.scalar() is None:
+        raise RuntimeError(
+            "Scout needs the pgvector extension installed on Postgres, e.g. with the pgvector/pgvector image "
+            "the docker-compose db service uses"
+        )
+    op.execute("CREATE EXTENSION IF NOT EXISTS vector")
+    op.execute(f"ALTER TABLE chunk ADD COLUMN embedding vector({EMBEDDING_DIMENSION})")
+    backfill_from_chroma(os.getenv("SCOUT_CHROMA_BACKFILL_DIR"))
+    # Built after the backfill, which is faster than updating the index row by row
+    op.execute(
+        "CREATE INDEX ix_chunk_embedding_hnsw ON chunk USING hnsw (embedding vector_cosine_ops) "
+        f"WITH (m = {HNSW_M}, ef_construction = {HNSW_CONSTRUCTION_EF})"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_chunk_embedding_hnsw", table_name="chunk")
+    op.drop_column("chunk", "embedding")
+
+
+def backfill_from_chroma(persist_directory: Union[str, None]) -> None:
+    if not persist_directory:
+        return
+    import chromadb
+
+    connection = op.get_bind()
+    statement = sa.text(
+        "UPDATE chunk SET embedding = CAST(:embedding AS vector) WHERE id = CAST(:id AS uuid) AND embedding IS NULL"
+    )
+    client = chromadb.PersistentClient(path=persist_directory)
+    for collection in client.list_collections():
+        # chromadb 0.5 lists collections, later versions list their names
+        collection = client.get_collection(getattr(collection, "name", collection))
+        copied = 0
+        offset = 0
+        while True:
+            batch = collection.get(include=["embeddings"], limit=BACKFILL_BATCH_SIZE, offset=offset)
+            if not batch["ids"]:
+                break
+            offset += len(batch["ids"])
+            rows = [
+                {"id": chunk_id, "embedding": "[" + ",".join(str(float(value)) for value in embedding) + "]"}
+                for chunk_id, embedding in zip(batch["ids"], batch["embeddings"])
+                if len(embedding) == EMBEDDING_DIMENSION
+            ]
+            if len(rows) < len(batch["ids"]):
+                logger.warning(f"Skipping {len(batch['ids']) - len(rows)} embeddings of another dimension")
+            if rows:
+                connection.execute(statement, rows)
+                copied += len(rows)
+        logger.info(f"Copied {copied} embeddings from Chroma collection {collection.name}")
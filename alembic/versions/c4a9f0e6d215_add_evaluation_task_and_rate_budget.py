@@ -0,0 +1,67 @@
+"""add_evaluation_task_and_rate_budget
+
+Revision ID: c4a9f0e6d215
+Revises: b7d2e8f41c90
+Create Date: 2026-10-19 11:26:04.913372
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c4a9f0e6d215"
+down_revision: Union[str, None] = "b7d2e8f41c90"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+job_status_enum = postgresql.ENUM(
+    "QUEUED", "RUNNING", "COMPLETED", "FAILED", "CANCELLED", name="job_status_enum", create_type=False
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "evaluation_task",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("kind", sa.String(), nullable=False, server_default="criterion"),
+        sa.Column("status", job_status_enum, nullable=False, server_default="QUEUED"),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("worker_id", sa.String(), nullable=True),
+        sa.Column("heartbeat_datetime", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("finished_datetime", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created_datetime", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_datetime", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("job_id", sa.UUID(), nullable=False),
+        sa.Column("project_id", sa.UUID(), nullable=False),
+        sa.Column("criterion_id", sa.UUID(), nullable=True),
+        sa.Column("result_id", sa.UUID(), nullable=True),
+        sa.ForeignKeyConstraint(["job_id"], ["evaluation_job.id"]),
+        sa.ForeignKeyConstraint(["project_id"], ["project.id"]),
+        sa.ForeignKeyConstraint(["criterion_id"], ["criterion.id"]),
+        sa.ForeignKeyConstraint(["result_id"], ["result.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    # Workers poll for the oldest claimable task; job completion checks count a job's tasks by status
+    op.create_index("ix_evaluation_task_status_created", "evaluation_task", ["status", "created_datetime"])
+    op.create_index("ix_evaluation_task_job_status", "evaluation_task", ["job_id", "status"])
+
+    op.create_table(
+        "rate_budget",
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("tokens", sa.Float(), nullable=False),
+        sa.Column("updated_datetime", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint("name"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("rate_budget")
+    op.drop_index("ix_evaluation_task_job_status", table_name="evaluation_task")
+    op.drop_index("ix_evaluation_task_status_created", table_name="evaluation_task")
+    op.drop_table("evaluation_task")
@@ -0,0 +1,41 @@
+"""add_chunk_text_search
+
+Revision ID: d6e1f3a8b2c4
+Revises: b9d2e4f7a1c8
+Create Date: 2026-10-19 18:34:27.516204
+
+Adds a tsvector column to chunk, generated from its text, with a GIN index for lexical search.
+Existing rows are filled in as the column is added.
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d6e1f3a8b2c4"
+down_revision: Union[str, None] = "b9d2e4f7a1c8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "chunk",
+        sa.Column(
+            "text_search",
+            postgresql.TSVECTOR(),
+            sa.Computed("to_tsvector('english', text)", persisted=True),
+            nullable=True,
+        ),
+    )
+    op.create_index("ix_chunk_text_search", "chunk", ["text_search"], postgresql_using="gin")
+
+
+def downgrade() -> None:
+    op.drop_index("ix_chunk_text_search", table_name="chunk", postgresql_using="gin")
+    op.drop_column("chunk", "text_search")
@@ -0,0 +1,44 @@
+"""add_evaluation_event_table
+
+Revision ID: d82b6c3a5f17
+Revises: c4a9f0e6d215
+Create Date: 2026-10-19 13:41:52.170693
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d82b6c3a5f17"
+down_revision: Union[str, None] = "c4a9f0e6d215"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "evaluation_event",
+        sa.Column("id", sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column("stage", sa.String(), nullable=False),
+        sa.Column("message", sa.Text(), nullable=True),
+        sa.Column("created_datetime", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("job_id", sa.UUID(), nullable=False),
+        sa.Column("task_id", sa.UUID(), nullable=True),
+        sa.Column("criterion_id", sa.UUID(), nullable=True),
+        sa.Column("result_id", sa.UUID(), nullable=True),
+        sa.ForeignKeyConstraint(["job_id"], ["evaluation_job.id"]),
+        sa.ForeignKeyConstraint(["task_id"], ["evaluation_task.id"]),
+        sa.ForeignKeyConstraint(["criterion_id"], ["criterion.id"]),
+        sa.ForeignKeyConstraint(["result_id"], ["result.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_evaluation_event_job_id", "evaluation_event", ["job_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_evaluation_event_job_id", table_name="evaluation_event")
+    op.drop_table("evaluation_event")
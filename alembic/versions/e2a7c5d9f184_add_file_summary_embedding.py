@@ -0,0 +1,36 @@
+"""add_file_summary_embedding
+
+Revision ID: e2a7c5d9f184
+Revises: d6e1f3a8b2c4
+Create Date: 2026-10-19 19:02:45.380117
+
+Adds a pgvector column to file for the embedding of its summary. Existing files are embedded with
+`python -m scout.utils.storage.summary_index`.
+
+The column is added for every deployment, though it is only filled and searched when SCOUT_SUMMARY_FILE_K
+is above 0. Like the chunk embedding column of b9d2e4f7a1c8, it needs the pgvector extension.
+
+"""
+
+import os
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e2a7c5d9f184"
+down_revision: Union[str, None] = "d6e1f3a8b2c4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+EMBEDDING_DIMENSION = int(os.getenv("SCOUT_EMBEDDING_DIMENSION", "1024"))
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS vector")
+    op.execute(f"ALTER TABLE file ADD COLUMN summary_embedding vector({EMBEDDING_DIMENSION})")
+
+
+def downgrade() -> None:
+    op.drop_column("file", "summary_embedding")
@@ -0,0 +1,46 @@
+"""add_stage_stats_and_model_costs
+
+Revision ID: e5f1a7c39b28
+Revises: d82b6c3a5f17
+Create Date: 2026-10-19 15:02:27.418305
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e5f1a7c39b28"
+down_revision: Union[str, None] = "d82b6c3a5f17"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("evaluation_job", sa.Column("stage_stats", postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+    op.add_column("llm_model", sa.Column("input_cost_per_1k_tokens", sa.Float(), nullable=True))
+    op.add_column("llm_model", sa.Column("output_cost_per_1k_tokens", sa.Float(), nullable=True))
+
+    # On-demand Bedrock prices (USD per 1,000 tokens) of the default models
+    op.execute(
+        """
+        UPDATE llm_model SET input_cost_per_1k_tokens = prices.input_cost, output_cost_per_1k_tokens = prices.output_cost
+        FROM (VALUES
+            ('anthropic.claude-3-sonnet-20240229-v1:0', 0.003, 0.015),
+            ('anthropic.claude-3-haiku-20240307-v1:0', 0.00025, 0.00125),
+            ('meta.llama3-70b-instruct-v1:0', 0.00265, 0.0035),
+            ('mistral.mistral-large-2402-v1:0', 0.008, 0.024)
+        ) AS prices (model_id, input_cost, output_cost)
+        WHERE llm_model.model_id = prices.model_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("llm_model", "output_cost_per_1k_tokens")
+    op.drop_column("llm_model", "input_cost_per_1k_tokens")
+    op.drop_column("evaluation_job", "stage_stats")
@@ -0,0 +1,27 @@
+"""add_chunk_set_version_to_project
+
+Revision ID: f1b8d3e6a279
+Revises: e2a7c5d9f184
+Create Date: 2026-10-20 09:12:38.604115
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f1b8d3e6a279"
+down_revision: Union[str, None] = "e2a7c5d9f184"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("project", sa.Column("chunk_set_version", sa.Integer(), server_default="0", nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column("project", "chunk_set_version")
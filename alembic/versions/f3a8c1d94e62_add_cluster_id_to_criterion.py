@@ -0,0 +1,29 @@
+"""add_cluster_id_to_criterion
+
+Revision ID: f3a8c1d94e62
+Revises: e5f1a7c39b28
+Create Date: 2026-10-19 16:12:40.528113
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f3a8c1d94e62"
+down_revision: Union[str, None] = "e5f1a7c39b28"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("criterion", sa.Column("cluster_id", sa.Integer(), nullable=True))
+    op.create_index("ix_criterion_cluster_id", "criterion", ["cluster_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_criterion_cluster_id", table_name="criterion")
+    op.drop_column("criterion", "cluster_id")
@@ -1,37 +1,40 @@
+import asyncio
 import datetime
 import json
 import os
 import uuid
-from typing import List, Dict, Any, Optional
+from typing import List, Any, Optional, Tuple
 
 import boto3
-from botocore.client import Config
 from dotenv import load_dotenv
-from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Request
+from fastapi.responses import StreamingResponse
 
-from langchain_aws import ChatBedrock
 from langchain_community.retrievers import AmazonKnowledgeBasesRetriever
 from pydantic import BaseModel
 
 from backend.utils.custom_query_request import CustomQueryRequest
 from scout.DataIngest.models.schemas import (
-    ChunkCreate,
     Criterion,
     CriterionCreate,
-    CriterionFilter,
     CriterionGate,
-    FileCreate,
+    EvaluationEvent,
+    EvaluationJob,
+    EvaluationJobCreate,
+    JobStatus,
     ProjectCreate,
     ProjectFilter,
-    ResultCreate,
-    ProjectUpdate,
-    ResultFilter,
-    Project,
     User as PyUser
 )
 from scout.Pipelines.ingest_criteria import ingest_criteria_from_local_dir, ingest_criteria_from_s3
-from scout.LLMFlag.evaluation import MainEvaluator
 from scout.utils.llm_formats import format_llm_request
+from scout.utils.storage.postgres_interface_jobs import (
+    create_evaluation_job,
+    get_evaluation_events,
+    get_evaluation_job,
+    request_evaluation_job_cancellation,
+)
+from scout.utils.storage.postgres_database import SessionLocal
 from scout.utils.storage.postgres_storage_handler import PostgresStorageHandler
 from scout.utils.storage.postgres_models import Criterion as SqCriterion
 from scout.utils.utils import logger
@@ -89,222 +92,149 @@ class ProcessCriteriaRequest(BaseModel):
     criterion_id: Optional[uuid.UUID] = None
     model_id: str = os.getenv("AWS_BEDROCK_MODEL_ID")
     max_results: int = 5
+    # Re-run retrieval for every criterion and only re-evaluate those whose evidence has changed
+    incremental: bool = False
 
 @router.post("/process-criteria")
-async def process_criteria(
+def process_criteria(
     request_data: ProcessCriteriaRequest,
     current_user: PyUser = Depends(get_current_user),
     db: Any = Depends(get_db),
     storage_handler: PostgresStorageHandler = Depends(get_storage_handler)
 ):
     """
-    Process specific criteria or all unprocessed criteria for the user's current project
-    and store results in the database.
+    Queue processing of a specific criterion, or all unprocessed criteria, for the user's current project.
+    Returns a job ID at once; a worker (scout/Pipelines/evaluation_worker.py) evaluates the criteria
+    and stores the results in the database.
     """
     try:
         # Check if user has any projects
         if not current_user.projects:
             raise HTTPException(status_code=404, detail="User does not have any projects")
-            
+
         # Get the current project
         current_project = current_user.projects[0]
-        project_id = current_project.id
-        kb_id = current_project.knowledgebase_id
-        
-        if not kb_id:
-            raise HTTPException(status_code=400, detail="Project does not have a knowledgebase ID")
-        
-        # Initialize AWS session and clients
-        session = boto3.session.Session()
-        region = session.region_name
-
-        bedrock_config = Config(
-            connect_timeout=120, read_timeout=120, retries={'max_attempts': 0}
-        )
-        bedrock_client = boto3.client(
-            'bedrock-runtime', region_name=region, config=bedrock_config)
 
-        # Initialize LangChain components
-        llm = ChatBedrock(
-            model_id=request_data.model_id,
-            client=bedrock_client
-        )
+        if not current_project.knowledgebase_id:
+            raise HTTPException(status_code=400, detail="Project does not have a knowledgebase ID")
 
-        # Initialize the AmazonKnowledgeBasesRetriever
-        retriever = AmazonKnowledgeBasesRetriever(
-            knowledge_base_id=kb_id,
-            retrieval_config={
-                "vectorSearchConfiguration": {
-                    "numberOfResults": request_data.max_results,
-                    "overrideSearchType": "HYBRID",
-                }
-            },
-        )
-        
-        # Get the project from the database using the storage handler
-        project_filter = ProjectFilter(id=project_id)
-        project_list = storage_handler.get_item_by_attribute(project_filter)
-        
-        if not project_list:
-            raise HTTPException(status_code=404, detail="Project not found in database")
-            
-        project = project_list[0]
-        
-        # If a specific criterion ID is provided, only process that one
         if request_data.criterion_id:
-            filter = CriterionFilter(id=request_data.criterion_id)
-            criteria = storage_handler.get_item_by_attribute(filter)
-            if not criteria:
+            criterion = storage_handler.read_item(request_data.criterion_id, Criterion)
+            if criterion is None or current_project.id not in {project.id for project in criterion.projects}:
                 raise HTTPException(status_code=404, detail="Criterion not found")
-        else:
-            # Get criteria without results for the current project
-            criteria = get_criteria_without_results(project, storage_handler)
-            
-        if not criteria:
-            return {"message": "No criteria to process", "processed": 0}
-        
-        logger.info(f"Processing {len(criteria)} criteria for project {project.name}")
-        
-        # Create custom MainEvaluator that uses KB for retrieval
-        class KBMainEvaluator(MainEvaluator):
-            def semantic_search(self, query: str, k: int, filters: dict):
-                # Use LangChain retriever instead of custom KB implementation
-                logger.info(f"Query: {query}")
-                documents = retriever.get_relevant_documents(query)
-                logger.info(f"Number of relevant documents: {len(documents)}")
-
-                # Format into expected prompt structure
-                prompt = "Document extracts relevant to the query:\n\n"
-                formatted_docs = []
-
-                for i, doc in enumerate(documents):
-                    # Extract source_metadata dictionary
-                    source_metadata = doc.metadata.get('source_metadata', {})
-                    source_uri = source_metadata.get('x-amz-bedrock-kb-source-uri')
-
-                    # Parse the S3 URI
-                    bucket_name = source_uri.split('/')[2]
-                    object_key = '/'.join(source_uri.split('/')[3:])
-                    if not bucket_name or not object_key:
-                        logger.warning("S3 bucket or key not found in metadata")
-                        continue
-
-                    file_name = object_key.split("/")[-1]
-
-                    file_create = FileCreate(
-                        name=file_name,
-                        s3_key=object_key,
-                        type=os.path.splitext(file_name)[1],
-                        project_id=project.id,
-                        s3_bucket=os.environ["BUCKET_NAME"],
-                    )
-                    file = self.storage_handler.write_item(file_create)
-
-                    chunk = ChunkCreate(
-                        file=file,
-                        idx=0,
-                        text=object_key,
-                        page_num=0,
-                    )
 
-                    created_chunk = self.storage_handler.write_item(chunk)
-
-                    source = doc.metadata.get('source', 'Unknown')
-                    content = doc.page_content
-
-                    # Create document ID from source or use a default
-                    doc_id = source.split('/')[-1] if source else f"document_{i+1}"
-
-                    prompt += f"Document {i+1}: {doc_id}\n"
-                    prompt += f"Content: {content}\n\n"
-
-                    # Format documents for return value
-                    formatted_docs.append({
-                        'content': content,
-                        'metadata': {
-                            'uuid': created_chunk.id,
-                            'source': source,
-                            'document_id': doc_id,
-                            'score': doc.metadata.get('score', 0),
-                            'file_id': file.id
-                        }
-                    })
-
-                return prompt, formatted_docs
-
-            def get_llm_response(self, messages):
-                # Override to use the LangChain LLM
-                response = llm.invoke(messages)
-                return response.content
-
-        # Initialize evaluator
-        evaluator = KBMainEvaluator(
-            project=project,
-            vector_store=None,  # Not used with KB
-            llm=llm,
-            storage_handler=storage_handler
+        job = create_evaluation_job(
+            db,
+            EvaluationJobCreate(
+                project_id=current_project.id,
+                user_id=current_user.id,
+                parameters=request_data.model_dump(mode="json"),
+            ),
         )
-
-        # Evaluate criteria
-        results = evaluator.evaluate_questions(criteria=criteria, save=True)
-        logger.info(f"Evaluated {len(results)} criteria against Knowledge Base")
-
-        # Update the project summary if needed
-        if not request_data.criterion_id:  # Only update summary if processing all criteria
-            fresh_criteria = storage_handler.get_item_by_attribute(CriterionFilter(project_id=project.id))
-            fresh_results = storage_handler.get_item_by_attribute(ResultFilter(project=project.id))
-
-            criteria_results_pairs = [
-                (criterion.question, result.full_text)
-                for criterion in fresh_criteria
-                for result in fresh_results
-                if criterion.id == result.criterion.id
-            ]
-            
-            # Only generate summary if we have results
-            if criteria_results_pairs:
-                summary = evaluator.generate_summary(criteria_results_pairs)
-                
-                project_update = ProjectUpdate(
-                    id=project.id,
-                    name=project.name,
-                    results_summary=summary
-                )
-                storage_handler.update_item(project_update)
+        logger.info(f"Queued evaluation job {job.id} for project {current_project.name}")
 
         return {
-            "message": "Criteria processed successfully", 
-            "processed": len(results),
-            "project_id": str(project.id)
+            "message": "Criteria processing queued",
+            "job_id": str(job.id),
+            "status": job.status,
+            "project_id": str(current_project.id)
         }
-        
+
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.exception(f"Error processing criteria: {e}")
+        logger.exception(f"Error queuing criteria processing: {e}")
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
 
-def get_criteria_without_results(project: Project, storage_handler: PostgresStorageHandler) -> List[Criterion]:
+def get_user_job(job_id: uuid.UUID, current_user: PyUser, db: Any) -> EvaluationJob:
+    """Get a job, checking it belongs to one of the user's projects"""
+    job = get_evaluation_job(db, job_id)
+    if job is None or job.project_id not in {project.id for project in current_user.projects}:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/jobs/{job_id}", response_model=EvaluationJob)
+def get_job(
+    job_id: uuid.UUID,
+    current_user: PyUser = Depends(get_current_user),
+    db: Any = Depends(get_db),
+):
+    """Get the status and progress of an evaluation job."""
+    return get_user_job(job_id, current_user, db)
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=EvaluationJob)
+def cancel_job(
+    job_id: uuid.UUID,
+    current_user: PyUser = Depends(get_current_user),
+    db: Any = Depends(get_db),
+):
+    """Cancel an evaluation job. A running job stops after the criterion it is currently evaluating."""
+    get_user_job(job_id, current_user, db)
+    return request_evaluation_job_cancellation(db, job_id)
+
+
+JOB_EVENT_POLL_SECONDS = 1.0
+JOB_EVENT_KEEPALIVE_SECONDS = 15.0
+FINISHED_JOB_STATUSES = {JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED}
+
+
+def format_sse(event: str, data: str, event_id: Optional[int] = None) -> str:
+    """Format one Server-Sent Event"""
+    message = f"id: {event_id}\n" if event_id is not None else ""
+    return message + f"event: {event}\ndata: {data}\n\n"
+
+
+def read_job_events(job_id: uuid.UUID, after_id: int) -> Tuple[EvaluationJob, List[EvaluationEvent]]:
+    with SessionLocal() as db:
+        return get_evaluation_job(db, job_id), get_evaluation_events(db, job_id, after_id=after_id)
+
+
+@router.get("/jobs/{job_id}/events")
+def stream_job_events(
+    job_id: uuid.UUID,
+    request: Request,
+    current_user: PyUser = Depends(get_current_user),
+    last_event_id: Optional[int] = Header(None),
+):
     """
-    Get criteria that don't have associated results for the given project.
+    Stream a job's per-criterion progress as Server-Sent Events: started, retrieval_done, llm_done,
+    saved (with the result ID), unchanged and error. A final `job` event carries the job's status once
+    it has finished. Reconnecting clients resume from the Last-Event-ID header.
     """
-    # Get all criteria for the project
-    filter = CriterionFilter(project_id=project.id)
-    all_criteria = storage_handler.get_item_by_attribute(filter)
-    
-    # Get all results for the project
-    results_filter = ResultFilter(project=project.id)
-    existing_results = storage_handler.get_item_by_attribute(results_filter)
-    
-    # Get set of criterion IDs that have results
-    criterion_ids_with_results = {result.criterion.id for result in existing_results}
-    
-    # Filter criteria to only those without results
-    criteria_without_results = [
-        criterion for criterion in all_criteria 
-        if criterion.id not in criterion_ids_with_results
-    ]
-    
-    return criteria_without_results
+    # Each poll opens its own short-lived session, so a long stream holds no connection between polls
+    with SessionLocal() as db:
+        get_user_job(job_id, current_user, db)
+
+    async def event_stream():
+        after_id = last_event_id or 0
+        idle_seconds = 0.0
+        while not await request.is_disconnected():
+            job, events = await run_in_threadpool(read_job_events, job_id, after_id)
+            for event in events:
+                after_id = event.id
+                yield format_sse(event.stage, event.model_dump_json(), event_id=event.id)
+
+            if not events and job.status in FINISHED_JOB_STATUSES:
+                yield format_sse("job", job.model_dump_json())
+                return
+
+            if events:
+                idle_seconds = 0.0
+            elif idle_seconds >= JOB_EVENT_KEEPALIVE_SECONDS:
+                # Comment lines keep proxies from closing an idle connection
+                yield ": keep-alive\n\n"
+                idle_seconds = 0.0
+            await asyncio.sleep(JOB_EVENT_POLL_SECONDS)
+            idle_seconds += JOB_EVENT_POLL_SECONDS
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 class CreateProjectRequest(BaseModel):
@@ -69,6 +69,7 @@ from starlette.concurrency import run_in_threadpool
 
 import asyncio
 from backend.utils.audit import log_llm_query, log_file_operation
+from scout.LLMFlag.cache import retrieval_cache
 
 from scout.DataIngest.models.schemas import FileCreate
 from scout.utils.storage.postgres_models import Criterion as SqCriterion
@@ -746,6 +747,8 @@ async def upload_files(
                 project_id=current_user.projects[0].id if current_user.projects else None
             )
             interface.get_or_create_item(file_create)
+            if file_create.project_id:
+                retrieval_cache.invalidate_project(file_create.project_id)
             
             uploaded.append(file.filename)
             
@@ -811,6 +814,8 @@ async def delete_file(
         if file_to_delete:
             db.delete(file_to_delete)
             db.commit()
+            if file_to_delete.project_id:
+                retrieval_cache.invalidate_project(file_to_delete.project_id)
             
         # Log the file deletion
         if request:
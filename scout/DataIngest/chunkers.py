@@ -11,6 +11,7 @@ from unstructured.documents.elements import Text
 
 from scout.DataIngest.anonymizer import Anonymizer
 from scout.DataIngest.models.schemas import ChunkCreate, File
+from scout.LLMFlag.cache import retrieval_cache
 from scout.utils.utils import logger
 
 import fitz  # PyMuPDF
@@ -141,12 +142,15 @@ def add_chunks_to_vector_store(chunks: List[ChunkCreate], project_id, vector_sto
                     "uuid": str(chunk.id),
                     "project": str(project_id),
                     "parent_doc_uuid": str(chunk.file.id),
+                    "idx": chunk.idx,
                     "page_num": chunk.page_num,
                 }
                 for chunk in chunks[i : i + batch_size]
             ],
             ids=[str(chunk.id) for chunk in chunks[i : i + batch_size]],
         )
+    # The project's chunk set has changed so any cached retrievals are stale
+    retrieval_cache.invalidate_project(project_id)
 
 
 def chunk_file(file: File, temp_filepath: Path, chunking_strategy: str, anonymise=False) -> List[ChunkCreate]:
@@ -8,6 +8,7 @@ from pydantic.json import pydantic_encoder
 
 from scout.DataIngest.models.schemas import ChunkCreate, File, FileInfo, FileUpdate
 from scout.DataIngest.prompts import FILE_INFO_EXTRACTOR_SYSTEM_PROMPT
+from scout.utils.llm_formats import FILE_INFO_STAGE, format_messages_body, get_stage_model_id, parse_llm_response
 from scout.utils.storage.storage_handler import BaseStorageHandler
 
 from scout.utils.utils import logger
@@ -35,7 +36,7 @@ def get_llm_file_info(project_name: str, file_name: str, text: str) -> FileInfo:
     
     # Extract structured metadata for file from natural language using Bedrock
     try:
-        # Create the messages for Claude/Anthropic model format
+        # Create the messages, the system prompt is placed as each model family expects
         messages = [
             {"role": "system", "content": sys_prompt},
             {"role": "user", "content": text}
@@ -55,19 +56,16 @@ def get_llm_file_info(project_name: str, file_name: str, text: str) -> FileInfo:
         # Add instruction for response format
         messages.append({"role": "user", "content": schema_instructions})
         
-        # Make the API call to Bedrock with Claude
+        # Make the API call to Bedrock with the file info model, which can be smaller than the evaluation model
+        model_id = get_stage_model_id(FILE_INFO_STAGE)
         response = bedrock_client.invoke_model(
-            modelId=os.getenv("AWS_BEDROCK_MODEL_ID"),
-            body=json.dumps({
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 1000,
-                "messages": messages
-            })
+            modelId=model_id,
+            body=json.dumps(format_messages_body(model_id, messages, max_tokens=1000))
         )
         
         # Parse the response
         response_body = json.loads(response["body"].read().decode())
-        output_content = response_body["content"][0]["text"]
+        output_content = parse_llm_response(model_id, response_body).text
         
         # Extract JSON from the response
         import re
@@ -9,6 +9,8 @@ class LLMModelBase(BaseModel):
     model_id: str
     description: Optional[str] = None
     is_default: bool = False
+    input_cost_per_1k_tokens: Optional[float] = None
+    output_cost_per_1k_tokens: Optional[float] = None
 
 
 class LLMModelCreate(LLMModelBase):
@@ -29,3 +31,5 @@ class LLMModelUpdate(BaseModel):
     model_id: Optional[str] = None
     description: Optional[str] = None
     is_default: Optional[bool] = None
+    input_cost_per_1k_tokens: Optional[float] = None
+    output_cost_per_1k_tokens: Optional[float] = None
@@ -113,6 +113,7 @@ class CriterionBase(BaseModel):
     category: str
     question: str
     evidence: str
+    cluster_id: Optional[int] = None
 
 
 class CriterionCreate(BaseModel):
@@ -207,6 +208,35 @@ class File(FileBase):
     chunks: Optional[list["ChunkBase"]] = Field(default_factory=list)
 
 
+class FileMetadata(BaseModel):
+    # Only the file fields needed to render document extracts into prompts
+    model_config = global_model_config
+
+    id: UUID
+    name: str
+    clean_name: Optional[str] = None
+    source: Optional[str] = None
+    summary: Optional[str] = None
+    published_date: Optional[str] = None
+
+
+class ChunkText(BaseModel):
+    # Only the chunk fields needed to widen an extract with its neighbours
+    model_config = global_model_config
+
+    id: UUID
+    file_id: UUID
+    idx: int
+    page_num: int
+    text: str
+
+
+class ChunkSearchResult(ChunkText):
+    # A chunk matched by full-text search, with its project and how well it matched
+    project_id: UUID
+    rank: float
+
+
 class ProjectBase(BaseModel):
     # Allows pydantic/sqlalchemy to use ORM to pull out related objects instead of just references to them
     model_config = global_model_config
@@ -260,11 +290,13 @@ class ResultBase(BaseModel):
     updated_datetime: Optional[datetime]
     answer: str
     full_text: str
+    evidence_fingerprint: Optional[str] = None
 
 
 class ResultCreate(BaseModel):
     answer: str
     full_text: str
+    evidence_fingerprint: Optional[str] = None
     criterion: Optional[UUID] = None  # Change to UUID
     project: Optional[UUID] = None    # Change to UUID 
     chunks: Optional[list[UUID]] = Field(default_factory=list)  # Change to list of UUIDs
@@ -374,6 +406,39 @@ class FileInfo(BaseModel):
     )
 
 
+class CriterionRating(str, Enum):
+    POSITIVE = "positive"
+    NEUTRAL = "neutral"
+    NEGATIVE = "negative"
+
+
+class CriterionAnswer(BaseModel):
+    justification: str = Field(..., description="One sentence explaining the rating")
+    rating: CriterionRating = Field(..., description="Whether the answer to the question is positive, neutral or negative")
+    hypotheses: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=3,
+        description="The updated hypotheses held about the project",
+    )
+
+    @field_validator("rating", mode="before")
+    @classmethod
+    def normalise_rating(cls, v):
+        return v.strip().strip("[]").lower() if isinstance(v, str) else v
+
+
+class CriterionBatchAnswer(BaseModel):
+    criterion: int = Field(..., description="Position of the criterion in the batched prompt, from 1")
+    justification: str = Field(..., description="One sentence explaining the rating")
+    rating: CriterionRating = Field(..., description="Whether the answer to the question is positive, neutral or negative")
+
+    @field_validator("rating", mode="before")
+    @classmethod
+    def normalise_rating(cls, v):
+        return v.strip().strip("[]").lower() if isinstance(v, str) else v
+
+
 class AuditLogBase(BaseModel):
     model_config = global_model_config
 
@@ -424,3 +489,70 @@ class ChatSessionUpdate(BaseModel):
     title: Optional[str] = None
     updated_datetime: Optional[datetime] = None
     deleted: Optional[bool] = None
+
+
+class JobStatus(str, Enum):
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    COMPLETED = "COMPLETED"
+    FAILED = "FAILED"
+    CANCELLED = "CANCELLED"
+
+
+class EvaluationJobCreate(BaseModel):
+    project_id: UUID
+    user_id: Optional[UUID] = None
+    parameters: Optional[dict] = None
+
+
+class EvaluationJob(BaseModel):
+    model_config = global_model_config
+
+    id: UUID
+    project_id: UUID
+    user_id: Optional[UUID] = None
+    status: JobStatus
+    parameters: Optional[dict] = None
+    total_criteria: Optional[int] = None
+    processed_criteria: int = 0
+    cancel_requested: bool = False
+    error: Optional[str] = None
+    attempts: int = 0
+    worker_id: Optional[str] = None
+    stage_stats: Optional[dict] = None
+    heartbeat_datetime: Optional[datetime] = None
+    started_datetime: Optional[datetime] = None
+    finished_datetime: Optional[datetime] = None
+    created_datetime: Optional[datetime] = None
+    updated_datetime: Optional[datetime] = None
+
+
+class EvaluationTask(BaseModel):
+    model_config = global_model_config
+
+    id: UUID
+    job_id: UUID
+    project_id: UUID
+    criterion_id: Optional[UUID] = None
+    result_id: Optional[UUID] = None
+    kind: str = "criterion"
+    status: JobStatus
+    error: Optional[str] = None
+    attempts: int = 0
+    worker_id: Optional[str] = None
+    heartbeat_datetime: Optional[datetime] = None
+    finished_datetime: Optional[datetime] = None
+    created_datetime: Optional[datetime] = None
+
+
+class EvaluationEvent(BaseModel):
+    model_config = global_model_config
+
+    id: int
+    job_id: UUID
+    stage: str
+    task_id: Optional[UUID] = None
+    criterion_id: Optional[UUID] = None
+    result_id: Optional[UUID] = None
+    message: Optional[str] = None
+    created_datetime: Optional[datetime] = None
@@ -0,0 +1,203 @@
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+from uuid import UUID
+
+
+def normalise_query(query: str) -> str:
+    """Normalise a query so trivially different strings share a cache entry"""
+    return " ".join(query.lower().split())
+
+
+class LRUCache:
+    """A small thread-safe least-recently-used cache"""
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self._items: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._items:
+                return default
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def remove_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Remove every entry whose key matches the predicate, returning the number removed"""
+        with self._lock:
+            keys = [key for key in self._items if predicate(key)]
+            for key in keys:
+                del self._items[key]
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._items
+
+
+class PostgresChunkSetVersions:
+    """Chunk-set versions persisted on the project table, so every process sees each other's invalidations"""
+
+    def get(self, project_id: Any) -> Optional[int]:
+        from scout.utils.storage.postgres_interface import get_chunk_set_version
+
+        return get_chunk_set_version(UUID(str(project_id)))
+
+    def bump(self, project_id: Any) -> int:
+        from scout.utils.storage.postgres_interface import bump_chunk_set_version
+
+        return bump_chunk_set_version(UUID(str(project_id)))
+
+
+class LocalChunkSetVersions:
+    """Chunk-set versions held in this process only"""
+
+    def __init__(self):
+        self._versions: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, project_id: Any) -> Optional[int]:
+        return self._versions.get(str(project_id), 0)
+
+    def bump(self, project_id: Any) -> int:
+        with self._lock:
+            self._versions[str(project_id)] = self._versions.get(str(project_id), 0) + 1
+            return self._versions[str(project_id)]
+
+
+class PostgresCategorySummaries:
+    """Category summaries persisted per project, so they are reused across runs and worker processes"""
+
+    def get(self, project_id: Any, category: str, input_hash: str) -> Optional[str]:
+        from scout.utils.storage.postgres_interface import get_category_summary
+
+        if project_id is None:
+            return None
+        return get_category_summary(UUID(str(project_id)), category, input_hash)
+
+    def set(self, project_id: Any, category: str, input_hash: str, summary: str) -> None:
+        from sqlalchemy.exc import SQLAlchemyError
+
+        from scout.utils.storage.postgres_interface import save_category_summary
+        from scout.utils.utils import logger
+
+        if project_id is None:
+            return
+        try:
+            save_category_summary(UUID(str(project_id)), category, input_hash, summary)
+        except SQLAlchemyError as e:
+            # The summary is still returned, it just won't be reused
+            logger.warning(f"Unable to store the {category} summary of project {project_id}: {e}")
+
+
+class LocalCategorySummaries:
+    """Category summaries held in this process only"""
+
+    def __init__(self, max_size: int = 1024):
+        self._cache = LRUCache(max_size=max_size)
+
+    def get(self, project_id: Any, category: str, input_hash: str) -> Optional[str]:
+        return self._cache.get((str(project_id), category, input_hash))
+
+    def set(self, project_id: Any, category: str, input_hash: str, summary: str) -> None:
+        self._cache.set((str(project_id), category, input_hash), summary)
+
+
+class RetrievalCache:
+    """
+    Project-scoped cache of retrieved document extracts.
+
+    Entries are keyed by (project ID, chunk-set version, normalised query, k, filters, retriever settings),
+    so evaluators configured differently never share results. `invalidate_project` bumps the project's
+    chunk-set version whenever chunks are added or removed; with `PostgresChunkSetVersions` the version is
+    persisted, so worker processes stop serving extracts cached before another process changed the chunks.
+
+    Callers retrieving on a miss should read `version` first and pass it to both `get` and `set`, so
+    extracts retrieved while the chunks change are stored under the old version and never served.
+    """
+
+    def __init__(self, max_size: int = 4096, versions: Any = None):
+        self._cache = LRUCache(max_size=max_size)
+        # An object whose `get(project_id)` and `bump(project_id)` read and increment chunk-set versions
+        self.versions = versions or LocalChunkSetVersions()
+
+    def version(self, project_id: Any) -> Optional[int]:
+        """The project's current chunk-set version, or None if it cannot be read and nothing should be cached"""
+        return self.versions.get(project_id)
+
+    def _key(
+        self, project_id: Any, version: int, query: str, k: int, filters: Optional[dict], settings: Optional[dict]
+    ) -> Tuple:
+        return (
+            str(project_id),
+            version,
+            normalise_query(query),
+            k,
+            json.dumps(filters or {}, sort_keys=True, default=str),
+            json.dumps(settings or {}, sort_keys=True, default=str),
+        )
+
+    def get(
+        self,
+        project_id: Any,
+        query: str,
+        k: int,
+        filters: Optional[dict] = None,
+        settings: Optional[dict] = None,
+        version: Optional[int] = None,
+    ) -> Optional[list]:
+        version = version if version is not None else self.version(project_id)
+        if version is None:
+            return None
+        extracts = self._cache.get(self._key(project_id, version, query, k, filters, settings))
+        return list(extracts) if extracts is not None else None
+
+    def set(
+        self,
+        project_id: Any,
+        query: str,
+        k: int,
+        filters: Optional[dict],
+        extracts: list,
+        settings: Optional[dict] = None,
+        version: Optional[int] = None,
+    ) -> None:
+        version = version if version is not None else self.version(project_id)
+        if version is None:
+            return
+        self._cache.set(self._key(project_id, version, query, k, filters, settings), list(extracts))
+
+    def invalidate_project(self, project_id: Any) -> None:
+        """Drop all cached extracts for a project, e.g. after its chunk set has changed"""
+        self.versions.bump(project_id)
+        self._cache.remove_where(lambda key: key[0] == str(project_id))
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+# Shared by every evaluator in the process so repeated runs over a project reuse retrievals
+retrieval_cache = RetrievalCache(versions=PostgresChunkSetVersions())
+
+# Summaries keyed by model and a hash of their full prompt, so batches and reductions repeated within a process
+# are reused
+summary_cache = LRUCache(max_size=1024)
+
+# Category summaries keyed by (project, category, input hash), so unchanged categories are never re-summarised
+category_summaries = PostgresCategorySummaries()
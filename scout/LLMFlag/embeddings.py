@@ -0,0 +1,171 @@
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from scout.utils.utils import logger
+
+
+def get_embedding_model_id(embedding_function: Embeddings) -> str:
+    """Identify the embedding model so cached vectors are never mixed between models"""
+    return (
+        getattr(embedding_function, "model_id", None)
+        or os.getenv("AWS_BEDROCK_EMBEDDING_MODEL_ID")
+        or type(embedding_function).__name__
+    )
+
+
+class QueryEmbeddingCache:
+    """
+    Persistent cache of query embeddings, stored in a SQLite file.
+
+    Criteria questions and evidence points are the same for every project, so their embeddings are
+    shared across projects and runs. Vectors are keyed by embedding model and a hash of the exact text.
+    """
+
+    def __init__(self, path: Path | str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS query_embedding ("
+                "model_id TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL, "
+                "PRIMARY KEY (model_id, text_hash))"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, model_id: str, texts: List[str]) -> Dict[str, List[float]]:
+        """Return the cached embeddings for whichever of the texts have been seen before"""
+        hashes = {self._hash(text): text for text in texts}
+        found = {}
+        with self._lock, self._connect() as conn:
+            hash_list = list(hashes)
+            for i in range(0, len(hash_list), 500):
+                batch = hash_list[i : i + 500]
+                rows = conn.execute(
+                    f"SELECT text_hash, vector FROM query_embedding WHERE model_id = ? "
+                    f"AND text_hash IN ({', '.join('?' * len(batch))})",
+                    [model_id, *batch],
+                ).fetchall()
+                for text_hash, vector in rows:
+                    found[hashes[text_hash]] = array("f", vector).tolist()
+        return found
+
+    def set_many(self, model_id: str, embeddings: Dict[str, List[float]]) -> None:
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO query_embedding (model_id, text_hash, vector) VALUES (?, ?, ?)",
+                [(model_id, self._hash(text), array("f", vector).tobytes()) for text, vector in embeddings.items()],
+            )
+
+
+_query_embedding_cache: Optional[QueryEmbeddingCache] = None
+_query_embedding_cache_lock = threading.Lock()
+
+
+def get_query_embedding_cache() -> QueryEmbeddingCache:
+    """Process-wide query embedding cache, created on first use"""
+    global _query_embedding_cache
+    with _query_embedding_cache_lock:
+        if _query_embedding_cache is None:
+            _query_embedding_cache = QueryEmbeddingCache(
+                os.getenv("SCOUT_QUERY_EMBEDDING_CACHE", ".data/query_embeddings.db")
+            )
+        return _query_embedding_cache
+
+
+# Cohere embedding models on Bedrock take at most this many texts per call
+COHERE_MAX_BATCH_SIZE = 96
+
+
+def _is_bedrock_cohere(embedding_function: Embeddings) -> bool:
+    model_id = getattr(embedding_function, "model_id", None) or ""
+    return "cohere.embed" in model_id and getattr(embedding_function, "client", None) is not None
+
+
+def _embed_cohere_queries(embedding_function: Embeddings, texts: List[str]) -> List[List[float]]:
+    """Embed texts as search queries with one Bedrock call to a Cohere embedding model"""
+    body = {**(getattr(embedding_function, "model_kwargs", None) or {}), "texts": texts, "input_type": "search_query"}
+    response = embedding_function.client.invoke_model(
+        body=json.dumps(body),
+        modelId=embedding_function.model_id,
+        accept="application/json",
+        contentType="application/json",
+    )
+    vectors = json.loads(response["body"].read())["embeddings"]
+    if isinstance(vectors, dict):
+        # Keyed by type when the model kwargs ask for `embedding_types`
+        vectors = vectors["float"]
+    if getattr(embedding_function, "normalize", False):
+        vectors = [[value / (math.sqrt(sum(v * v for v in vector)) or 1.0) for value in vector] for vector in vectors]
+    return vectors
+
+
+def _embed_query_batch(embedding_function: Embeddings, texts: List[str], max_workers: int) -> List[List[float]]:
+    """
+    Embed texts as search queries. Asymmetric models such as Cohere on Bedrock embed queries and documents
+    differently, so `embed_documents` is never used. Cohere models on Bedrock embed up to 96 queries per call;
+    other models, such as Titan, take one text per call, so their `embed_query` calls only run concurrently.
+    """
+    if _is_bedrock_cohere(embedding_function):
+        return [
+            vector
+            for start in range(0, len(texts), COHERE_MAX_BATCH_SIZE)
+            for vector in _embed_cohere_queries(embedding_function, texts[start : start + COHERE_MAX_BATCH_SIZE])
+        ]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(embedding_function.embed_query, texts))
+
+
+def embed_queries(
+    queries: List[str],
+    embedding_function: Embeddings,
+    cache: Optional[QueryEmbeddingCache] = None,
+    batch_size: int = 96,
+    max_workers: int = 8,
+) -> Dict[str, List[float]]:
+    """
+    Embed a list of queries with the model's query input type, reusing any embeddings already held in the cache.
+
+    Args:
+        queries: texts to embed, duplicates are embedded once
+        embedding_function: the vector store's embedding function
+        cache: persistent query embedding cache, if any
+        batch_size: number of texts embedded in each batch
+        max_workers: concurrent `embed_query` calls for models that embed one text per call
+
+    Returns:
+        Mapping of query text to its embedding, in the order of `queries`
+    """
+    queries = list(dict.fromkeys(queries))
+    # Vectors cached before queries were embedded as queries must not be reused
+    model_id = f"{get_embedding_model_id(embedding_function)}:query"
+    embeddings = cache.get_many(model_id, queries) if cache is not None else {}
+
+    missing = [query for query in queries if query not in embeddings]
+    new_embeddings = {}
+    for i in range(0, len(missing), batch_size):
+        batch = missing[i : i + batch_size]
+        new_embeddings.update(zip(batch, _embed_query_batch(embedding_function, batch, max_workers)))
+
+    if new_embeddings and cache is not None:
+        cache.set_many(model_id, new_embeddings)
+    logger.info(f"Embedded {len(new_embeddings)} queries, {len(queries) - len(new_embeddings)} served from cache")
+
+    embeddings.update(new_embeddings)
+    return {query: embeddings[query] for query in queries}
@@ -1,29 +1,67 @@
+import hashlib
+import logging
 import os
 import json
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import List, Tuple, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, zip_longest
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from uuid import UUID
 
 import boto3
 import regex as re
 from botocore.exceptions import ClientError
 from langchain_core.vectorstores import VectorStore
+from pydantic import ValidationError
 from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
 
-from scout.DataIngest.models.schemas import Chunk, ChunkBase, ChunkCreate, CriterionCreate, File, Project, ProjectCreate, ProjectUpdate, ResultCreate
+from scout.DataIngest.models.schemas import Chunk, ChunkBase, ChunkCreate, CriterionAnswer, CriterionBatchAnswer, CriterionCreate, FileMetadata, Project, ProjectCreate, ProjectUpdate, Result, ResultCreate, ResultUpdate
 from scout.LLMFlag.prompts import (
+    BATCH_QUESTION_ITEM,
     CORE_SCOUT_PERSONA,
-    DOCUMENT_EXTRACT_PROMPT,
+    CURRENT_HYPOTHESES_PROMPT,
     DOCUMENT_EXTRACTS_HEADER,
+    NO_EVIDENCE_ANSWER,
+    REDUCE_SUMMARIES_PROMPT,
+    REGENERATE_HYPOTHESIS_INSTRUCTIONS,
+    SUMMARISE_CATEGORY_PROMPT,
+    SUMMARISE_RESPONSES_PROMPT,
     SYSTEM_EVIDENCE_POINTS_PROMPT,
-    SYSTEM_HYPOTHESIS_PROMPT,
+    SYSTEM_HYPOTHESIS_INSTRUCTIONS,
     SYSTEM_QUESTION_PROMPT,
+    USER_BATCH_QUESTIONS_PROMPT,
     USER_EVIDENCE_POINTS_PROMPT,
+    USER_QUESTION_AND_HYPOTHESES_PROMPT,
     USER_QUESTION_PROMPT,
-    USER_REGENERATE_HYPOTHESIS_PROMPT,
 )
-from scout.LLMFlag.retriever import ReRankRetriever
+from scout.LLMFlag.cache import RetrievalCache, category_summaries, normalise_query, retrieval_cache, summary_cache
+from scout.LLMFlag.embeddings import QueryEmbeddingCache, embed_queries, get_query_embedding_cache
+from scout.LLMFlag.prompt_builder import (
+    PromptBuilder,
+    count_tokens,
+    deduplicate_extracts,
+    get_extract_file_id,
+    get_extract_id,
+    get_extract_metadata,
+    get_extract_text,
+    render_extracts,
+    truncate_to_tokens,
+)
+from scout.LLMFlag.reranker import get_rerank_model
+from scout.LLMFlag.retriever import RERANK_MODEL, RERANK_SCORE, ReRankRetriever
+from scout.utils.llm_formats import (
+    EVIDENCE_STAGE,
+    QUESTION_STAGE,
+    SUMMARY_STAGE,
+    format_messages_body,
+    get_stage_model_id,
+    merge_stage_stats,
+    parse_llm_response,
+)
 from scout.utils.storage.storage_handler import BaseStorageHandler
+from scout.utils.storage.summary_index import FileSummaryIndex
 from scout.utils.utils import logger
 
 
@@ -51,10 +89,151 @@ def api_call_with_retry(func, *args, **kwargs):
             raise
 
 
+# Static start of every question request, identical across calls so it can be cached
+QUESTION_SYSTEM_BLOCKS = [SYSTEM_QUESTION_PROMPT, SYSTEM_HYPOTHESIS_INSTRUCTIONS]
+
+
+def split_evidence(evidence: str) -> List[str]:
+    """Split a criterion's evidence string into its individual evidence points"""
+    if not evidence:
+        return []
+    return [item for item in evidence.split("_") if len(item) >= 5]
+
+
+def collect_criteria_queries(criteria: List[CriterionCreate]) -> List[str]:
+    """Gather the unique questions and evidence points for a list of criteria, preserving order"""
+    queries = {}
+    for criterion in criteria:
+        for query in [criterion.question, *split_evidence(criterion.evidence)]:
+            queries.setdefault(normalise_query(query), query)
+    return list(queries.values())
+
+
+def compute_evidence_fingerprint(extracts: List) -> str:
+    """Fingerprint the set of chunks an answer is based on, from their IDs and content hashes"""
+    entries = sorted(
+        {
+            f"{get_extract_id(extract)}:{hashlib.sha256(get_extract_text(extract).encode('utf-8')).hexdigest()}"
+            for extract in extracts
+        }
+    )
+    return hashlib.sha256("\n".join(entries).encode("utf-8")).hexdigest()
+
+
+def max_rerank_score(extracts: List, model_name: Optional[str] = None) -> Optional[float]:
+    """
+    The best reranker score among the extracts, or None if none of them were scored.
+    Given a `model_name`, only scores from that reranker count.
+    """
+    metadata = [get_extract_metadata(extract) for extract in extracts]
+    scores = [
+        meta.get(RERANK_SCORE) for meta in metadata if model_name is None or meta.get(RERANK_MODEL) == model_name
+    ]
+    scores = [score for score in scores if score is not None]
+    return max(scores) if scores else None
+
+
+def parse_criterion_answer(text: str) -> CriterionAnswer | None:
+    """Parse and validate a structured criterion answer, returning None if it is malformed"""
+    json_match = re.search(r"```(?:json)?\s*(.*?)\s*```", text, re.DOTALL)
+    json_str = json_match.group(1) if json_match else text
+    # Tolerate any preamble or trailing text around the JSON object
+    start, end = json_str.find("{"), json_str.rfind("}")
+    if start == -1 or end == -1:
+        return None
+    try:
+        return CriterionAnswer.model_validate(json.loads(json_str[start : end + 1]))
+    except (json.JSONDecodeError, ValidationError) as e:
+        logger.debug(f"Unable to parse structured answer: {e}")
+        return None
+
+
+def parse_batch_answers(text: str) -> Dict[int, CriterionBatchAnswer]:
+    """
+    Parse a batched answer into the answers for each criterion, keyed by their position from 1.
+    Malformed items are left out, so only their criteria need answering again.
+    """
+    json_match = re.search(r"```(?:json)?\s*(.*?)\s*```", text, re.DOTALL)
+    json_str = json_match.group(1) if json_match else text
+    start, end = json_str.find("["), json_str.rfind("]")
+    if start == -1 or end == -1:
+        return {}
+    try:
+        items = json.loads(json_str[start : end + 1])
+    except json.JSONDecodeError as e:
+        logger.debug(f"Unable to parse batched answer: {e}")
+        return {}
+    if not isinstance(items, list):
+        return {}
+
+    answers = {}
+    for item in items:
+        try:
+            answer = CriterionBatchAnswer.model_validate(item)
+        except ValidationError as e:
+            logger.debug(f"Unable to parse batched answer item: {e}")
+            continue
+        answers.setdefault(answer.criterion, answer)
+    return answers
+
+
+def group_criteria_into_batches(criteria: List[CriterionCreate], batch_size: int) -> List[List[int]]:
+    """Group the positions of criteria by category, in batches of at most `batch_size`, preserving order"""
+    categories: Dict[str, List[int]] = {}
+    for idx, criterion in enumerate(criteria):
+        categories.setdefault(criterion.category or "", []).append(idx)
+    return [
+        positions[start : start + batch_size]
+        for positions in categories.values()
+        for start in range(0, len(positions), max(batch_size, 1))
+    ]
+
+
+def _optional_float(value: Optional[str]) -> Optional[float]:
+    return float(value) if value else None
+
+
+def split_rating(full_text: str) -> Tuple[str, str]:
+    """Split an LLM answer into its rating (Positive, Neutral, Negative or None) and the text without it"""
+    # Find words within brackets and standalone words
+    extracted_words = re.findall(
+        r"\[(positive|neutral|negative)\]|\b(positive|neutral|negative)\b", full_text, re.IGNORECASE)
+
+    if not extracted_words:
+        return "None", full_text
+
+    # Extract the last occurrence, regardless of format
+    last_match = [match for tup in extracted_words for match in tup if match]
+    answer = last_match[-1].title()
+
+    # Remove occurrences of words and brackets
+    full_text = re.sub(r"\[?(positive|neutral|negative)\]?", "", full_text, flags=re.IGNORECASE).strip()
+    return answer, full_text
+
+
 class BaseEvaluator(ABC):
     def __init__(self):
         """Initialise the evaluator"""
         self.hypotheses = "None"
+        self.evaluation_mode = "two_call"
+        self.hypothesis_interval = 1
+        self.criteria_answered = 0
+        self.rate_limiter = None
+        self.event_callback = None
+        self.storage_handler = None
+        self.stage_model_ids = {}
+        self.stage_stats = {}
+        self._stage_stats_lock = threading.Lock()
+        self.relevance_threshold = None
+        self.adaptive_k = False
+        self.cluster_pool_size = 0
+        self.rerank_latency_budget = None
+        self.rerank_margin = None
+        self.search_type = "similarity"
+        self.summary_index = None
+        self.file_k = 0
+        self.cluster_pools = {}
+        self.query_clusters = {}
 
     @abstractmethod
     def evaluate_question(self, criteria_uuid: str) -> List[str]:
@@ -68,155 +247,407 @@ class BaseEvaluator(ABC):
     def _define_model(self):
         """Define the model that is the evaluator"""
 
-    def semantic_search(self, query: str, k: int, filters: dict):
-        # do retrieval
+    def emit(self, stage: str, **details) -> None:
+        """Report the progress of a criterion to `event_callback`, if one is set"""
+        if self.event_callback is not None:
+            self.event_callback(stage, **details)
+
+    @property
+    def retrieval_settings(self) -> dict:
+        """Settings that change what a retrieval returns, so differently configured evaluators never share one"""
+        return {
+            "vector_store": type(getattr(self, "vector_store", None)).__name__,
+            "search_type": self.search_type,
+            "file_k": self.file_k,
+            "adaptive_k": self.adaptive_k,
+            "latency_budget": self.rerank_latency_budget,
+            "rerank_margin": self.rerank_margin,
+            "cluster_pool_size": self.cluster_pool_size,
+        }
+
+    def start_run(self) -> None:
+        """Start an evaluation run, so the project's chunk-set version is read again at its first retrieval"""
+        self._chunk_set_version = None
+
+    def chunk_set_version(self) -> Optional[int]:
+        """
+        The project's chunk-set version, read from the retrieval cache once per evaluation run rather than
+        on every retrieval. Read before retrieving, so extracts retrieved while the chunks change are cached
+        under the old version.
+        """
+        if self._chunk_set_version is None:
+            self._chunk_set_version = self.retrieval_cache.version(self.project.id)
+        return self._chunk_set_version
+
+    def retrieve(self, query: str, k: int, filters: dict) -> List:
+        """Retrieve and rerank extracts for a query, reusing cached results for the project"""
+        version = self.chunk_set_version()
+        settings = self.retrieval_settings
+        extracts = self.retrieval_cache.get(self.project.id, query, k, filters, settings, version)
+        if extracts is not None:
+            return extracts
+
+        extracts = self.search(query, k=k, filters=filters)
+        self.retrieval_cache.set(self.project.id, query, k, filters, extracts, settings, version)
+        return extracts
+
+    def search(self, query: str, k: int, filters: dict) -> List:
+        """Retrieve and rerank extracts for a query from the vector store, without the retrieval cache"""
         search_kwargs = {"k": k, "filter": filters}
         retriever = ReRankRetriever(
             vectorstore=self.vector_store,
-            search_type="similarity",
+            search_type=self.search_type,
             search_kwargs=search_kwargs,
+            query_vector=self.query_embeddings.get(normalise_query(query)),
+            candidates=self.get_cluster_pool(query, filters),
+            adaptive_k=self.adaptive_k,
+            latency_budget=self.rerank_latency_budget,
+            rerank_margin=self.rerank_margin,
+            storage_handler=self.storage_handler,
+            summary_index=self.summary_index,
+            file_k=self.file_k,
         )
-        extracts = retriever.get_relevant_documents(query)
+        return retriever.get_relevant_documents(query)
 
-        # get files for metadata
-        files = [
-            self.storage_handler.read_item(object_id=UUID(
-                extract.metadata["parent_doc_uuid"]), model=File)
-            for extract in extracts
-        ]
+    def prepare_query_embeddings(self, queries: List[str]) -> None:
+        """
+        Embed every query up front in a few batched calls, so searches can run by vector. Vectors are keyed
+        by the normalised query, as retrievals are cached.
+        """
+        embedding_function = getattr(self.vector_store, "embeddings", None)
+        if embedding_function is None:
+            return
+        embeddings = embed_queries(queries, embedding_function=embedding_function, cache=self.query_embedding_cache)
+        self.query_embeddings.update({normalise_query(query): vector for query, vector in embeddings.items()})
 
-        # add extracts to prompt
-        prompt = DOCUMENT_EXTRACTS_HEADER
-        for idx, extract in enumerate(extracts):
-            file = files[idx]
-            if file is None:
+    def prepare_retrievals(self, criteria: List[CriterionCreate], k: int = 3) -> int:
+        """
+        Pre-pass over the criteria to be evaluated, embedding each unique question and evidence
+        point in batches and retrieving it once so later lookups are served from the retrieval cache.
+        """
+        queries = collect_criteria_queries(criteria)
+        filters = {"project": str(self.project.id)}
+        self.prepare_query_embeddings(queries)
+        self.prepare_cluster_pools(criteria, k=k)
+        for query in queries:
+            self.retrieve(query, k=k, filters=filters)
+        logger.info(f"Prepared retrievals for {len(queries)} unique queries")
+        return len(queries)
+
+    def prepare_cluster_pools(self, criteria: List[CriterionCreate], k: int = 3) -> int:
+        """
+        Retrieve one shared pool of candidate extracts for each cluster of similar criteria, searching by
+        the mean embedding of the cluster's questions and evidence points with a larger k. The members'
+        queries then rerank that pool instead of each searching the vector store.
+        Clusters are set on criteria offline by `scout.Pipelines.cluster_criteria`.
+        """
+        if not self.cluster_pool_size:
+            return 0
+        clusters: Dict[int, List[CriterionCreate]] = {}
+        for criterion in criteria:
+            cluster_id = getattr(criterion, "cluster_id", None)
+            if cluster_id is not None:
+                clusters.setdefault(cluster_id, []).append(criterion)
+
+        filters = {"project": str(self.project.id)}
+        settings = self.retrieval_settings
+        for cluster_id, members in clusters.items():
+            queries = collect_criteria_queries(members)
+            vectors = [
+                self.query_embeddings[normalise_query(query)]
+                for query in queries
+                if normalise_query(query) in self.query_embeddings
+            ]
+            if len(members) < 2 or not vectors:
                 continue
-            prompt += DOCUMENT_EXTRACT_PROMPT.format(
-                file_name=getattr(file, "clean_name", file.name),
-                source=getattr(file, "source", None),
-                summary=getattr(file, "summary", None),
-                date=getattr(file, "published_date", None),
-                text=extract.page_content,
-            )
+            centroid = [sum(values) / len(vectors) for values in zip(*vectors)]
+            pool_k = min(k * 3 * len(queries), self.cluster_pool_size)
+            version = self.chunk_set_version()
+            pool = self.vector_store.similarity_search_by_vector(centroid, k=pool_k, filter=filters)
+            self.cluster_pools[cluster_id] = pool
+            for query in queries:
+                self.query_clusters[normalise_query(query)] = cluster_id
+
+            # Rerank the pool for every member query in one batched pass
+            pending = [
+                query
+                for query in queries
+                if self.retrieval_cache.get(self.project.id, query, k, filters, settings, version) is None
+            ]
+            if pending:
+                retriever = ReRankRetriever(
+                    vectorstore=self.vector_store,
+                    search_kwargs={"k": k, "filter": filters},
+                    candidates=pool,
+                    adaptive_k=self.adaptive_k,
+                    latency_budget=self.rerank_latency_budget,
+                    storage_handler=self.storage_handler,
+                )
+                for query, extracts in retriever.rerank_candidates(pending).items():
+                    self.retrieval_cache.set(self.project.id, query, k, filters, extracts, settings, version)
+        logger.info(f"Prepared shared retrieval pools for {len(self.cluster_pools)} criteria clusters")
+        return len(self.cluster_pools)
+
+    def get_cluster_pool(self, query: str, filters: dict) -> Optional[List]:
+        """The shared candidate pool for a query's cluster, if it has one and was retrieved with these filters"""
+        if filters != {"project": str(self.project.id)}:
+            return None
+        return self.cluster_pools.get(self.query_clusters.get(normalise_query(query)))
+
+    def get_file_metadata(self, file_ids: List[UUID]) -> Dict[UUID, FileMetadata]:
+        """Look up file metadata, reading any files not already cached in one bulk query"""
+        missing = [file_id for file_id in set(file_ids) if file_id not in self.file_metadata_cache]
+        if missing:
+            self.file_metadata_cache.update(self.storage_handler.read_file_metadata(missing))
+        return {file_id: self.file_metadata_cache.get(file_id) for file_id in file_ids}
+
+    def render_extracts(self, extracts: List) -> List[str]:
+        """Deduplicate extracts and render each one compactly with its file metadata"""
+        extracts = deduplicate_extracts(extracts)
+        file_ids = [file_id for file_id in map(get_extract_file_id, extracts) if file_id is not None]
+        files = self.get_file_metadata(file_ids)
+        return render_extracts(extracts, files)
+
+    def retrieve_extracts(self, query: str, k: int, filters: dict) -> List:
+        """Retrieve the extracts for a query, without repeats, leaving them to be rendered where they are used"""
+        return deduplicate_extracts(self.retrieve(query, k=k, filters=filters))
+
+    def semantic_search(self, query: str, k: int, filters: dict):
+        # do retrieval
+        extracts = self.retrieve_extracts(query, k=k, filters=filters)
+
+        # add extracts to prompt
+        prompt = DOCUMENT_EXTRACTS_HEADER + "".join(self.render_extracts(extracts))
         return prompt, extracts
 
-    def _build_bedrock_request(self, messages: List[Dict]) -> Dict:
+    def model_for_stage(self, stage: str) -> str:
+        """Get the model that answers the given stage, e.g. evidence points or the final rating"""
+        return self.stage_model_ids.get(stage) or get_stage_model_id(stage)
+
+    def _build_bedrock_request(
+        self, messages: List[Dict], model_id: str = None, system_blocks: Optional[List[str]] = None
+    ) -> Dict:
         """Builds a request body for the Bedrock API."""
-        return {
-            "anthropic_version": "bedrock-2023-05-31",
-            "max_tokens": 1000,
-            "messages": messages,
-        }
-    
-    def _invoke_bedrock_model(self, request_body: Dict) -> Dict:
+        return format_messages_body(
+            model_id or os.getenv("AWS_BEDROCK_MODEL_ID"), messages, max_tokens=1000, system_blocks=system_blocks
+        )
+
+    def _invoke_bedrock_model(self, request_body: Dict, model_id: str = None) -> Dict:
         """Invokes the Bedrock model with the given request body and returns the response."""
         response = api_call_with_retry(
             self.llm.invoke_model,
-            modelId=os.getenv("AWS_BEDROCK_MODEL_ID"),
+            modelId=model_id or os.getenv("AWS_BEDROCK_MODEL_ID"),
             body=json.dumps(request_body)
         )
         return response
 
+    def _call_llm(
+        self, messages: List[Dict], stage: str = QUESTION_STAGE, system_blocks: Optional[List[str]] = None
+    ) -> str:
+        """
+        Builds the request, invokes the stage's Bedrock model and returns the text of its reply.
+        `system_blocks` are static prompt sections sent first, cached by models that support it.
+        """
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        model_id = self.model_for_stage(stage)
+        request_body = self._build_bedrock_request(messages, model_id, system_blocks)
+        start = time.perf_counter()
+        response = self._invoke_bedrock_model(request_body, model_id)
+        latency = time.perf_counter() - start
+        response_body = json.loads(response["body"].read().decode())
+        parsed = parse_llm_response(model_id, response_body)
+
+        # Bedrock reports token counts in its response headers for models that leave them out of the body
+        headers = response.get("ResponseMetadata", {}).get("HTTPHeaders", {})
+        input_tokens = parsed.input_tokens or int(
+            headers.get("x-amzn-bedrock-input-token-count") or count_tokens(json.dumps(messages))
+        )
+        output_tokens = parsed.output_tokens or int(
+            headers.get("x-amzn-bedrock-output-token-count") or count_tokens(parsed.text)
+        )
+        self.record_llm_call(
+            stage, model_id, latency, input_tokens, output_tokens, parsed.cache_read_tokens, parsed.cache_write_tokens
+        )
+        return parsed.text
+
+    def record_llm_call(
+        self,
+        stage: str,
+        model_id: str,
+        latency: float,
+        input_tokens: int,
+        output_tokens: int,
+        cache_read_tokens: int = 0,
+        cache_write_tokens: int = 0,
+    ) -> None:
+        """Add an LLM call to the usage of its stage"""
+        call = {
+            stage: {
+                "model_id": model_id,
+                "calls": 1,
+                "latency_seconds": latency,
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "cache_read_tokens": cache_read_tokens,
+                "cache_write_tokens": cache_write_tokens,
+            }
+        }
+        with self._stage_stats_lock:
+            self.stage_stats = merge_stage_stats(self.stage_stats, call)
+
+    def record_skipped_call(self, stage: str) -> None:
+        """Count an LLM call that was not needed, e.g. an evidence point with no relevant extracts"""
+        with self._stage_stats_lock:
+            self.stage_stats = merge_stage_stats(self.stage_stats, {stage: {"skipped_calls": 1}})
+
+    def has_relevant_evidence(self, extracts: List) -> bool:
+        """
+        Whether any extract scores at least `relevance_threshold` with the full reranker.
+        The threshold is on that model's score scale, so extracts without one of its scores, e.g. reranked
+        by the tiny model, not reranked, or from a Knowledge Base, are assumed to be relevant.
+        """
+        if not extracts:
+            return False
+        if self.relevance_threshold is None:
+            return True
+        score = max_rerank_score(extracts, model_name=get_rerank_model("full"))
+        return score is None or score >= self.relevance_threshold
+
+    def pop_stage_stats(self) -> Dict[str, Dict]:
+        """Get the LLM usage of each stage since it was last popped, and reset it"""
+        with self._stage_stats_lock:
+            stats, self.stage_stats = self.stage_stats, {}
+        return stats
+
+    def answer_evidence_points(self, question: str, evidence: str = None, k=3) -> Tuple[str, List]:
+        """Answer each of a criterion's evidence points, returning the question/answer pairs and extracts used"""
+        evidence_list = split_evidence(evidence)
+        if not evidence_list:
+            return "None", []
+
+        evidence_responses_list = []
+        evidence_extracts = []
+        for evidence_item in evidence_list:
+            extracts = self.retrieve_extracts(evidence_item, k=k, filters={"project": str(self.project.id)})
+            evidence_extracts.extend(extracts)
+            if not self.has_relevant_evidence(extracts):
+                # Nothing in the project is about this point, so there is nothing for the LLM to weigh
+                logger.info(f"No relevant evidence for '{evidence_item}', skipping its LLM call")
+                self.emit("no_evidence", message=evidence_item)
+                self.record_skipped_call(EVIDENCE_STAGE)
+                evidence_responses_list.append(NO_EVIDENCE_ANSWER)
+                continue
+
+            # Create the message for Bedrock using Claude's expected format
+            evidence_messages = [
+                {
+                    "role": "user",
+                    "content": self.prompt_builder.build(
+                        USER_EVIDENCE_POINTS_PROMPT,
+                        self.render_extracts(extracts),
+                        name="evidence point prompt",
+                        question=question,
+                    )
+                }
+            ]
+            evidence_responses_list.append(
+                self._call_llm(evidence_messages, stage=EVIDENCE_STAGE, system_blocks=[SYSTEM_EVIDENCE_POINTS_PROMPT])
+            )
+
+        evidence_answer_pairs = "\n".join(
+            f"question: {q} answer: {a}" for q, a in zip(evidence_list, evidence_responses_list)
+        )
+        return evidence_answer_pairs, evidence_extracts
+
+    def hypotheses_due(self) -> bool:
+        """Hypotheses are regenerated every `hypothesis_interval` criteria"""
+        return self.criteria_answered % max(self.hypothesis_interval, 1) == 0
+
+    def _question_messages(self, question_prompt: str) -> List[Dict]:
+        """The changing part of a question request, the current hypotheses and the question, sent after
+        the static QUESTION_SYSTEM_BLOCKS so that prefix can be cached"""
+        return [
+            {"role": "user", "content": CURRENT_HYPOTHESES_PROMPT.format(hypotheses=self.hypotheses) + "\n\n" +
+                question_prompt}
+        ]
+
+    def _answer(self, question_prompt: str) -> str:
+        return self._call_llm(self._question_messages(question_prompt), system_blocks=QUESTION_SYSTEM_BLOCKS)
+
+    def _regenerate_hypotheses(self, question: str, answer: str, question_prompt: str) -> None:
+        hypo_messages = [
+            {"role": "user", "content": REGENERATE_HYPOTHESIS_INSTRUCTIONS.format(
+                    hypotheses=self.hypotheses,
+                    questions_and_answers=question + answer,
+                ) + "\n\n" +
+                question_prompt}
+        ]
+        self.hypotheses = self._call_llm(hypo_messages, system_blocks=[CORE_SCOUT_PERSONA])
+
+    def _answer_with_hypotheses(self, question_prompt: str) -> str | None:
+        """
+        Answer the question and regenerate the hypotheses in one structured call.
+        Returns None if the model's output cannot be parsed, so the caller can fall back to two calls.
+        """
+        messages = self._question_messages(question_prompt + "\n\n" + USER_QUESTION_AND_HYPOTHESES_PROMPT)
+        response_text = self._call_llm(messages, system_blocks=QUESTION_SYSTEM_BLOCKS)
+        structured_answer = parse_criterion_answer(response_text)
+        if structured_answer is None:
+            logger.warning("Structured answer was malformed, falling back to separate answer and hypothesis calls")
+            return None
+
+        self.hypotheses = "\n".join(structured_answer.hypotheses)
+        return f"{structured_answer.justification} [{structured_answer.rating.value.title()}]"
+
+    def evidence_fingerprint(self, question: str, evidence: str = None, k=3) -> str:
+        """Run retrieval only, fingerprinting the evidence `answer_question` would be given"""
+        filters = {"project": str(self.project.id)}
+        extracts = []
+        for query in [*split_evidence(evidence), question]:
+            extracts.extend(self.retrieve_extracts(query, k=k, filters=filters))
+        return compute_evidence_fingerprint(extracts)
+
     def answer_question(
         self,
         question: str,
         evidence: str = None,
         k=3,
     ) -> Tuple:
-        """Question answering logic for llms with error handling and retries"""
+        """
+        Question answering logic for llms with error handling and retries.
+        Returns the answer, the IDs of the chunks it cites and a fingerprint of all the evidence used.
+        """
 
         try:
             # do q and a for each evidence point
-            if evidence:
-                evidence_list = [
-                    item for item in evidence.split("_") if len(item) >= 5]
-                evidence_responses_list = []
-                for evidence_item in evidence_list:
-                    extracts_prompt, extracts = self.semantic_search(
-                        evidence_item, k=k, filters={
-                            "project": str(self.project.id)}
-                    )
-
-                    # Create the message for Bedrock using Claude's expected format
-                    evidence_messages = [
-                        {
-                            "role": "assistant",
-                            "content": SYSTEM_EVIDENCE_POINTS_PROMPT
-                        },
-                        {
-                            "role": "user",
-                            "content": USER_EVIDENCE_POINTS_PROMPT.format(
-                                question=question, extracts=extracts_prompt
-                            )
-                        }
-                    ]
-                    # Build the request for Bedrock.
-                    request_body = self._build_bedrock_request(evidence_messages)
-
-                    # Make the Bedrock API call
-                    evidence_response = self._invoke_bedrock_model(request_body)
-
-                    # Parse the response
-                    response_body = json.loads(
-                        evidence_response["body"].read().decode())
-                    message_content = response_body["content"][0]["text"]
-
-                    evidence_responses_list.append(message_content)
-                evidence_answer_pairs = [
-                    f"question: {q} answer: {a}" for q, a in zip(evidence_list, evidence_responses_list)
-                ]
-            else:
-                evidence_answer_pairs = "None"
+            evidence_answer_pairs, evidence_extracts = self.answer_evidence_points(question, evidence, k=k)
 
             # get an overall final answer using the answers to the earlier points
-            extracts_prompt, extracts = self.semantic_search(
-                question, k=k, filters={"project": str(self.project.id)})
-            chunks = [extract['metadata']['uuid'] for extract in extracts]
-
-            # Create the message for Bedrock using Claude's expected format
-            question_messages = [
-                {"role": "user", "content": SYSTEM_QUESTION_PROMPT + "\n\n" +
-                    SYSTEM_HYPOTHESIS_PROMPT.format(hypotheses=self.hypotheses) + "\n\n" +
-                    USER_QUESTION_PROMPT.format(
-                        question=question,
-                        extracts=extracts,
-                        evidence_point_answers=evidence_answer_pairs,
-                    )}
-            ]
-            # Build request and invoke model
-            request_body = self._build_bedrock_request(question_messages)
-            question_response = self._invoke_bedrock_model(request_body)
-           
-            # Parse the response
-            response_body = json.loads(
-                question_response["body"].read().decode())
-            answer = response_body["content"][0]["text"]
-
-            # Create a request for Bedrock using Claude's expected format
-            hypo_messages = [
-                {"role": "user", "content": CORE_SCOUT_PERSONA + "\n\n" +
-                    USER_REGENERATE_HYPOTHESIS_PROMPT.format(
-                        hypotheses=self.hypotheses,
-                        questions_and_answers=question + answer,
-                    ) + "\n\n" +
-                    USER_QUESTION_PROMPT.format(
-                        question=question,
-                        extracts=extracts,
-                        evidence_point_answers=evidence_answer_pairs,
-                    )}
-            ]
-            # Build the request for Bedrock.
-            hypo_request_body = self._build_bedrock_request(hypo_messages)
-
-            # Make the Bedrock API call
-            hypotheses_response = self._invoke_bedrock_model(hypo_request_body)
+            extracts = self.retrieve_extracts(question, k=k, filters={"project": str(self.project.id)})
+            # Knowledge Base passages from one document share a chunk, which the result cites once
+            chunks = list(dict.fromkeys(get_extract_id(extract) for extract in extracts))
+            self.emit("retrieval_done", message=f"{len(evidence_extracts) + len(extracts)} extracts retrieved")
+            question_prompt = self.prompt_builder.build(
+                USER_QUESTION_PROMPT,
+                self.render_extracts(extracts),
+                name="question prompt",
+                question=question,
+                evidence_point_answers=evidence_answer_pairs,
+            )
 
-            # Parse the response
-            hypo_response_body = json.loads(
-                hypotheses_response["body"].read().decode())
-            self.hypotheses = hypo_response_body["content"][0]["text"]
+            update_hypotheses = self.hypotheses_due()
+            answer = None
+            if self.evaluation_mode == "single_call" and update_hypotheses:
+                answer = self._answer_with_hypotheses(question_prompt)
+            if answer is None:
+                answer = self._answer(question_prompt)
+                if update_hypotheses:
+                    self._regenerate_hypotheses(question, answer, question_prompt)
 
-            return (answer, chunks)
+            self.criteria_answered += 1
+            self.emit("llm_done")
+            return (answer, chunks, compute_evidence_fingerprint(evidence_extracts + extracts))
 
         except Exception as e:
             logger.error(f"An error occurred: {str(e)}")
@@ -230,10 +661,115 @@ class MainEvaluator(BaseEvaluator):
         vector_store: VectorStore,
         llm: Any,
         storage_handler: BaseStorageHandler,
+        retrieval_cache: RetrievalCache = retrieval_cache,
+        query_embedding_cache: QueryEmbeddingCache = None,
+        category_summaries: Any = category_summaries,
+        prompt_token_budget: int = None,
+        evaluation_mode: str = None,
+        hypothesis_interval: int = None,
+        summary_token_budget: int = None,
+        summary_concurrency: int = 4,
+        rate_limiter: Any = None,
+        event_callback: Optional[Callable[..., None]] = None,
+        stage_model_ids: Optional[Dict[str, str]] = None,
+        relevance_threshold: Optional[float] = None,
+        adaptive_k: bool = None,
+        batch_size: int = None,
+        cluster_pool_size: int = None,
+        rerank_latency_budget: float = None,
+        rerank_margin: float = None,
+        search_type: str = None,
+        file_k: int = None,
     ):
-        """Initialise the evaluator"""
+        """
+        Initialise the evaluator
+
+        Args:
+            evaluation_mode: "two_call" asks for the answer and the updated hypotheses in separate calls,
+                "single_call" asks for both in one structured call. "batched" answers up to `batch_size`
+                criteria of the same category in one call, sharing their extracts, in `evaluate_questions`.
+                Defaults to SCOUT_EVALUATION_MODE.
+            hypothesis_interval: regenerate hypotheses every N criteria. Defaults to SCOUT_HYPOTHESIS_INTERVAL.
+            category_summaries: store of category summaries, whose `get` and `set` take the project ID, category
+                and a hash of the summary's inputs. Defaults to the project's summaries persisted in Postgres.
+            rate_limiter: optional object whose `acquire()` is called before every LLM request, blocking
+                until the request fits within a shared rate budget
+            event_callback: optional callable, called as `event_callback(stage, **details)` as each criterion
+                is started, retrieved, answered and saved
+            stage_model_ids: model to use for each stage ("evidence", "question", "summary"), e.g. a smaller
+                model for evidence points. Stages without one use SCOUT_<STAGE>_MODEL_ID or AWS_BEDROCK_MODEL_ID.
+            relevance_threshold: evidence points whose best extract has a lower score with the full reranker
+                are answered "no evidence" without calling the LLM. Scores from the tiny reranker, or none, are
+                not compared with it. Defaults to SCOUT_RELEVANCE_THRESHOLD, unset to always call the LLM.
+            adaptive_k: keep as many extracts as score close to the best one, rather than exactly k.
+                Defaults to SCOUT_ADAPTIVE_K, off unless set.
+            batch_size: most criteria answered in one call in "batched" mode. Defaults to SCOUT_BATCH_SIZE.
+            cluster_pool_size: most candidates retrieved for a cluster of similar criteria, whose members
+                rerank the shared pool, e.g. 60. 0 turns shared retrieval off. Defaults to
+                SCOUT_CLUSTER_POOL_SIZE, off unless set.
+            rerank_latency_budget: seconds a query's rerank may take, choosing the full or tiny reranker or
+                none to fit. Defaults to SCOUT_RERANK_LATENCY_BUDGET, unset to always use the full reranker.
+            rerank_margin: skip reranking when the k-th extract's similarity beats the next by this much.
+                Defaults to SCOUT_RERANK_SKIP_MARGIN, unset to always rerank.
+            search_type: "similarity" searches the vector store alone, "hybrid" fuses its candidates with
+                full-text matches from the storage handler before reranking. Defaults to SCOUT_SEARCH_TYPE.
+            file_k: search only the chunks of the file_k files whose summaries best match each query, picked
+                from the file summary index. 0 searches every file. Defaults to SCOUT_SUMMARY_FILE_K.
+        """
         self.hypotheses = "None"
+        self.evaluation_mode = evaluation_mode or os.getenv("SCOUT_EVALUATION_MODE", "two_call")
+        if self.evaluation_mode not in ("two_call", "single_call", "batched"):
+            raise ValueError(f"evaluation_mode of {self.evaluation_mode} not allowed.")
+        self.hypothesis_interval = hypothesis_interval or int(os.getenv("SCOUT_HYPOTHESIS_INTERVAL", "1"))
+        self.criteria_answered = 0
+        self.batch_size = batch_size or int(os.getenv("SCOUT_BATCH_SIZE", "5"))
+        self.rate_limiter = rate_limiter
+        self.event_callback = event_callback
+        self.stage_model_ids = stage_model_ids or {}
+        self.stage_stats = {}
+        self._stage_stats_lock = threading.Lock()
+        self.relevance_threshold = (
+            relevance_threshold if relevance_threshold is not None
+            else _optional_float(os.getenv("SCOUT_RELEVANCE_THRESHOLD"))
+        )
+        self.adaptive_k = (
+            adaptive_k if adaptive_k is not None
+            else os.getenv("SCOUT_ADAPTIVE_K", "false").lower() == "true"
+        )
+        self.cluster_pool_size = (
+            cluster_pool_size if cluster_pool_size is not None
+            else int(os.getenv("SCOUT_CLUSTER_POOL_SIZE", "0"))
+        )
+        self.rerank_latency_budget = (
+            rerank_latency_budget if rerank_latency_budget is not None
+            else _optional_float(os.getenv("SCOUT_RERANK_LATENCY_BUDGET"))
+        )
+        self.rerank_margin = (
+            rerank_margin if rerank_margin is not None else _optional_float(os.getenv("SCOUT_RERANK_SKIP_MARGIN"))
+        )
+        self.search_type = search_type or os.getenv("SCOUT_SEARCH_TYPE", "similarity")
+        if self.search_type not in ("similarity", "hybrid"):
+            raise ValueError(f"search_type of {self.search_type} not allowed.")
+        self.file_k = file_k if file_k is not None else int(os.getenv("SCOUT_SUMMARY_FILE_K", "0"))
+        self.cluster_pools: Dict[int, List] = {}
+        self.query_clusters: Dict[str, int] = {}
+        self.summary_token_budget = summary_token_budget or int(os.getenv("SCOUT_SUMMARY_TOKEN_BUDGET", "12000"))
+        self.summary_concurrency = summary_concurrency
+        self.category_summaries = category_summaries
         self.vector_store = vector_store
+        embedding_function = getattr(vector_store, "embeddings", None)
+        self.summary_index = (
+            FileSummaryIndex(embedding_function) if self.file_k and embedding_function is not None else None
+        )
+        self.retrieval_cache = retrieval_cache
+        self.query_embedding_cache = query_embedding_cache or get_query_embedding_cache()
+        # Query vectors keyed by normalised query
+        self.query_embeddings: Dict[str, List[float]] = {}
+        self._chunk_set_version: Optional[int] = None
+        self.file_metadata_cache: Dict[UUID, FileMetadata] = {}
+        self.prompt_builder = PromptBuilder(
+            token_budget=prompt_token_budget or int(os.getenv("SCOUT_PROMPT_TOKEN_BUDGET", "8000"))
+        )
 
         # Initialize Bedrock client if not provided
         if not hasattr(llm, 'invoke_model'):
@@ -251,6 +787,7 @@ class MainEvaluator(BaseEvaluator):
 
     def evaluate_question(self, criterion: CriterionCreate, k: int = 3, save: bool = False) -> ResultCreate:
         """Get answers to a single question"""
+        self.emit("started", criterion_id=criterion.id)
         model_output = self.model(criterion=criterion)
 
         chunks_list = [
@@ -262,25 +799,162 @@ class MainEvaluator(BaseEvaluator):
             answer=model_output[0],
             full_text=model_output[1],
             chunks=chunks_list,  # Already UUIDs from model_output[2]
+            evidence_fingerprint=model_output[3],
         )
 
         if save:
             result = self.storage_handler.write_item(result)
+            self.emit("saved", criterion_id=criterion.id, result_id=result.id)
 
         return result
 
-    def evaluate_questions(self, criteria: List[CriterionCreate], k: int = 3, save: bool = True) -> List[ResultCreate]:
-        """Get answers to a list of questions"""
+    def evaluate_batch(self, criteria: List[CriterionCreate], k: int = 3, save: bool = False) -> List[ResultCreate]:
+        """
+        Answer several criteria in one call, sharing one copy of the system prompt and their merged extracts.
+        Evidence points are still answered per criterion. Any criterion missing from the batched answer,
+        or whose answer is malformed, is answered again on its own.
+        """
+        filters = {"project": str(self.project.id)}
+        prepared = []
+        for criterion in criteria:
+            self.emit("started", criterion_id=criterion.id)
+            evidence_answer_pairs, evidence_extracts = self.answer_evidence_points(
+                criterion.question, criterion.evidence, k=k
+            )
+            extracts = self.retrieve_extracts(criterion.question, k=k, filters=filters)
+            self.emit(
+                "retrieval_done",
+                criterion_id=criterion.id,
+                message=f"{len(evidence_extracts) + len(extracts)} extracts retrieved",
+            )
+            prepared.append((criterion, evidence_answer_pairs, evidence_extracts, extracts))
+
+        # Interleave the criteria's extracts so each keeps its best ones within the token budget
+        merged_extracts = deduplicate_extracts(
+            [extract for extract in chain.from_iterable(zip_longest(*(p[3] for p in prepared))) if extract is not None]
+        )
+        questions = "\n".join(
+            BATCH_QUESTION_ITEM.format(
+                number=number, question=criterion.question, evidence_point_answers=evidence_answer_pairs
+            )
+            for number, (criterion, evidence_answer_pairs, _, _) in enumerate(prepared, start=1)
+        )
+        batch_prompt = self.prompt_builder.build(
+            USER_BATCH_QUESTIONS_PROMPT,
+            self.render_extracts(merged_extracts),
+            name=f"batched question prompt for {len(criteria)} criteria",
+            questions=questions,
+        )
+        batch_answers = parse_batch_answers(
+            self._call_llm(self._question_messages(batch_prompt), system_blocks=QUESTION_SYSTEM_BLOCKS)
+        )
+
+        results = []
+        answered = []
+        for number, (criterion, evidence_answer_pairs, evidence_extracts, extracts) in enumerate(prepared, start=1):
+            batch_answer = batch_answers.get(number)
+            if batch_answer is not None:
+                full_text = f"{batch_answer.justification} [{batch_answer.rating.value.title()}]"
+            else:
+                logger.warning(f"Batched answer for criterion {criterion.id} was malformed, answering it on its own")
+                full_text = self._answer(
+                    self.prompt_builder.build(
+                        USER_QUESTION_PROMPT,
+                        self.render_extracts(extracts),
+                        name="question prompt",
+                        question=criterion.question,
+                        evidence_point_answers=evidence_answer_pairs,
+                    )
+                )
+            self.emit("llm_done", criterion_id=criterion.id)
+            answered.append(criterion.question + full_text)
+
+            answer, full_text = split_rating(full_text)
+            result = ResultCreate(
+                criterion=criterion.id,
+                project=self.project.id,
+                answer=answer,
+                full_text=full_text,
+                chunks=list(dict.fromkeys(get_extract_id(extract) for extract in extracts)),
+                evidence_fingerprint=compute_evidence_fingerprint(evidence_extracts + extracts),
+            )
+            if save:
+                result = self.storage_handler.write_item(result)
+                self.emit("saved", criterion_id=criterion.id, result_id=result.id)
+            results.append(result)
+
+        # Hypotheses are updated once per batch, if they fall due for any of its criteria
+        if any(
+            (self.criteria_answered + offset) % max(self.hypothesis_interval, 1) == 0
+            for offset in range(len(criteria))
+        ):
+            self._regenerate_hypotheses("", "\n".join(answered), batch_prompt)
+        self.criteria_answered += len(criteria)
+        return results
+
+    def reevaluate_question(
+        self,
+        criterion: CriterionCreate,
+        existing_result: Optional[Result],
+        k: int = 3,
+        save: bool = True,
+        force: bool = False,
+    ) -> Optional[ResultCreate | ResultUpdate]:
+        """
+        Evaluate a criterion unless its existing result was based on the same evidence, or always if `force`.
+        Returns the new or updated result, or None if the existing result is still current.
+        """
+        self.start_run()
+        if (
+            not force
+            and existing_result is not None
+            and existing_result.evidence_fingerprint
+            == self.evidence_fingerprint(criterion.question, criterion.evidence, k=k)
+        ):
+            self.emit("unchanged", criterion_id=criterion.id, result_id=existing_result.id)
+            return None
+
+        result = self.evaluate_question(criterion, k, save=save and existing_result is None)
+        if existing_result is not None:
+            result = ResultUpdate(id=existing_result.id, **result.model_dump())
+            if save:
+                self.storage_handler.update_item(result)
+                self.emit("saved", criterion_id=criterion.id, result_id=existing_result.id)
+        return result
+
+    def evaluate_questions(
+        self,
+        criteria: List[CriterionCreate],
+        k: int = 3,
+        save: bool = True,
+        summarise: bool = True,
+    ) -> List[ResultCreate]:
+        """Get answers to a list of questions, optionally summarising them into the project's results summary"""
         results = []
         question_answer_pairs = []
+        self.start_run()
+        if self.vector_store is not None:
+            self.prepare_retrievals(criteria, k=k)
         logger.info("Evaluating questions...")
-        for idx, criterion in enumerate(criteria):
-            result = self.evaluate_question(criterion, k, save)
-            results.append(result)
-            question_answer_pairs.append(
-                (criterion.question, result.full_text))
-            if idx % 5 == 0:
-                logger.info(f"{idx} criteria complete")
+        if self.evaluation_mode == "batched":
+            batches = group_criteria_into_batches(criteria, self.batch_size)
+        else:
+            batches = [[idx] for idx in range(len(criteria))]
+        for batch in batches:
+            batch_criteria = [criteria[idx] for idx in batch]
+            if len(batch) > 1:
+                batch_results = self.evaluate_batch(batch_criteria, k, save)
+            else:
+                batch_results = [self.evaluate_question(batch_criteria[0], k, save)]
+            results.extend(batch_results)
+            question_answer_pairs.extend(
+                (criterion.question, result.full_text, criterion.category)
+                for criterion, result in zip(batch_criteria, batch_results)
+            )
+            if len(results) % 5 < len(batch):
+                logger.info(f"{len(results)} criteria complete")
+        if not summarise:
+            return results
         logger.info("Generating summary of answers...")
         # Generate summary of answers
         summary = self.generate_summary(question_answer_pairs)
@@ -295,62 +969,130 @@ class MainEvaluator(BaseEvaluator):
         else:
             self.project.results_summary = summary
         self.storage_handler.update_item(self.project)
+        for stage, stats in self.stage_stats.items():
+            logger.info(f"LLM usage for {stage}: {stats}")
         return results
 
-    def generate_summary(self, question_answer_pairs: List[tuple]) -> str:
-        """Generate a summary of the answers using an LLM, with an input prompt containing instructions."""
+    def _summarise(self, prompt: str) -> str:
+        """Summarise with the LLM, reusing the cached summary if the summary model has seen this exact prompt"""
+        key = (self.model_for_stage(SUMMARY_STAGE), hashlib.sha256(prompt.encode("utf-8")).hexdigest())
+        summary = summary_cache.get(key)
+        if summary is None:
+            summary = self._call_llm([{"role": "user", "content": prompt}], stage=SUMMARY_STAGE)
+            summary_cache.set(key, summary)
+        return summary
 
-        SUMMARIZE_RESPONSES_PROMPT = """You are a project delivery expert, you will be given question and answer pairs about a government project. Return a summary of the most important themes, you do not need to summarise all the questions, only return important, specific information. Be specific about project detail referred to. Return no more than 3 sentences. {qa_pairs}"""
+    def _pack_to_budget(self, items: List[str], template: str, **fields) -> List[List[str]]:
+        """Split items into batches whose prompts each fit within the summary token budget"""
+        base_tokens = count_tokens(template.format(**{key: "" for key in fields}))
+        batches, batch, batch_tokens = [], [], base_tokens
+        for item in items:
+            item_tokens = count_tokens(item)
+            if batch and batch_tokens + item_tokens > self.summary_token_budget:
+                batches.append(batch)
+                batch, batch_tokens = [], base_tokens
+            batch.append(item)
+            batch_tokens += item_tokens
+        if batch:
+            batches.append(batch)
+        return batches
 
-        formatted_input = ", ".join(
-            [f"Question: {qa[0]}\nAnswer: {qa[1]}" for qa in question_answer_pairs])
-        
-        
-        logger.info(f"generate_summary formatted_input...{formatted_input}")
-        
-        # Create the message for Bedrock using Claude's expected format
-        summary_messages = [
-                {
-                    "role": "user",
-                    "content": SUMMARIZE_RESPONSES_PROMPT.format(qa_pairs=formatted_input)
-                }
-            ]
+    def _map_reduce(self, items: List[str], template: str, field: str, **fields) -> str:
+        """Summarise items within the token budget, summarising batches and then their summaries if needed"""
+        if not items:
+            return ""
+        batches = self._pack_to_budget(items, template, **{field: "", **fields})
+        prompts = [template.format(**{field: "\n".join(batch), **fields}) for batch in batches]
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Summarising %s items in %s prompts of ~%s tokens",
+                len(items),
+                len(prompts),
+                max(map(count_tokens, prompts)),
+            )
+        with ThreadPoolExecutor(max_workers=self.summary_concurrency) as executor:
+            summaries = list(executor.map(self._summarise, prompts))
+        if len(summaries) == 1:
+            return summaries[0]
+        return self._reduce(summaries)
 
-        # Build request and invoke model
-        request_body = self._build_bedrock_request(summary_messages)
-        response = self._invoke_bedrock_model(request_body)
+    def _reduce(self, summaries: List[str]) -> str:
+        """Reduce summaries into one, trimming them first if no two fit within the summary token budget together"""
+        if len(self._pack_to_budget(summaries, REDUCE_SUMMARIES_PROMPT, summaries="")) < len(summaries):
+            return self._map_reduce(summaries, REDUCE_SUMMARIES_PROMPT, "summaries")
+        # Summarising one summary per prompt would never reduce their number, so trim them to fit in pairs
+        max_tokens = (self.summary_token_budget - count_tokens(REDUCE_SUMMARIES_PROMPT.format(summaries=""))) // 2
+        if max_tokens <= 0:
+            logger.warning("Summary token budget is too small to reduce %s summaries; joining them", len(summaries))
+            return "\n\n".join(summaries)
+        logger.warning("Trimming %s summaries to %s tokens to reduce them together", len(summaries), max_tokens)
+        trimmed = [truncate_to_tokens(summary, max_tokens) for summary in summaries]
+        return self._map_reduce(trimmed, REDUCE_SUMMARIES_PROMPT, "summaries")
 
-        # Parse the response
-        response_body = json.loads(response["body"].read().decode())
-        return response_body["content"][0]["text"]
+    def _category_input_hash(self, qa_pairs: List[str]) -> str:
+        """Hash everything a category summary depends on: its answers, prompt, model and token budget"""
+        inputs = {
+            "qa_pairs": qa_pairs,
+            "prompt": SUMMARISE_CATEGORY_PROMPT,
+            "model_id": self.model_for_stage(SUMMARY_STAGE),
+            "summary_token_budget": self.summary_token_budget,
+        }
+        return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def generate_category_summaries(self, question_answer_pairs: List[tuple]) -> Dict[str, str]:
+        """Summarise the question/answer pairs for each criterion category concurrently"""
+        categories: Dict[str, List[str]] = {}
+        for qa in question_answer_pairs:
+            category = qa[2] if len(qa) > 2 and qa[2] else "General"
+            categories.setdefault(category, []).append(f"Question: {qa[0]}\nAnswer: {qa[1]}")
+
+        project_id = getattr(self.project, "id", None)
+
+        def summarise_category(category: str) -> str:
+            qa_pairs = sorted(categories[category])
+            input_hash = self._category_input_hash(qa_pairs)
+            summary = self.category_summaries.get(project_id, category, input_hash)
+            if summary is None:
+                summary = self._map_reduce(qa_pairs, SUMMARISE_CATEGORY_PROMPT, "qa_pairs", category=category)
+                self.category_summaries.set(project_id, category, input_hash, summary)
+            return summary
+
+        with ThreadPoolExecutor(max_workers=self.summary_concurrency) as executor:
+            summaries = executor.map(summarise_category, sorted(categories))
+            return dict(zip(sorted(categories), summaries))
+
+    def generate_summary(self, question_answer_pairs: List[tuple]) -> str:
+        """
+        Generate a summary of the answers using an LLM, with an input prompt containing instructions.
+
+        Question/answer pairs may carry their criterion category as a third element. Each category is
+        summarised separately and the category summaries are then reduced into one, keeping every prompt
+        within the summary token budget. Category summaries are stored by a hash of their inputs, so after
+        re-running a single criterion only its category and the final reduction are regenerated.
+        """
+        if not any(len(qa) > 2 for qa in question_answer_pairs):
+            qa_pairs = [f"Question: {qa[0]}\nAnswer: {qa[1]}" for qa in question_answer_pairs]
+            return self._map_reduce(qa_pairs, SUMMARISE_RESPONSES_PROMPT, "qa_pairs")
+
+        category_summaries = self.generate_category_summaries(question_answer_pairs)
+        logger.info(f"Generated summaries for {len(category_summaries)} categories")
+        if len(category_summaries) == 1:
+            return next(iter(category_summaries.values()))
+        return self._reduce([f"{category}: {summary}" for category, summary in category_summaries.items()])
 
     def _define_model(self):
         """Define the model that is the evaluator"""
 
         def model(criterion: CriterionCreate, k: int = 3):
-            full_text, chunks = self.answer_question(
+            full_text, chunks, evidence_fingerprint = self.answer_question(
                 question=criterion.question,
                 evidence=criterion.evidence,
                 k=k,
             )
 
-            # Find words within brackets and standalone words
-            extracted_words = re.findall(
-                r"\[(positive|neutral|negative)\]|\b(positive|neutral|negative)\b", full_text, re.IGNORECASE)
-
-            if extracted_words:
-                # Extract the last occurrence, regardless of format
-                last_match = [
-                    match for tup in extracted_words for match in tup if match]
-                answer = last_match[-1].title()
-
-                # Remove occurrences of words and brackets
-                full_text = re.sub(
-                    r"\[?(positive|neutral|negative)\]?", "", full_text, flags=re.IGNORECASE).strip()
-            else:
-                answer = "None"
+            answer, full_text = split_rating(full_text)
 
-            return (answer, full_text, chunks)
+            return (answer, full_text, chunks, evidence_fingerprint)
 
         self.model = model
         return model
@@ -0,0 +1,95 @@
+import os
+from typing import Any, List
+
+from langchain_core.retrievers import BaseRetriever
+
+from scout.DataIngest.models.schemas import ChunkCreate, FileCreate
+from scout.LLMFlag.evaluation import MainEvaluator
+from scout.utils.utils import logger
+
+
+class KBMainEvaluator(MainEvaluator):
+    """MainEvaluator that retrieves extracts from an AWS Bedrock Knowledge Base rather than a vector store"""
+
+    def __init__(self, retriever: BaseRetriever, chat_llm: Any, **kwargs):
+        """
+        Args:
+            retriever: Knowledge Base retriever, e.g. AmazonKnowledgeBasesRetriever
+            chat_llm: LangChain chat model used by `get_llm_response`
+        """
+        self.retriever = retriever
+        self.chat_llm = chat_llm
+        super().__init__(vector_store=None, llm=chat_llm, **kwargs)
+
+    @property
+    def retrieval_settings(self) -> dict:
+        return {**super().retrieval_settings, "retriever": type(self.retriever).__name__}
+
+    def search(self, query: str, k: int, filters: dict) -> List[dict]:
+        """
+        Retrieve extracts from the Knowledge Base, registering each source document as a file and chunk of the
+        project so results can cite it. `retrieve` caches the extracts, so each query reaches the Knowledge Base
+        once per evaluation, however often it is fingerprinted and answered.
+        """
+        logger.info(f"Query: {query}")
+        documents = self.retriever.get_relevant_documents(query)
+        logger.info(f"Number of relevant documents: {len(documents)}")
+
+        extracts = []
+        for i, doc in enumerate(documents):
+            # Extract source_metadata dictionary
+            source_metadata = doc.metadata.get("source_metadata", {})
+            source_uri = source_metadata.get("x-amz-bedrock-kb-source-uri")
+
+            # Parse the S3 URI
+            bucket_name = source_uri.split("/")[2]
+            object_key = "/".join(source_uri.split("/")[3:])
+            if not bucket_name or not object_key:
+                logger.warning("S3 bucket or key not found in metadata")
+                continue
+
+            file_name = object_key.split("/")[-1]
+
+            file_create = FileCreate(
+                name=file_name,
+                s3_key=object_key,
+                type=os.path.splitext(file_name)[1],
+                project_id=self.project.id,
+                s3_bucket=os.environ["BUCKET_NAME"],
+            )
+            file = self.storage_handler.write_item(file_create)
+
+            chunk = ChunkCreate(
+                file=file,
+                idx=0,
+                text=object_key,
+                page_num=0,
+            )
+
+            created_chunk = self.storage_handler.write_item(chunk)
+
+            source = doc.metadata.get("source", "Unknown")
+
+            # Create document ID from source or use a default
+            doc_id = source.split("/")[-1] if source else f"document_{i+1}"
+
+            extracts.append(
+                {
+                    "content": doc.page_content,
+                    "metadata": {
+                        "uuid": created_chunk.id,
+                        "parent_doc_uuid": file.id,
+                        "source": source,
+                        "document_id": doc_id,
+                        "score": doc.metadata.get("score", 0),
+                        "file_id": file.id,
+                    },
+                }
+            )
+
+        return extracts
+
+    def get_llm_response(self, messages):
+        # Override to use the LangChain LLM
+        response = self.chat_llm.invoke(messages)
+        return response.content
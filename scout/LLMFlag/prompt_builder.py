@@ -0,0 +1,128 @@
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+import tiktoken
+
+from scout.DataIngest.models.schemas import FileMetadata
+from scout.LLMFlag.prompts import DOCUMENT_EXTRACTS_HEADER, DOCUMENT_SUMMARY_PROMPT, COMPACT_EXTRACT_PROMPT
+from scout.utils.utils import logger
+
+encoding = tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str) -> int:
+    """Estimate the number of tokens in a piece of text"""
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    if max_tokens <= 0:
+        return ""
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+
+def get_extract_metadata(extract: Any) -> dict:
+    """Extracts are LangChain Documents from the vector store, or dicts from the Bedrock KB retriever"""
+    if isinstance(extract, dict):
+        return extract.get("metadata", {})
+    return extract.metadata
+
+
+def get_extract_text(extract: Any) -> str:
+    if isinstance(extract, dict):
+        return extract.get("content", "")
+    return extract.page_content
+
+
+def get_extract_id(extract: Any) -> Optional[str]:
+    uuid = get_extract_metadata(extract).get("uuid")
+    return str(uuid) if uuid is not None else None
+
+
+def get_extract_file_id(extract: Any) -> Optional[UUID]:
+    parent_doc_uuid = get_extract_metadata(extract).get("parent_doc_uuid")
+    return UUID(str(parent_doc_uuid)) if parent_doc_uuid else None
+
+
+def deduplicate_extracts(extracts: List[Any]) -> List[Any]:
+    """
+    Remove repeated extracts, keeping rank order. An extract repeats one seen before when both its chunk ID
+    and its text match, as Knowledge Base passages from one document can share a chunk ID.
+    """
+    seen = set()
+    unique_extracts = []
+    for extract in extracts:
+        key = (get_extract_id(extract), get_extract_text(extract))
+        if key in seen:
+            continue
+        seen.add(key)
+        unique_extracts.append(extract)
+    return unique_extracts
+
+
+def render_extracts(extracts: List[Any], files: Dict[UUID, FileMetadata]) -> List[str]:
+    """
+    Render extracts compactly: one block per extract with its document name, source and date,
+    and each document's summary given once, the first time that document appears.
+    """
+    blocks = []
+    summarised_files = set()
+    for number, extract in enumerate(deduplicate_extracts(extracts), start=1):
+        file = files.get(get_extract_file_id(extract))
+        if file is not None:
+            file_name, source, date = file.clean_name or file.name, file.source, file.published_date
+        else:
+            metadata = get_extract_metadata(extract)
+            file_name, source, date = metadata.get("document_id") or metadata.get("source"), None, None
+
+        block = ""
+        if file is not None and file.summary and file.id not in summarised_files:
+            summarised_files.add(file.id)
+            block += DOCUMENT_SUMMARY_PROMPT.format(file_name=file_name, summary=file.summary)
+        block += COMPACT_EXTRACT_PROMPT.format(
+            number=number,
+            file_name=file_name or "Unknown",
+            source=source or "unknown",
+            date=date or "unknown",
+            text=get_extract_text(extract).strip(),
+        )
+        blocks.append(block)
+    return blocks
+
+
+class PromptBuilder:
+    """
+    Assembles prompts from a template and ranked extract blocks, fitting the result to a token budget.
+
+    Extracts are added in rank order until the budget is reached; the last extract that fits only
+    partially is truncated and the rest are dropped.
+    """
+
+    def __init__(self, token_budget: int = 8000):
+        self.token_budget = token_budget
+
+    def build(self, template: str, extract_blocks: List[str], name: str = "prompt", **fields) -> str:
+        base_tokens = count_tokens(template.format(extracts=DOCUMENT_EXTRACTS_HEADER, **fields))
+        remaining = self.token_budget - base_tokens
+
+        kept_blocks = []
+        for block in extract_blocks:
+            block_tokens = count_tokens(block)
+            if block_tokens <= remaining:
+                kept_blocks.append(block)
+                remaining -= block_tokens
+                continue
+            truncated = truncate_to_tokens(block, remaining)
+            if truncated:
+                kept_blocks.append(truncated)
+            break
+
+        prompt = template.format(extracts=DOCUMENT_EXTRACTS_HEADER + "".join(kept_blocks), **fields)
+        logger.info(
+            f"Built {name} with ~{count_tokens(prompt)} tokens "
+            f"({len(kept_blocks)}/{len(extract_blocks)} extracts, budget {self.token_budget})"
+        )
+        return prompt
@@ -130,17 +130,20 @@ Extracts to answer query:
 =========
 Answer:"""
 
-SYSTEM_HYPOTHESIS_PROMPT = """
+SYSTEM_HYPOTHESIS_INSTRUCTIONS = """
 As you answer questions you should consider these three hypothesis about the project that have been formed from previous enquiries.
 They may not be relevent, you do not need to refernce them
 If these hypotheses are relevant to your answer you should consider referencing thier contents.
+"""
+
+# The changing part of the hypothesis prompt, sent after the static instructions
+CURRENT_HYPOTHESES_PROMPT = """<start of hypotheses>
 {hypotheses}
+<end of hypotheses>
 """
 
 
-USER_REGENERATE_HYPOTHESIS_PROMPT = (
-    CORE_SCOUT_PERSONA
-    + """
+REGENERATE_HYPOTHESIS_INSTRUCTIONS = """
 These hypotheses are currently held about this project.
 Hypotheses are used to support lines of enquiry during reviews of projects.
 Hypotheses should contain high level information only.
@@ -157,7 +160,6 @@ You should not update any hypotheses is the results are not very important to th
 You must return 3 hypotheses.
 Only return the hypotheses, do not return any other information.
 """
-)
 
 
 #
@@ -188,3 +190,61 @@ Published date: {date}
 Extract:{text}
 =======
 """
+# Compact rendering used by the prompt builder, document summaries are only given once per document
+DOCUMENT_SUMMARY_PROMPT = """
+Document "{file_name}" summary: {summary}"""
+COMPACT_EXTRACT_PROMPT = """
+[{number}] {file_name} (source: {source}, published: {date})
+{text}
+"""
+
+
+#
+# For answering a question and regenerating hypotheses in a single call
+#
+USER_QUESTION_AND_HYPOTHESES_PROMPT = """
+As well as answering the query, update the hypotheses held about this project.
+Hypotheses are used to support lines of enquiry during reviews of projects, should contain high level information only \
+and may be about positive or negative aspects of the project.
+Only change the hypotheses if your answer is important to the project or provides new insight not already covered.
+You must return 3 hypotheses.
+
+Return only valid JSON with the following structure:
+{
+    "justification": "one sentence explaining your reasoning",
+    "rating": "Positive | Neutral | Negative",
+    "hypotheses": ["hypothesis 1", "hypothesis 2", "hypothesis 3"]
+}
+"""
+
+USER_BATCH_QUESTIONS_PROMPT = """
+=========
+Queries:
+{questions}
+=========
+Extracts to answer the queries:
+{extracts}
+=========
+Answer every query above using the extracts and the further points listed under it.
+Return only a valid JSON array with one object per query, in the same order:
+[
+    {{"criterion": 1, "justification": "one sentence explaining your reasoning", "rating": "Positive | Neutral | Negative"}}
+]
+"""
+
+BATCH_QUESTION_ITEM = """{number}. {question}
+Further points to consider:
+{evidence_point_answers}
+"""
+
+
+#
+# For project results summaries
+#
+SUMMARISE_RESPONSES_PROMPT = """You are a project delivery expert, you will be given question and answer pairs about a government project. Return a summary of the most important themes, you do not need to summarise all the questions, only return important, specific information. Be specific about project detail referred to. Return no more than 3 sentences. {qa_pairs}"""
+
+SUMMARISE_CATEGORY_PROMPT = """You are a project delivery expert, you will be given question and answer pairs about the "{category}" aspects of a government project. Return a summary of the most important themes, you do not need to summarise all the questions, only return important, specific information. Be specific about project detail referred to. Return no more than 3 sentences. {qa_pairs}"""
+
+REDUCE_SUMMARIES_PROMPT = """You are a project delivery expert, you will be given summaries of the review findings for different aspects of a government project. Combine them into one summary of the most important themes across the project, only return important, specific information. Be specific about project detail referred to. Return no more than 3 sentences. {summaries}"""
+
+NO_EVIDENCE_ANSWER = """No evidence: none of the project documents retrieved are relevant to this point."""
@@ -0,0 +1,154 @@
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import onnxruntime as ort
+from flashrank import Ranker
+from flashrank import RerankRequest
+
+from scout.utils.utils import logger
+
+DEFAULT_RERANK_MODEL = "ms-marco-MiniLM-L-12-v2"
+TINY_RERANK_MODEL = "ms-marco-TinyBERT-L-2-v2"
+
+# Rerank tiers from cheapest to best, None meaning the vector search order is kept
+RERANK_TIERS = {"none": None, "tiny": TINY_RERANK_MODEL, "full": DEFAULT_RERANK_MODEL}
+
+# Starting estimates of the CPU seconds to score one (query, passage) pair, refined as reranks are timed
+_seconds_per_pair = {TINY_RERANK_MODEL: 0.001, DEFAULT_RERANK_MODEL: 0.01}
+_timing_lock = threading.Lock()
+
+_rankers: Dict[str, Ranker] = {}
+_ranker_lock = threading.Lock()
+
+
+def get_rerank_model(tier: str = "full") -> Optional[str]:
+    """The model for a rerank tier; the full tier's model can be changed with SCOUT_RERANK_MODEL"""
+    if tier == "full":
+        return os.getenv("SCOUT_RERANK_MODEL", DEFAULT_RERANK_MODEL)
+    return RERANK_TIERS[tier]
+
+
+def record_rerank_time(model_name: str, pairs: int, seconds: float) -> None:
+    """Update the running estimate of a model's time per pair"""
+    if pairs <= 0:
+        return
+    with _timing_lock:
+        previous = _seconds_per_pair.get(model_name, seconds / pairs)
+        _seconds_per_pair[model_name] = 0.8 * previous + 0.2 * seconds / pairs
+
+
+def estimate_rerank_seconds(model_name: str, pairs: int) -> float:
+    with _timing_lock:
+        return _seconds_per_pair.get(model_name, _seconds_per_pair[DEFAULT_RERANK_MODEL]) * pairs
+
+
+def choose_rerank_model(pairs: int, latency_budget: Optional[float] = None) -> Optional[str]:
+    """
+    The best rerank model expected to score `pairs` (query, passage) pairs within `latency_budget` seconds:
+    the full model, else the tiny model, else None to skip reranking. Without a budget the full model is used.
+    """
+    for tier in ("full", "tiny"):
+        model_name = get_rerank_model(tier)
+        if latency_budget is None or estimate_rerank_seconds(model_name, pairs) <= latency_budget:
+            return model_name
+    return None
+
+
+def _create_ranker(model_name: str) -> Ranker:
+    ranker = Ranker(model_name=model_name, cache_dir=".data")
+
+    # flashrank creates its ONNX session with default options, so recreate it with the configured threading
+    intra_op_threads = int(os.getenv("SCOUT_RERANK_INTRA_OP_THREADS", "0"))
+    inter_op_threads = int(os.getenv("SCOUT_RERANK_INTER_OP_THREADS", "0"))
+    session = getattr(ranker, "session", None)
+    if session is not None and (intra_op_threads or inter_op_threads):
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = inter_op_threads
+        ranker.session = ort.InferenceSession(
+            session._model_path, sess_options=options, providers=session.get_providers()
+        )
+    logger.info(
+        f"Loaded reranker {model_name} (intra-op threads {intra_op_threads or 'default'}, "
+        f"inter-op threads {inter_op_threads or 'default'})"
+    )
+    return ranker
+
+
+def get_ranker(model_name: str = None) -> Ranker:
+    """
+    Process-wide reranker for a model, loaded on first use.
+    Loading reads the ONNX model and tokenizer from disk, which can take longer than a rerank,
+    so every retriever in the process shares one. ONNX Runtime sessions can be run from several
+    threads at once.
+    """
+    model_name = model_name or get_rerank_model()
+    if model_name not in _rankers:
+        with _ranker_lock:
+            if model_name not in _rankers:
+                _rankers[model_name] = _create_ranker(model_name)
+    return _rankers[model_name]
+
+
+def rerank(query: str, passages: List[Dict[str, Any]], model_name: str = None) -> List[Dict[str, Any]]:
+    """Score passages ({"id": ..., "text": ...}) against a query, returning them best first with a "score" each"""
+    model_name = model_name or get_rerank_model()
+    ranker = get_ranker(model_name)
+    start = time.perf_counter()
+    results = ranker.rerank(RerankRequest(query=query, passages=passages))
+    record_rerank_time(model_name, len(passages), time.perf_counter() - start)
+    return results
+
+
+def rerank_many(
+    requests: List[Tuple[str, List[Dict[str, Any]]]], batch_size: int = 64, model_name: str = None
+) -> List[List[Dict[str, Any]]]:
+    """
+    Rerank the candidate passages of several queries together, scoring every (query, passage) pair in
+    batches of `batch_size` rather than one model call per query.
+
+    Args:
+        requests: (query, passages) pairs, where each passage is {"id": ..., "text": ...}
+
+    Returns:
+        For each request, copies of its passages best first, each with a "score"
+    """
+    model_name = model_name or get_rerank_model()
+    ranker = get_ranker(model_name)
+    if getattr(ranker, "session", None) is None:
+        # Listwise LLM rerankers have no pairwise model to batch
+        return [rerank(query, [dict(passage) for passage in passages], model_name) for query, passages in requests]
+
+    pairs = [(index, query, passage) for index, (query, passages) in enumerate(requests) for passage in passages]
+    started = time.perf_counter()
+    scores = []
+    for start in range(0, len(pairs), batch_size):
+        batch = pairs[start : start + batch_size]
+        encodings = ranker.tokenizer.encode_batch([[query, passage["text"]] for _, query, passage in batch])
+        input_ids = np.array([encoding.ids for encoding in encodings], dtype=np.int64)
+        attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+        token_type_ids = np.array([encoding.type_ids for encoding in encodings], dtype=np.int64)
+
+        onnx_input = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if not np.all(token_type_ids == 0):
+            onnx_input["token_type_ids"] = token_type_ids
+        logits = ranker.session.run(None, onnx_input)[0]
+
+        # As flashrank: a sigmoid over single logits, or the softmax probability of the relevant class
+        if logits.shape[1] == 1:
+            scores.extend(1 / (1 + np.exp(-logits.flatten())))
+        else:
+            exp_logits = np.exp(logits)
+            scores.extend(exp_logits[:, 1] / np.sum(exp_logits, axis=1))
+
+    record_rerank_time(model_name, len(pairs), time.perf_counter() - started)
+
+    results: List[List[Dict[str, Any]]] = [[] for _ in requests]
+    for (index, _, passage), score in zip(pairs, scores):
+        results[index].append({**passage, "score": float(score)})
+    for passages in results:
+        passages.sort(key=lambda passage: passage["score"], reverse=True)
+    return results
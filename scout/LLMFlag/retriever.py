@@ -1,20 +1,83 @@
 import copy
+from typing import Any
+from typing import Dict
 from typing import List
 from typing import Optional
+from typing import Tuple
+from uuid import UUID
 
-from flashrank import Ranker
-from flashrank import RerankRequest
 from langchain_core.callbacks import CallbackManagerForRetrieverRun
 from langchain_core.documents import Document
 from langchain_core.retrievers import BaseRetriever
 from langchain_core.vectorstores import VectorStore
 from pydantic import Field
 
+from scout.DataIngest.models.schemas import ChunkSearchResult
+from scout.DataIngest.models.schemas import ChunkText
+from scout.LLMFlag.reranker import choose_rerank_model
+from scout.LLMFlag.reranker import rerank as rerank_passages
+from scout.LLMFlag.reranker import rerank_many
+
+
+SIMILARITY_SCORE = "similarity_score"
+RERANK_SCORE = "rerank_score"
+# The reranker that gave `rerank_score`, as score scales differ between models
+RERANK_MODEL = "rerank_model"
+FUSION_SCORE = "fusion_score"
+# Reciprocal rank fusion constant, damping the weight of the top few ranks of each list
+RRF_K = 60
+# Filter keys the storage handler's full-text search can apply
+TEXT_SEARCH_FILTER_KEYS = {"project", "parent_doc_uuid"}
+
 
 class ReRankRetriever(BaseRetriever):
+    """
+    Retrieves k * 3 candidates from the vector store and reranks them, keeping the top k.
+    Each document's vector store relevance and reranker scores are added to its metadata, as
+    `similarity_score` and `rerank_score`, where the vector store can provide them, along with the
+    reranker used as `rerank_model`.
+
+    Given `candidates`, e.g. a pool retrieved once for a cluster of similar queries, those are reranked
+    instead of searching the vector store again.
+
+    With `adaptive_k`, the number kept follows the reranker scores instead: documents scoring at least
+    `score_ratio` of the best score are kept, from 1 up to `max_k`, so a clear winner returns fewer
+    extracts and a run of equally relevant ones returns more.
+
+    Given a `latency_budget` in seconds, the reranker is chosen to fit it from the full model, a tiny
+    model or none, keeping the vector store's top k. Given a `rerank_margin`, reranking is skipped
+    when the k-th document's similarity beats the next one's by at least that much, as the reranker
+    is then unlikely to change which documents are kept.
+
+    With the "hybrid" `search_type`, the vector store's candidates are fused by reciprocal rank with the
+    storage handler's full-text matches, so chunks naming a query's exact terms, such as "SRO" or
+    "Gate 2", are reranked even when their embeddings are not among the nearest.
+
+    Given a `summary_index` and `file_k`, retrieval has two stages: the `file_k` files whose summaries best
+    match the query are picked first, and only their chunks are searched. The stages are tuned separately,
+    by `file_k` and by k.
+
+    Given a `storage_handler`, each kept document is widened with its neighbouring chunks, fetched from
+    storage by position, and documents that end up adjacent are merged into one passage.
+    """
+
     vectorstore: VectorStore
     search_type: str = "similarity"
     search_kwargs: dict = Field(default_factory=dict)
+    # Precomputed embedding of the query, used to skip embedding it again at search time
+    query_vector: Optional[List[float]] = None
+    candidates: Optional[List[Document]] = None
+    adaptive_k: bool = False
+    score_ratio: float = 0.5
+    max_k: Optional[int] = None
+    latency_budget: Optional[float] = None
+    rerank_margin: Optional[float] = None
+    # Storage handler whose `read_chunks_by_position` supplies neighbouring chunks, and how many either side
+    storage_handler: Optional[Any] = None
+    neighbour_window: int = 1
+    # File summary index whose `top_files` picks the files searched, besides its `unindexed_files`, and how many it picks
+    summary_index: Optional[Any] = None
+    file_k: Optional[int] = None
 
     def _get_relevant_documents(
         self,
@@ -25,65 +88,285 @@ class ReRankRetriever(BaseRetriever):
     ) -> List[Document]:
         modified_search_kwargs = copy.deepcopy(self.search_kwargs)
         modified_search_kwargs["k"] = self.search_kwargs["k"] * 3  # boost this number before re ranking
-        ranker = Ranker(model_name="ms-marco-MiniLM-L-12-v2", cache_dir=".data")
+        if self.candidates is None:
+            modified_search_kwargs["filter"] = self._narrow_to_files(query, modified_search_kwargs.get("filter"))
 
-        if self.search_type == "similarity":
-            docs = self.vectorstore.similarity_search(query, **modified_search_kwargs)
+        if self.candidates is not None:
+            docs = self._copy_candidates()
+        elif self.search_type == "similarity":
+            docs = self._similarity_search_with_scores(query, modified_search_kwargs)
+        elif self.search_type == "hybrid":
+            docs = self._hybrid_search(query, modified_search_kwargs)
         elif self.search_type == "similarity_score_threshold":
             docs_and_similarities = self.vectorstore.similarity_search_with_relevance_scores(
                 query, **modified_search_kwargs
             )
-            docs = [doc for doc, _ in docs_and_similarities]
+            docs = [_with_score(doc, SIMILARITY_SCORE, score) for doc, score in docs_and_similarities]
+        elif self.search_type == "mmr" and self.query_vector is not None:
+            docs = self.vectorstore.max_marginal_relevance_search_by_vector(self.query_vector, **modified_search_kwargs)
         elif self.search_type == "mmr":
             docs = self.vectorstore.max_marginal_relevance_search(query, **modified_search_kwargs)
         else:
             raise ValueError(f"search_type of {self.search_type} not allowed.")
 
-        if len(docs) < self.search_kwargs["k"]:
+        if self.candidates is None and len(docs) < self.search_kwargs["k"]:
             raise RuntimeError("Document retrieval has not returned enough documents.")
 
         if rerank:
-            re_rank_docs = [{"id": idx, "text": document.page_content} for idx, document in enumerate(docs)]
-
-            rerank_request = RerankRequest(query=query, passages=re_rank_docs)
-            results = ranker.rerank(rerank_request)
-
-            ids_to_keep = [res["id"] for res in results][: self.search_kwargs["k"]]
-            docs = [docs[i] for i in ids_to_keep if i < len(docs)]
+            model_name = None if self._order_is_settled(docs) else choose_rerank_model(len(docs), self.latency_budget)
+            if model_name is None:
+                docs = docs[: self.search_kwargs["k"]]
+            else:
+                re_rank_docs = [{"id": idx, "text": document.page_content} for idx, document in enumerate(docs)]
+                docs = self._select_reranked(docs, rerank_passages(query, re_rank_docs, model_name), model_name)
 
         # Expand docs to include surrounding chunks
         expanded_docs = self._expand_docs(docs)
 
         return expanded_docs
 
+    def _similarity_search_with_scores(self, query: str, search_kwargs: dict) -> List[Document]:
+        """Similarity search, keeping each document's relevance score where the vector store supports it"""
+        try:
+            if self.query_vector is not None:
+                # Vector searches return raw distances, converted with the store's own relevance function
+                relevance = self.vectorstore._select_relevance_score_fn()
+                docs_and_distances = self.vectorstore.similarity_search_by_vector_with_relevance_scores(
+                    self.query_vector, **search_kwargs
+                )
+                return [_with_score(doc, SIMILARITY_SCORE, relevance(distance)) for doc, distance in docs_and_distances]
+            docs_and_similarities = self.vectorstore.similarity_search_with_relevance_scores(query, **search_kwargs)
+            return [_with_score(doc, SIMILARITY_SCORE, score) for doc, score in docs_and_similarities]
+        except (AttributeError, NotImplementedError):
+            if self.query_vector is not None:
+                return self.vectorstore.similarity_search_by_vector(self.query_vector, **search_kwargs)
+            return self.vectorstore.similarity_search(query, **search_kwargs)
+
+    def _hybrid_search(self, query: str, search_kwargs: dict) -> List[Document]:
+        """Fuse similarity search candidates with as many full-text matches, keeping the best k fused"""
+        if self.storage_handler is None:
+            raise ValueError("search_type of hybrid needs a storage_handler for full-text search.")
+        docs = self._similarity_search_with_scores(query, search_kwargs)
+        search_filter = search_kwargs.get("filter") or {}
+        if set(search_filter) - TEXT_SEARCH_FILTER_KEYS:
+            # Text matches could not be held to this filter, so only the vector store's are used
+            return docs
+        matches = self.storage_handler.search_chunks_text(
+            query,
+            search_kwargs["k"],
+            project_id=_optional_uuid(search_filter.get("project")),
+            file_ids=_filter_file_ids(search_filter),
+        )
+        return reciprocal_rank_fusion([docs, [_match_document(match) for match in matches]], search_kwargs["k"])
+
+    def _narrow_to_files(self, query: str, search_filter: Optional[dict]) -> Optional[dict]:
+        """
+        Restrict a project's search to the `file_k` files whose summaries are nearest the query, and to any
+        files not yet in the index, so that they are still searched. The filter is kept as it is when it
+        already picks files, or when the project has no more than `file_k` files with summaries.
+        """
+        if self.summary_index is None or not self.file_k or not search_filter:
+            return search_filter
+        if search_filter.get("project") is None or "parent_doc_uuid" in search_filter:
+            return search_filter
+        query_vector = self.query_vector or self.summary_index.embedding_function.embed_query(query)
+        # One more than needed, to tell whether the project has more files than are kept
+        project_id = UUID(str(search_filter["project"]))
+        top_files = self.summary_index.top_files(query_vector, project_id, self.file_k + 1)
+        if len(top_files) <= self.file_k:
+            return search_filter
+        file_ids = [str(file_id) for file_id, _ in top_files[: self.file_k]]
+        file_ids += [str(file_id) for file_id in self.summary_index.unindexed_files(project_id)]
+        return {**search_filter, "parent_doc_uuid": {"$in": file_ids}}
+
+    def rerank_candidates(self, queries: List[str]) -> Dict[str, List[Document]]:
+        """
+        Rerank `candidates` for several queries in one batched pass of the reranker, returning each
+        query's kept and expanded documents as `get_relevant_documents` would
+        """
+        # The budget is per query, so the batch may take as long as the queries would one by one
+        budget = self.latency_budget * len(queries) if self.latency_budget is not None else None
+        model_name = choose_rerank_model(len(queries) * len(self.candidates), budget)
+        if model_name is None:
+            # Without a reranker each query keeps the pool's own top k
+            return {query: self._expand_docs(self._copy_candidates()[: self.search_kwargs["k"]]) for query in queries}
+
+        passages = [{"id": idx, "text": doc.page_content} for idx, doc in enumerate(self.candidates)]
+        all_results = rerank_many([(query, passages) for query in queries], model_name=model_name)
+        documents = {}
+        for query, results in zip(queries, all_results):
+            documents[query] = self._expand_docs(self._select_reranked(self._copy_candidates(), results, model_name))
+        return documents
+
+    def _copy_candidates(self) -> List[Document]:
+        # Copied, as the pool is shared and each query adds its own scores to the metadata
+        return [Document(page_content=doc.page_content, metadata=dict(doc.metadata)) for doc in self.candidates]
+
+    def _order_is_settled(self, docs: List[Document]) -> bool:
+        """Whether the similarity gap after the k-th document is at least `rerank_margin`"""
+        k = self.search_kwargs["k"]
+        if self.rerank_margin is None or self.candidates is not None or len(docs) <= k:
+            # Pool documents are scored against the pool's search rather than this query
+            return False
+        if self.search_type == "hybrid":
+            # Fused documents are not in similarity order, and text matches have no similarity
+            return False
+        above, below = docs[k - 1].metadata.get(SIMILARITY_SCORE), docs[k].metadata.get(SIMILARITY_SCORE)
+        return above is not None and below is not None and above - below >= self.rerank_margin
+
+    def _select_reranked(self, docs: List[Document], results: List[dict], model_name: str) -> List[Document]:
+        """Keep the best reranked documents, adding their reranker scores and the model that gave them"""
+        results = [res for res in results if res["id"] < len(docs)][: self._keep_count(results)]
+        kept = [_with_score(docs[res["id"]], RERANK_SCORE, res["score"]) for res in results]
+        for doc in kept:
+            doc.metadata[RERANK_MODEL] = model_name
+        return kept
+
+    def _keep_count(self, results: List[dict]) -> int:
+        """How many reranked results to keep: k, or with `adaptive_k` as many as score close to the best"""
+        k = self.search_kwargs["k"]
+        if not self.adaptive_k or not results:
+            return k
+        cutoff = results[0]["score"] * self.score_ratio
+        close = sum(1 for res in results if res["score"] >= cutoff)
+        return max(1, min(close, self.max_k or k * 2))
+
     def _expand_docs(self, docs: List[Document]) -> List[Document]:
-        expanded_docs = []
+        """
+        Widen each document with up to `neighbour_window` chunks either side of it in its file, read in one
+        bulk query, merging documents whose widened spans meet into a single passage
+        """
+        if self.storage_handler is None or not self.neighbour_window:
+            return docs
+        positions = []
         for doc in docs:
-            file_name = doc.metadata.get("source")
-            idx = doc.metadata.get("idx")
-            if file_name is None or idx is None:
-                expanded_docs.append(doc)
-                continue
+            position = _chunk_position(doc)
+            if position is not None:
+                file_id, idx = position
+                offsets = range(-self.neighbour_window, self.neighbour_window + 1)
+                positions.extend((file_id, idx + offset) for offset in offsets if offset)
+        if not positions:
+            return docs
+        return merge_neighbours(docs, self.storage_handler.read_chunks_by_position(positions), self.neighbour_window)
 
-            expanded_docs.append(doc)
 
-            # Get the chunk above
-            above_chunk = self._get_chunk(file_name, idx - 1)
-            if above_chunk:
-                expanded_docs.append(above_chunk)
+def reciprocal_rank_fusion(rankings: List[List[Document]], limit: int, k: int = RRF_K) -> List[Document]:
+    """
+    Fuse ranked lists of documents, scoring each by the sum of 1 / (k + rank) over the lists it is in.
+    Documents are matched across lists by their chunk `uuid`, keeping the first list's copy, and the best
+    `limit` are returned with their fused score as `fusion_score`.
+    """
+    fused: Dict[str, Tuple[Document, float]] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            key = doc.metadata.get("uuid") or doc.page_content
+            kept, score = fused.get(key, (doc, 0.0))
+            fused[key] = (kept, score + 1 / (k + rank))
+    best = sorted(fused.values(), key=lambda item: item[1], reverse=True)[:limit]
+    return [_with_score(doc, FUSION_SCORE, score) for doc, score in best]
 
-            # Get the chunk below
-            below_chunk = self._get_chunk(file_name, idx + 1)
-            if below_chunk:
-                expanded_docs.append(below_chunk)
 
-        return expanded_docs
+def _match_document(match: ChunkSearchResult) -> Document:
+    # The same metadata as add_chunks_to_vector_store gives vector store documents
+    return Document(
+        page_content=match.text,
+        metadata={
+            "uuid": str(match.id),
+            "project": str(match.project_id),
+            "parent_doc_uuid": str(match.file_id),
+            "idx": match.idx,
+            "page_num": match.page_num,
+        },
+    )
 
-    def _get_chunk(self, file_name: str, idx: int) -> Optional[Document]:
-        # Implement this method to retrieve a specific chunk from the vectorstore
-        # This is a placeholder implementation and needs to be adapted to your specific vectorstore
-        try:
-            chunk = self.vectorstore.get_document(file_name=file_name, idx=idx)
-            return chunk
-        except Exception:
-            return None
+
+def _optional_uuid(value: Any) -> Optional[UUID]:
+    return UUID(str(value)) if value is not None else None
+
+
+def _filter_file_ids(search_filter: dict) -> Optional[List[UUID]]:
+    """The files a filter's `parent_doc_uuid` picks, given as one file or `{"$in": [...]}`"""
+    file_ids = search_filter.get("parent_doc_uuid")
+    if file_ids is None:
+        return None
+    if isinstance(file_ids, dict):
+        return [UUID(str(file_id)) for file_id in file_ids["$in"]]
+    return [UUID(str(file_ids))]
+
+
+def _chunk_position(doc: Document) -> Optional[Tuple[UUID, int]]:
+    """A document's (file id, index) in its file, where its metadata records them"""
+    file_id, idx = doc.metadata.get("parent_doc_uuid"), doc.metadata.get("idx")
+    if file_id is None or idx is None:
+        return None
+    try:
+        return UUID(str(file_id)), int(idx)
+    except ValueError:
+        return None
+
+
+def merge_neighbours(docs: List[Document], chunks: Dict[Tuple[UUID, int], ChunkText], window: int) -> List[Document]:
+    """
+    Merge ranked documents with their neighbouring chunks into contiguous passages.
+
+    Each document is widened with the chunks within `window` positions of it, stopping at gaps. Documents
+    from the same file whose widened spans overlap or touch become one passage, placed at the rank of the
+    best of them and keeping its metadata, with the span recorded as `idx_start`, `idx_end` and `chunk_uuids`.
+    Documents without a position are kept as they are.
+    """
+    passages: List[Optional[Document]] = []
+    spans: Dict[UUID, List[dict]] = {}
+    for doc in docs:
+        position = _chunk_position(doc)
+        if position is None:
+            passages.append(doc)
+            continue
+        file_id, idx = position
+        start = idx
+        while start > idx - window and (file_id, start - 1) in chunks:
+            start -= 1
+        end = idx
+        while end < idx + window and (file_id, end + 1) in chunks:
+            end += 1
+
+        file_spans = spans.setdefault(file_id, [])
+        touching = [span for span in file_spans if start <= span["end"] + 1 and end >= span["start"] - 1]
+        if not touching:
+            file_spans.append({"start": start, "end": end, "hits": {idx: doc}, "rank": len(passages)})
+            passages.append(None)
+            continue
+        # A document can bridge several spans; they all join the best ranked one, which comes first
+        span = touching[0]
+        span["start"], span["end"] = min(start, span["start"]), max(end, span["end"])
+        for other in touching[1:]:
+            span["start"], span["end"] = min(other["start"], span["start"]), max(other["end"], span["end"])
+            for other_idx, other_doc in other["hits"].items():
+                span["hits"].setdefault(other_idx, other_doc)
+            file_spans.remove(other)
+        span["hits"].setdefault(idx, doc)
+
+    for file_id, file_spans in spans.items():
+        for span in file_spans:
+            best = next(iter(span["hits"].values()))
+            texts, chunk_uuids = [], []
+            for idx in range(span["start"], span["end"] + 1):
+                if idx in span["hits"]:
+                    texts.append(span["hits"][idx].page_content)
+                    chunk_uuids.append(span["hits"][idx].metadata.get("uuid"))
+                elif (file_id, idx) in chunks:
+                    texts.append(chunks[(file_id, idx)].text)
+                    chunk_uuids.append(str(chunks[(file_id, idx)].id))
+            metadata = {
+                **best.metadata,
+                "idx_start": span["start"],
+                "idx_end": span["end"],
+                "chunk_uuids": [uuid for uuid in chunk_uuids if uuid is not None],
+            }
+            passages[span["rank"]] = Document(page_content="\n".join(texts), metadata=metadata)
+    # Ranks of spans merged into better ranked ones are left empty
+    return [passage for passage in passages if passage is not None]
+
+
+def _with_score(doc: Document, key: str, score: float) -> Document:
+    doc.metadata[key] = float(score)
+    return doc
@@ -0,0 +1,84 @@
+"""
+Offline step grouping near-synonymous criteria into clusters.
+
+Every criterion's question and evidence points are embedded and clustered with HDBSCAN, and the
+cluster IDs are saved on the criterion table. At evaluation time each cluster gets one broad retrieval
+pass, and its members rerank that shared pool instead of running their own vector searches.
+Re-run after loading new criteria:
+
+    python -m scout.Pipelines.cluster_criteria
+"""
+
+import argparse
+import os
+from typing import Dict, List, Optional
+from uuid import UUID
+
+import boto3
+import hdbscan
+import numpy as np
+from dotenv import load_dotenv
+from langchain_aws import BedrockEmbeddings
+from langchain_core.embeddings import Embeddings
+
+from scout.DataIngest.models.schemas import Criterion
+from scout.LLMFlag.embeddings import QueryEmbeddingCache, embed_queries, get_query_embedding_cache
+from scout.LLMFlag.evaluation import split_evidence
+from scout.utils.storage.postgres_storage_handler import PostgresStorageHandler
+from scout.utils.utils import logger
+
+
+def criterion_text(criterion: Criterion) -> str:
+    """The text a criterion is clustered on: its question followed by its evidence points"""
+    return "\n".join([criterion.question, *split_evidence(criterion.evidence)])
+
+
+def cluster_criteria(
+    criteria: List[Criterion],
+    embedding_function: Embeddings,
+    min_cluster_size: int = 2,
+    cache: Optional[QueryEmbeddingCache] = None,
+) -> Dict[UUID, Optional[int]]:
+    """
+    Cluster criteria by the embeddings of their text.
+
+    Returns:
+        Mapping of criterion ID to cluster ID, or None for criteria unlike any other
+    """
+    if len(criteria) < min_cluster_size:
+        return {criterion.id: None for criterion in criteria}
+
+    texts = [criterion_text(criterion) for criterion in criteria]
+    embeddings = embed_queries(texts, embedding_function=embedding_function, cache=cache)
+    vectors = np.array([embeddings[text] for text in texts], dtype=np.float64)
+    # Euclidean distance between unit vectors orders pairs the same way as cosine similarity
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    labels = hdbscan.HDBSCAN(min_cluster_size=min_cluster_size, metric="euclidean").fit_predict(vectors)
+    return {criterion.id: int(label) if label >= 0 else None for criterion, label in zip(criteria, labels)}
+
+
+def main(min_cluster_size: int = 2) -> None:
+    storage_handler = PostgresStorageHandler()
+    criteria = storage_handler.read_all_items(Criterion)
+    embedding_function = BedrockEmbeddings(
+        client=boto3.client(service_name="bedrock-runtime", region_name=os.getenv("AWS_REGION")),
+        model_id=os.getenv("AWS_BEDROCK_EMBEDDING_MODEL_ID"),
+    )
+
+    cluster_ids = cluster_criteria(
+        criteria, embedding_function, min_cluster_size=min_cluster_size, cache=get_query_embedding_cache()
+    )
+    storage_handler.update_criterion_clusters(cluster_ids)
+
+    clusters = {cluster_id for cluster_id in cluster_ids.values() if cluster_id is not None}
+    clustered = sum(cluster_id is not None for cluster_id in cluster_ids.values())
+    logger.info(f"Grouped {clustered} of {len(criteria)} criteria into {len(clusters)} clusters")
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Cluster similar criteria so they can share retrieval")
+    parser.add_argument("--min-cluster-size", type=int, default=2, help="Smallest group of criteria to cluster")
+    args = parser.parse_args()
+    main(min_cluster_size=args.min_cluster_size)
@@ -0,0 +1,391 @@
+"""
+Worker process for queued evaluation jobs.
+
+POST /process-criteria queues a job in the `evaluation_job` table. Workers split each job into one
+`evaluation_task` per (project, criterion), and any number of worker processes, on any number of nodes,
+pull tasks from that shared queue with SELECT ... FOR UPDATE SKIP LOCKED. The worker that finishes a
+job's last criterion queues a summary task, which regenerates the project summary and completes the job.
+
+LLM requests from every worker draw on a token bucket held in the `rate_budget` table, so together they
+stay within the Bedrock quota. Workers send heartbeats for their tasks while running them, and a task
+whose worker stops sending heartbeats is claimed again by another worker, so jobs survive restarts.
+The LLM calls, latency, tokens and cost of each stage (evidence points, final rating, summary) are added
+up on the job, so the effect of routing a stage to a cheaper model shows on the run record. Run with:
+
+    python -m scout.Pipelines.evaluation_worker --threads 4
+"""
+
+import argparse
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from functools import partial
+from typing import Callable, List, Optional, Tuple
+from uuid import UUID
+
+import boto3
+from botocore.client import Config
+from dotenv import load_dotenv
+from langchain_aws import ChatBedrock
+from langchain_community.retrievers import AmazonKnowledgeBasesRetriever
+from sqlalchemy.orm import Session
+
+from scout.DataIngest.models.schemas import (
+    Criterion,
+    CriterionFilter,
+    EvaluationJob,
+    EvaluationTask,
+    JobStatus,
+    Project,
+    ProjectUpdate,
+    ResultFilter,
+)
+from scout.LLMFlag.evaluation import MainEvaluator
+from scout.LLMFlag.kb_evaluator import KBMainEvaluator
+from scout.utils.llm_formats import QUESTION_STAGE, SUMMARY_STAGE, add_stage_costs, merge_stage_stats
+from scout.utils.storage.postgres_database import SessionLocal
+from scout.utils.storage.postgres_interface_llm import get_llm_models
+from scout.utils.storage.postgres_interface_jobs import (
+    acquire_rate_budget,
+    claim_evaluation_job,
+    claim_evaluation_task,
+    complete_evaluation_task,
+    fail_abandoned_evaluation_jobs,
+    fail_abandoned_evaluation_tasks,
+    fail_evaluation_task,
+    finish_evaluation_job,
+    get_evaluation_job,
+    heartbeat_evaluation_task,
+    record_evaluation_event,
+    split_evaluation_job,
+)
+from scout.utils.storage.postgres_storage_handler import PostgresStorageHandler
+from scout.utils.utils import logger
+
+load_dotenv()
+
+# A running job or task with no heartbeat for this long is assumed to have lost its worker
+JOB_STALE_SECONDS = int(os.getenv("SCOUT_JOB_STALE_SECONDS", "900"))
+JOB_MAX_ATTEMPTS = int(os.getenv("SCOUT_JOB_MAX_ATTEMPTS", "3"))
+# Bedrock requests per minute shared by all workers, and how many may be sent in a burst
+BEDROCK_REQUESTS_PER_MINUTE = float(os.getenv("SCOUT_BEDROCK_REQUESTS_PER_MINUTE", "60"))
+BEDROCK_REQUEST_BURST = float(os.getenv("SCOUT_BEDROCK_REQUEST_BURST", "10"))
+# Evaluators each worker keeps for reuse, the least recently used being dropped beyond this
+WORKER_MAX_EVALUATORS = int(os.getenv("SCOUT_WORKER_MAX_EVALUATORS", "8"))
+
+EvaluatorFactory = Callable[[Project, PostgresStorageHandler, dict], MainEvaluator]
+
+
+class RateBudget:
+    """Blocks until an LLM request fits within a token bucket shared, through Postgres, by every worker"""
+
+    def __init__(self, name: str = "bedrock", requests_per_minute: float = None, burst: float = None):
+        self.name = name
+        self.refill_per_second = (requests_per_minute or BEDROCK_REQUESTS_PER_MINUTE) / 60
+        self.capacity = burst or BEDROCK_REQUEST_BURST
+
+    def acquire(self, cost: float = 1.0) -> None:
+        while True:
+            with SessionLocal() as db:
+                wait = acquire_rate_budget(db, self.name, self.capacity, self.refill_per_second, cost=cost)
+            if wait <= 0:
+                return
+            time.sleep(min(wait, 5.0))
+
+
+class TaskHeartbeat:
+    """
+    Refreshes a task's heartbeat from a background thread while it runs, so a task that runs longer than
+    SCOUT_JOB_STALE_SECONDS, e.g. while waiting on the rate budget, is not reclaimed and run twice.
+    """
+
+    def __init__(self, task_id: UUID, worker_id: str, interval: float):
+        self.task_id = task_id
+        self.worker_id = worker_id
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._beat, daemon=True)
+
+    def _beat(self) -> None:
+        while not self._stopped.wait(self.interval):
+            try:
+                with SessionLocal() as db:
+                    if not heartbeat_evaluation_task(db, self.task_id, self.worker_id):
+                        logger.warning(f"Task {self.task_id} is no longer running under worker {self.worker_id}")
+                        return
+            except Exception as e:
+                logger.warning(f"Unable to send heartbeat for task {self.task_id}: {e}")
+
+    def __enter__(self) -> "TaskHeartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+
+def get_criteria_without_results(project: Project, storage_handler: PostgresStorageHandler) -> List[Criterion]:
+    """
+    Get criteria that don't have associated results for the given project.
+    """
+    # Get all criteria for the project
+    filter = CriterionFilter(project_id=project.id)
+    all_criteria = storage_handler.get_item_by_attribute(filter)
+
+    # Get all results for the project
+    results_filter = ResultFilter(project=project.id)
+    existing_results = storage_handler.get_item_by_attribute(results_filter)
+
+    # Get set of criterion IDs that have results
+    criterion_ids_with_results = {result.criterion.id for result in existing_results}
+
+    # Filter criteria to only those without results
+    criteria_without_results = [
+        criterion for criterion in all_criteria if criterion.id not in criterion_ids_with_results
+    ]
+
+    return criteria_without_results
+
+
+def build_kb_evaluator(project: Project, storage_handler: PostgresStorageHandler, parameters: dict) -> KBMainEvaluator:
+    """Create an evaluator that retrieves from the project's Bedrock Knowledge Base"""
+    session = boto3.session.Session()
+    bedrock_config = Config(connect_timeout=120, read_timeout=120, retries={"max_attempts": 0})
+    bedrock_client = boto3.client("bedrock-runtime", region_name=session.region_name, config=bedrock_config)
+
+    llm = ChatBedrock(model_id=parameters.get("model_id") or os.getenv("AWS_BEDROCK_MODEL_ID"), client=bedrock_client)
+    retriever = AmazonKnowledgeBasesRetriever(
+        knowledge_base_id=project.knowledgebase_id,
+        retrieval_config={
+            "vectorSearchConfiguration": {
+                "numberOfResults": parameters.get("max_results", 5),
+                "overrideSearchType": "HYBRID",
+            }
+        },
+    )
+    # The requested model gives the final rating and summary, evidence points use SCOUT_EVIDENCE_MODEL_ID
+    stage_model_ids = dict(parameters.get("stage_model_ids") or {})
+    if parameters.get("model_id"):
+        stage_model_ids.setdefault(QUESTION_STAGE, parameters["model_id"])
+        stage_model_ids.setdefault(SUMMARY_STAGE, parameters["model_id"])
+    return KBMainEvaluator(
+        retriever=retriever,
+        chat_llm=llm,
+        project=project,
+        storage_handler=storage_handler,
+        stage_model_ids=stage_model_ids,
+    )
+
+
+def select_job_criteria(job: EvaluationJob, project: Project, storage_handler: PostgresStorageHandler) -> List[UUID]:
+    """The IDs of the criteria a job asks to evaluate"""
+    parameters = job.parameters or {}
+    if parameters.get("criterion_id"):
+        return [UUID(parameters["criterion_id"])]
+    if parameters.get("incremental", False):
+        criteria = storage_handler.get_item_by_attribute(CriterionFilter(project_id=project.id))
+    else:
+        criteria = get_criteria_without_results(project, storage_handler)
+    return [criterion.id for criterion in criteria]
+
+
+def update_project_summary(project: Project, evaluator: MainEvaluator, storage_handler: PostgresStorageHandler) -> None:
+    """
+    Regenerate the project summary from all of its results. Category summaries are cached, so only the
+    categories whose results changed are summarised again before the final reduction.
+    """
+    criteria = storage_handler.get_item_by_attribute(CriterionFilter(project_id=project.id))
+    results = storage_handler.get_item_by_attribute(ResultFilter(project=project.id))
+
+    criteria_results_pairs = [
+        (criterion.question, result.full_text, criterion.category)
+        for criterion in criteria
+        for result in results
+        if result.criterion is not None and criterion.id == result.criterion.id
+    ]
+    if not criteria_results_pairs:
+        return
+
+    summary = evaluator.generate_summary(criteria_results_pairs)
+    storage_handler.update_item(ProjectUpdate(id=project.id, name=project.name, results_summary=summary))
+
+
+class EvaluationWorker:
+    """Pulls evaluation tasks from the shared queue, splitting newly queued jobs into tasks when it is idle"""
+
+    def __init__(
+        self,
+        worker_id: str = None,
+        storage_handler: PostgresStorageHandler = None,
+        evaluator_factory: EvaluatorFactory = build_kb_evaluator,
+        rate_budget: Optional[RateBudget] = None,
+        stale_after: timedelta = None,
+        max_attempts: int = None,
+        max_evaluators: int = None,
+    ):
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.storage_handler = storage_handler or PostgresStorageHandler()
+        self.evaluator_factory = evaluator_factory
+        self.rate_budget = rate_budget
+        self.stale_after = stale_after or timedelta(seconds=JOB_STALE_SECONDS)
+        self.max_attempts = max_attempts or JOB_MAX_ATTEMPTS
+        # Evaluators are reused across a project's tasks, keeping their caches and running hypotheses. Only the
+        # most recently used are kept, so a long-running worker does not hold one for every project it has seen
+        self.max_evaluators = max_evaluators or WORKER_MAX_EVALUATORS
+        self.evaluators: OrderedDict[Tuple, MainEvaluator] = OrderedDict()
+
+    def get_evaluator(self, project: Project, parameters: dict) -> MainEvaluator:
+        key = (project.id, parameters.get("model_id"), parameters.get("max_results"))
+        if key in self.evaluators:
+            self.evaluators.move_to_end(key)
+            return self.evaluators[key]
+        evaluator = self.evaluator_factory(project, self.storage_handler, parameters)
+        evaluator.rate_limiter = self.rate_budget
+        self.evaluators[key] = evaluator
+        # Dropped evaluators' stage stats were popped when their last task finished
+        while len(self.evaluators) > self.max_evaluators:
+            self.evaluators.popitem(last=False)
+        return evaluator
+
+    def split_next_job(self) -> bool:
+        """Claim a queued job and split it into tasks, returning False if there was none"""
+        with SessionLocal() as db:
+            fail_abandoned_evaluation_jobs(db, self.stale_after, max_attempts=self.max_attempts)
+            job = claim_evaluation_job(db, self.worker_id, self.stale_after, max_attempts=self.max_attempts)
+        if job is None:
+            return False
+
+        try:
+            project = self.storage_handler.read_item(job.project_id, Project)
+            if project is None:
+                raise ValueError(f"Project {job.project_id} not found")
+            criterion_ids = select_job_criteria(job, project, self.storage_handler)
+            with SessionLocal() as db:
+                split_evaluation_job(db, job.id, criterion_ids)
+            logger.info(f"Job {job.id}: queued {len(criterion_ids)} criteria for project {project.name}")
+        except Exception as e:
+            logger.exception(f"Job {job.id} could not be split into tasks: {e}")
+            with SessionLocal() as db:
+                finish_evaluation_job(db, job.id, JobStatus.FAILED, error=str(e))
+        return True
+
+    @staticmethod
+    def record_event(task: EvaluationTask, stage: str, **details) -> None:
+        """Record a progress event for a task's job; a failure to record never fails the task"""
+        details = {"task_id": task.id, "criterion_id": task.criterion_id, **details}
+        try:
+            with SessionLocal() as db:
+                record_evaluation_event(db, task.job_id, stage, **details)
+        except Exception as e:
+            logger.warning(f"Unable to record {stage} event for task {task.id}: {e}")
+
+    def run_task(self, task: EvaluationTask) -> Optional[UUID]:
+        """Evaluate one criterion, or generate the summary, returning the ID of any result written"""
+        with SessionLocal() as db:
+            job = get_evaluation_job(db, task.job_id)
+        parameters = job.parameters or {}
+        project = self.storage_handler.read_item(task.project_id, Project)
+        evaluator = self.get_evaluator(project, parameters)
+        evaluator.event_callback = partial(self.record_event, task)
+
+        if task.kind == "summary":
+            update_project_summary(project, evaluator, self.storage_handler)
+            self.record_event(task, "summary_done")
+            return None
+
+        criterion = self.storage_handler.read_item(task.criterion_id, Criterion)
+        existing_results = self.storage_handler.get_item_by_attribute(
+            ResultFilter(project=project.id, criterion=criterion.id)
+        )
+        existing_result = existing_results[0] if existing_results else None
+        # A criterion asked for by ID is always evaluated again
+        requested = bool(parameters.get("criterion_id"))
+        whole_project = not requested and not parameters.get("incremental", False)
+        if existing_result is not None and not requested and (task.attempts > 1 or whole_project):
+            # Already evaluated, e.g. by an earlier attempt at this task that died after saving
+            self.record_event(task, "unchanged", result_id=existing_result.id)
+            return existing_result.id
+
+        result = evaluator.reevaluate_question(criterion, existing_result, save=True, force=requested)
+        if result is None:
+            return existing_result.id
+        return getattr(result, "id", None)
+
+    def task_stage_stats(self, db: Session) -> dict:
+        """Collect the LLM usage of the task just run from this worker's evaluators, priced per model"""
+        stats = {}
+        for evaluator in self.evaluators.values():
+            stats = merge_stage_stats(stats, evaluator.pop_stage_stats())
+        if not stats:
+            return stats
+        prices = {
+            model.model_id: (model.input_cost_per_1k_tokens, model.output_cost_per_1k_tokens)
+            for model in get_llm_models(db)
+        }
+        return add_stage_costs(stats, prices)
+
+    def process_next_task(self) -> bool:
+        """Claim and run one task, returning False if there was nothing to do"""
+        with SessionLocal() as db:
+            fail_abandoned_evaluation_tasks(db, self.stale_after, max_attempts=self.max_attempts)
+            task = claim_evaluation_task(db, self.worker_id, self.stale_after, max_attempts=self.max_attempts)
+        if task is None:
+            return False
+
+        try:
+            # Beat several times within the stale period, so one slow database round trip is not fatal
+            with TaskHeartbeat(task.id, self.worker_id, interval=self.stale_after.total_seconds() / 3):
+                result_id = self.run_task(task)
+        except Exception as e:
+            logger.exception(f"Task {task.id} of job {task.job_id} failed: {e}")
+            self.record_event(task, "error", message=str(e))
+            with SessionLocal() as db:
+                fail_evaluation_task(
+                    db, task.id, str(e), max_attempts=self.max_attempts, stage_stats=self.task_stage_stats(db)
+                )
+            return True
+
+        with SessionLocal() as db:
+            job = complete_evaluation_task(db, task.id, result_id=result_id, stage_stats=self.task_stage_stats(db))
+        logger.info(f"Job {job.id}: {job.processed_criteria}/{job.total_criteria} criteria, status {job.status}")
+        return True
+
+    def run(self, poll_interval: float = 5.0, once: bool = False) -> None:
+        """Process tasks and split jobs until stopped, sleeping while the queue is empty"""
+        logger.info(f"Evaluation worker {self.worker_id} started")
+        while True:
+            processed = self.process_next_task() or self.split_next_job()
+            if once and not processed:
+                return
+            if not processed:
+                time.sleep(poll_interval)
+
+
+def run_workers(threads: int = 1, poll_interval: float = 5.0, once: bool = False) -> None:
+    """Run several workers in this process, sharing the rate budget with every other worker"""
+    rate_budget = RateBudget()
+    base_worker_id = f"{socket.gethostname()}-{os.getpid()}"
+    workers = [
+        threading.Thread(
+            target=EvaluationWorker(worker_id=f"{base_worker_id}-{i}", rate_budget=rate_budget).run,
+            kwargs={"poll_interval": poll_interval, "once": once},
+        )
+        for i in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run queued Scout evaluation jobs")
+    parser.add_argument("--threads", type=int, default=1, help="Number of workers to run in this process")
+    parser.add_argument("--poll-interval", type=float, default=5.0, help="Seconds to wait when the queue is empty")
+    parser.add_argument("--once", action="store_true", help="Exit once the queue is empty")
+    args = parser.parse_args()
+    run_workers(threads=args.threads, poll_interval=args.poll_interval, once=args.once)
@@ -10,9 +10,12 @@ from scout.DataIngest.file_info import add_llm_generated_file_info
 from scout.DataIngest.models.schemas import Chunk, File, FileCreate, Project, ProjectCreate
 from scout.DataIngest.s3_download import convert_to_pdf_from_s3, s3_key_from_presigned_url
 from scout.DataIngest.utils import get_project_directory, get_project_name_with_date_time, sanitise_project_name
+from scout.LLMFlag.cache import retrieval_cache
 from scout.utils.storage.filesystem import S3StorageHandler
+from scout.utils.storage.pgvector_store import PgVectorStore
 from scout.utils.storage.postgres_storage_handler import PostgresStorageHandler
 from scout.utils.storage.storage_handler import BaseStorageHandler
+from scout.utils.storage.summary_index import FileSummaryIndex
 from scout.utils.utils import logger
 
 
@@ -63,7 +66,11 @@ def chunk_embed_save_from_temp_filepath(
     try:
         logger.info(f"Trying to Chunk file: {file.name}")
         chunks = chunk_file(file=file, temp_filepath=temp_filepath, anonymise=True, chunking_strategy=chunking_strategy)
-        new_chunks: List[Chunk] = storage_handler.write_items(chunks)
+        if isinstance(vector_store, PgVectorStore):
+            # Chunk rows are written with their embeddings in one transaction
+            new_chunks: List[Chunk] = vector_store.add_chunks(chunks)
+        else:
+            new_chunks: List[Chunk] = storage_handler.write_items(chunks)
         for i, new_chunk in enumerate(new_chunks):
             new_chunk.file = chunks[i].file
         chunks = new_chunks
@@ -71,10 +78,21 @@ def chunk_embed_save_from_temp_filepath(
         logger.error(e)
 
     # Now we can create LLM file attributes. This uses instructor and the file_info_extractor prompt.
-    add_llm_generated_file_info(
+    updated_file = add_llm_generated_file_info(
         project_name=project.name, file=file, chunks_from_file=chunks, storage_handler=storage_handler
     )
-    add_chunks_to_vector_store(chunks=chunks, vector_store=vector_store, project_id=project.id)
+    if int(os.getenv("SCOUT_SUMMARY_FILE_K", "0")) > 0:
+        # Embed the summary once, for picking the files a query's chunks are searched in
+        try:
+            FileSummaryIndex(vector_store.embeddings).add_files([updated_file])
+        except Exception as _:
+            # Searches still cover files missing from the index, which a backfill can add later
+            logger.exception(f"Failed to add {file.name} to the file summary index")
+    if isinstance(vector_store, PgVectorStore):
+        # Already embedded with their rows, but cached retrievals for the project are now stale
+        retrieval_cache.invalidate_project(project.id)
+    else:
+        add_chunks_to_vector_store(chunks=chunks, vector_store=vector_store, project_id=project.id)
 
 
 def ingest_project_files(
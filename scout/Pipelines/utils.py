@@ -1,48 +1,110 @@
+import logging
 import os
 from pathlib import Path
-import boto3
+from typing import Optional
 
-from langchain_community.vectorstores import Chroma
+import boto3
+import chromadb
+from chromadb.api import ClientAPI
 from langchain_aws import BedrockEmbeddings
+from langchain_community.vectorstores import Chroma
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
 
+logger = logging.getLogger(__name__)
+
+DEFAULT_COLLECTION_NAME = "langchain"
+
+
+def hnsw_parameters() -> dict:
+    """
+    HNSW settings for new collections. Tune them with scripts/benchmark_hnsw.py, which reports recall@k,
+    query latency and graph size for a grid of settings on a project's own embeddings.
+    """
+    return {
+        "hnsw:M": int(os.getenv("SCOUT_HNSW_M", "16")),
+        "hnsw:construction_ef": int(os.getenv("SCOUT_HNSW_CONSTRUCTION_EF", "200")),
+        # Headroom over k, so filtered searches still find enough matching neighbours
+        "hnsw:search_ef": int(os.getenv("SCOUT_HNSW_SEARCH_EF", "100")),
+    }
+
+
+def get_embedding_function() -> BedrockEmbeddings:
+    bedrock_client = boto3.client(service_name="bedrock-runtime", region_name=os.getenv("AWS_REGION"))
+    return BedrockEmbeddings(client=bedrock_client, model_id=os.getenv("AWS_BEDROCK_EMBEDDING_MODEL_ID"))
+
+
+def embedding_fingerprint(model_id: str, dimension: int) -> dict:
+    """Collection metadata recording the embedding model its vectors were made with"""
+    return {"embedding_model": model_id, "embedding_dimension": dimension}
 
-def get_or_create_vector_store(vector_store_directory: Path):
-    # Create Bedrock client
-    bedrock_client = boto3.client(
-        service_name="bedrock-runtime",
-        region_name=os.getenv("AWS_REGION")
-    )
-    
-    # Use AWS Bedrock embeddings
-    embedding_function = BedrockEmbeddings(
-        client=bedrock_client,
-        model_id=os.getenv("AWS_BEDROCK_EMBEDDING_MODEL_ID")
-    )
 
-    # Check if an existing vector store exists and handle dimension mismatch
-    if os.path.exists(vector_store_directory) and os.path.isdir(vector_store_directory):
-        import shutil
-        import logging
-        
-        logger = logging.getLogger(__name__)
-        logger.warning(
-            "Existing vector store found. Recreating with new embedding model to avoid dimension mismatch. "
-            "This will delete your existing embeddings!"
-        )
-        
-        # Remove the existing vector store directory
-        shutil.rmtree(vector_store_directory)
-        
-        # Create directory again
-        os.makedirs(vector_store_directory, exist_ok=True)
-
-    # Create new vector store with Bedrock embeddings
-    vector_store = Chroma(
+def embedding_dimension(embedding_function: Embeddings) -> int:
+    return len(embedding_function.embed_query("dimension check"))
+
+
+def fingerprint_matches(metadata: dict, fingerprint: dict) -> bool:
+    metadata = metadata or {}
+    return all(metadata.get(key) == value for key, value in fingerprint.items())
+
+
+def open_vector_store(
+    persist_directory: Path,
+    embedding_function: Embeddings,
+    model_id: str,
+    collection_name: str = DEFAULT_COLLECTION_NAME,
+    client: Optional[ClientAPI] = None,
+    dimension: Optional[int] = None,
+) -> Chroma:
+    """
+    Open a persisted Chroma collection, keeping its embeddings when they were made with the same embedding
+    model and dimension. A collection stamped with a different fingerprint, or none, is deleted and
+    recreated empty; other collections in the directory are left alone.
+    """
+    os.makedirs(persist_directory, exist_ok=True)
+    dimension = dimension or embedding_dimension(embedding_function)
+    fingerprint = embedding_fingerprint(model_id, dimension)
+
+    client = client or chromadb.PersistentClient(path=str(persist_directory))
+    # chromadb 0.5 lists collections, later versions list their names
+    existing = [getattr(collection, "name", collection) for collection in client.list_collections()]
+    if collection_name in existing:
+        metadata = client.get_collection(collection_name).metadata
+        if fingerprint_matches(metadata, fingerprint):
+            logger.info(f"Reopened vector store collection {collection_name} ({model_id}, {dimension} dimensions)")
+        else:
+            logger.warning(
+                f"Vector store collection {collection_name} was built with "
+                f"{(metadata or {}).get('embedding_model', 'an unknown model')}, not {model_id}. "
+                "Recreating it; its documents must be re-ingested."
+            )
+            client.delete_collection(collection_name)
+
+    return Chroma(
+        client=client,
+        collection_name=collection_name,
         embedding_function=embedding_function,
-        persist_directory=str(vector_store_directory),
-        collection_metadata={
-            "hnsw:M": 2048,
-            "hnsw:search_ef": 20,
-        },  # included to avoid M too small error on retrival
+        collection_metadata={**hnsw_parameters(), **fingerprint},
     )
-    return vector_store
+
+
+def get_vector_store(persist_directory: Path, embedding_function: Embeddings) -> VectorStore:
+    """
+    The vector store chosen by SCOUT_VECTOR_STORE: "chroma_per_project" (default) for a Chroma collection per
+    project persisted in `persist_directory`, "chroma" for one collection shared by every project, or
+    "pgvector" for embeddings kept on the chunk table, shared by every worker
+    """
+    backend = os.getenv("SCOUT_VECTOR_STORE", "chroma_per_project")
+    if backend == "pgvector":
+        from scout.utils.storage.pgvector_store import PgVectorStore
+
+        return PgVectorStore(embedding_function)
+    if backend == "chroma_per_project":
+        from scout.utils.storage.project_vector_store import ProjectVectorStore
+
+        return ProjectVectorStore(persist_directory, embedding_function, os.getenv("AWS_BEDROCK_EMBEDDING_MODEL_ID"))
+    return open_vector_store(persist_directory, embedding_function, os.getenv("AWS_BEDROCK_EMBEDDING_MODEL_ID"))
+
+
+def get_or_create_vector_store(vector_store_directory: Path):
+    return get_vector_store(vector_store_directory, get_embedding_function())
@@ -1,4 +1,7 @@
-from typing import Dict, Any, List, Optional, Union
+import json
+import os
+import re
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple, Union
 
 
 def format_llm_request(
@@ -7,7 +10,8 @@ def format_llm_request(
     system_message: Optional[str] = None,
     max_tokens: int = 1000, 
     temperature: float = 0.5,
-    images: List[Dict[str, Any]] = None
+    images: List[Dict[str, Any]] = None,
+    system_blocks: Optional[List[str]] = None,
 ) -> Dict[str, Any]:
     """
     Format a prompt for different LLM models based on model_id.
@@ -19,6 +23,8 @@ def format_llm_request(
         max_tokens: Maximum number of tokens to generate
         temperature: Temperature parameter for generation
         images: List of image objects for multimodal models
+        system_blocks: Static system prompt sections, e.g. a persona and examples, sent before the
+            system message. Claude models that support prompt caching cache everything up to them.
         
     Returns:
         Dict containing the properly formatted request for the specified model
@@ -32,12 +38,6 @@ def format_llm_request(
     
     # Handle Anthropic Claude models
     if "anthropic.claude" in model_id:
-        messages = []
-        
-        # Add system message if provided
-        if system_message:
-            messages.append({"role": "system", "content": system_message})
-        
         # Create user message with text and optional images
         user_content = []
         
@@ -49,17 +49,29 @@ def format_llm_request(
         # Add text prompt
         user_content.append({"type": "text", "text": prompt})
         
-        # Add user message with content
-        messages.append({"role": "user", "content": user_content})
-        
         request["body"] = {
             "anthropic_version": "bedrock-2023-05-31",
             "max_tokens": max_tokens,
-            "messages": messages
+            "messages": [{"role": "user", "content": user_content}]
         }
+
+        # Claude takes the system prompt as a top level field rather than as a message
+        if system_blocks:
+            request["body"]["system"] = build_system_blocks(model_id, system_blocks, system_message)
+        elif system_message:
+            request["body"]["system"] = system_message
+        return request
+
+    # Other models take the static sections as part of the system message
+    if system_blocks:
+        system_message = "\n\n".join([*system_blocks, *([system_message] if system_message else [])])
+
+    # Models without their own handling of a system message take it at the start of the prompt
+    if system_message and not any(family in model_id for family in ("meta.llama", "amazon.titan")):
+        prompt = f"{system_message}\n\n{prompt}"
     
     # Handle Meta Llama models
-    elif "meta.llama" in model_id:
+    if "meta.llama" in model_id:
         # For Llama models, we concatenate system message and prompt if both provided
         full_prompt = prompt
         if system_message:
@@ -124,7 +136,154 @@ def format_llm_request(
     
     # Convert body to JSON string for models that need it
     if "meta.llama" in model_id:
-        import json
         request["body"] = json.dumps(request["body"])
     
-    return request
\ No newline at end of file
+    return request
+
+CACHE_WRITE_PRICE_MULTIPLIER = 1.25
+CACHE_READ_PRICE_MULTIPLIER = 0.1
+
+# Stages of an evaluation that can be routed to their own model
+EVIDENCE_STAGE = "evidence"
+QUESTION_STAGE = "question"
+SUMMARY_STAGE = "summary"
+FILE_INFO_STAGE = "file_info"
+
+
+def get_stage_model_id(stage: str) -> str:
+    """
+    Get the model used for a stage of the pipeline, from SCOUT_<STAGE>_MODEL_ID.
+    Stages without their own model use AWS_BEDROCK_MODEL_ID.
+    """
+    return os.getenv(f"SCOUT_{stage.upper()}_MODEL_ID") or os.getenv("AWS_BEDROCK_MODEL_ID")
+
+
+def supports_prompt_caching(model_id: str) -> bool:
+    """Bedrock prompt caching is available for Claude 3.5 Haiku, Claude 3.7 Sonnet and later Claude models"""
+    return bool(model_id) and re.search(r"anthropic\.claude-(3-5-haiku|3-7-sonnet|(sonnet|opus|haiku)-4)", model_id) is not None
+
+
+def build_system_blocks(model_id: str, static_blocks: List[str], system_message: Optional[str] = None) -> List[Dict]:
+    """
+    Build Claude's structured system prompt from static sections followed by any per-request system message.
+    Where the model supports prompt caching, a cache breakpoint after the static sections lets repeat
+    requests reuse them rather than process them again.
+    """
+    blocks = [{"type": "text", "text": text} for text in static_blocks]
+    if blocks and supports_prompt_caching(model_id):
+        blocks[-1]["cache_control"] = {"type": "ephemeral"}
+    if system_message:
+        blocks.append({"type": "text", "text": system_message})
+    return blocks
+
+
+def format_messages_body(
+    model_id: str,
+    messages: List[Dict[str, Any]],
+    max_tokens: int = 1000,
+    temperature: float = 0.5,
+    system_blocks: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Format a list of chat messages as the request body expected by the given model.
+    Claude models take the messages as they are, with `system_blocks` and any system messages moved to
+    the system prompt. Other models take a single prompt, so the system prompt and messages are joined.
+    """
+    system_message = "\n\n".join(message["content"] for message in messages if message["role"] == "system")
+    chat_messages = [message for message in messages if message["role"] != "system"]
+
+    if not model_id or "anthropic.claude" in model_id:
+        body = {
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": max_tokens,
+            "messages": chat_messages,
+        }
+        if system_blocks:
+            body["system"] = build_system_blocks(model_id, system_blocks, system_message or None)
+        elif system_message:
+            body["system"] = system_message
+        return body
+
+    prompt = "\n\n".join(message["content"] for message in chat_messages)
+    body = format_llm_request(
+        model_id, prompt, system_message or None, max_tokens, temperature, system_blocks=system_blocks
+    )["body"]
+    return json.loads(body) if isinstance(body, str) else body
+
+
+class LLMResponse(NamedTuple):
+    text: str
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    # Prompt tokens read from and written to the prompt cache, not included in input_tokens
+    cache_read_tokens: int = 0
+    cache_write_tokens: int = 0
+
+
+def parse_llm_response(model_id: str, response_body: Dict[str, Any]) -> LLMResponse:
+    """
+    Get the generated text and token counts from a model's response body.
+    Token counts are None for models that do not report them.
+    """
+    if not model_id or "anthropic.claude" in model_id:
+        usage = response_body.get("usage", {})
+        return LLMResponse(
+            response_body["content"][0]["text"],
+            usage.get("input_tokens"),
+            usage.get("output_tokens"),
+            usage.get("cache_read_input_tokens") or 0,
+            usage.get("cache_creation_input_tokens") or 0,
+        )
+    if "meta.llama" in model_id:
+        return LLMResponse(
+            response_body["generation"],
+            response_body.get("prompt_token_count"),
+            response_body.get("generation_token_count"),
+        )
+    if "amazon.titan" in model_id:
+        result = response_body["results"][0]
+        return LLMResponse(result["outputText"], response_body.get("inputTextTokenCount"), result.get("tokenCount"))
+    if "ai21" in model_id:
+        return LLMResponse(response_body["completions"][0]["data"]["text"])
+    if "cohere" in model_id:
+        return LLMResponse(response_body["generations"][0]["text"])
+    if "mistral" in model_id:
+        return LLMResponse(response_body["outputs"][0]["text"])
+    return LLMResponse(response_body.get("completion") or response_body.get("text", ""))
+
+
+def merge_stage_stats(total: Dict[str, Dict[str, Any]], stats: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Add per-stage LLM usage, e.g. {"evidence": {"model_id": ..., "calls": 3, "latency_seconds": 4.2, ...}},
+    to a running total, returning a new dict
+    """
+    merged = {stage: dict(values) for stage, values in (total or {}).items()}
+    for stage, values in stats.items():
+        stage_total = merged.setdefault(stage, {})
+        for key, value in values.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                stage_total[key] = stage_total.get(key, 0) + value
+            else:
+                stage_total[key] = value
+    return merged
+
+
+def add_stage_costs(
+    stats: Dict[str, Dict[str, Any]], prices: Dict[str, Tuple[Optional[float], Optional[float]]]
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Add the cost of each stage's tokens, given the (input, output) cost per 1,000 tokens of each model.
+    Tokens written to the prompt cache cost 25% more than other input tokens, and tokens read from it 90% less.
+    Stages whose model has no price are left without a cost.
+    """
+    for values in stats.values():
+        input_cost, output_cost = prices.get(values.get("model_id"), (None, None))
+        if input_cost is None or output_cost is None:
+            continue
+        values["cost"] = (
+            values.get("input_tokens", 0) * input_cost
+            + values.get("cache_write_tokens", 0) * input_cost * CACHE_WRITE_PRICE_MULTIPLIER
+            + values.get("cache_read_tokens", 0) * input_cost * CACHE_READ_PRICE_MULTIPLIER
+            + values.get("output_tokens", 0) * output_cost
+        ) / 1000
+    return stats
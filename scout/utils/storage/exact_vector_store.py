@@ -0,0 +1,300 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+# Rows multiplied at a time, bounding the float32 copy made of float16 and int8 matrices
+BLOCK_ROWS = 8192
+STORAGE_DTYPES = ("float32", "float16", "int8")
+
+
+class Projection(NamedTuple):
+    """PCA projection of embeddings onto their top principal components"""
+
+    mean: np.ndarray
+    # (dimension, reduced dimension)
+    components: np.ndarray
+
+    @property
+    def id(self) -> str:
+        return hashlib.sha256(self.mean.tobytes() + self.components.tobytes()).hexdigest()[:16]
+
+    def apply(self, vectors: np.ndarray) -> np.ndarray:
+        return ((np.asarray(vectors, dtype=np.float32) - self.mean) @ self.components).astype(np.float32)
+
+
+def fit_pca(embeddings: np.ndarray, dimensions: int) -> Projection:
+    """Fit a projection onto the `dimensions` directions of greatest variance, e.g. on a deployment's chunks"""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    mean = embeddings.mean(axis=0)
+    _, _, components = np.linalg.svd(embeddings - mean, full_matrices=False)
+    return Projection(mean.astype(np.float32), components[:dimensions].T.astype(np.float32))
+
+
+def save_projection(path: Path, projection: Projection) -> None:
+    np.savez(path, mean=projection.mean, components=projection.components)
+
+
+def load_projection(path: Path) -> Projection:
+    with np.load(path) as data:
+        return Projection(data["mean"], data["components"])
+
+
+def _index_params(dtype: str, projection: Optional[Projection]) -> dict:
+    return {"dtype": dtype, "projection": projection.id if projection is not None else None}
+
+
+class ExactIndex:
+    """
+    A collection's embeddings as one contiguous matrix on disk, memory-mapped and searched exactly.
+
+    Distances are squared L2, as Chroma's default space returns, from one matrix product per block of rows:
+    |x - q|^2 = |x|^2 - 2 x.q + |q|^2, with the row norms stored alongside the matrix.
+
+    To shrink the scanned matrix, it can be stored as float16, or as int8 scaled per dimension, and
+    projected onto fewer dimensions with a PCA `Projection`. The matrix then only shortlists
+    `rescore_factor` * k candidates, which are rescored against a full-precision copy kept on disk, so
+    the returned order and distances are exact for the shortlist. Products are always taken in float32.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        with open(self.directory / "records.json") as f:
+            records = json.load(f)
+        self.ids: List[str] = records["ids"]
+        self.documents: List[str] = records["documents"]
+        self.metadatas: List[dict] = records["metadatas"]
+        self.params: dict = records.get("params", _index_params("float32", None))
+        self.vectors = np.load(self.directory / "vectors.npy", mmap_mode="r")
+        self.norms = np.load(self.directory / "norms.npy", mmap_mode="r")
+        if len(self.vectors) != len(self.ids):
+            raise ValueError(f"Exact index at {self.directory} is incomplete")
+        self.scales = np.load(self.directory / "scales.npy") if self.params["dtype"] == "int8" else None
+        self.projection = load_projection(self.directory / "projection.npz") if self.params["projection"] else None
+        # Full-precision vectors for rescoring, kept when the scanned matrix is compressed
+        self.full = np.load(self.directory / "full.npy", mmap_mode="r") if self.compressed else None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def compressed(self) -> bool:
+        return self.params["dtype"] != "float32" or self.params["projection"] is not None
+
+    @classmethod
+    def build(
+        cls,
+        directory: Path,
+        ids: List[str],
+        embeddings: Iterable[List[float]],
+        documents: List[str],
+        metadatas: List[dict],
+        dtype: str = "float32",
+        projection: Optional[Projection] = None,
+    ) -> "ExactIndex":
+        """Write an index, replacing any at `directory`, and open it"""
+        if dtype not in STORAGE_DTYPES:
+            raise ValueError(f"dtype of {dtype} not allowed.")
+        directory = Path(directory)
+        os.makedirs(directory, exist_ok=True)
+        full = np.asarray(list(embeddings), dtype=np.float32)
+        if not ids:
+            full = np.zeros((0, 0), dtype=np.float32)
+        reduced = projection.apply(full) if projection is not None and len(full) else full
+        norms = (reduced**2).sum(axis=1)
+        params = _index_params(dtype, projection if len(full) else None)
+
+        if dtype == "int8":
+            scales = np.abs(reduced).max(axis=0) / 127 if len(reduced) else np.ones(0, dtype=np.float32)
+            scales = np.where(scales > 0, scales, 1).astype(np.float32)
+            vectors = np.round(reduced / scales).astype(np.int8)
+            _save(directory / "scales.npy", scales)
+        else:
+            vectors = reduced.astype(dtype)
+        if params["projection"]:
+            save_projection(directory / "projection.tmp.npz", projection)
+            os.replace(directory / "projection.tmp.npz", directory / "projection.npz")
+        if dtype != "float32" or params["projection"]:
+            _save(directory / "full.npy", full)
+
+        # Records are written last, so a reader never sees them with an older matrix
+        _save(directory / "vectors.npy", vectors)
+        _save(directory / "norms.npy", norms)
+        with open(directory / "records.tmp.json", "w") as f:
+            json.dump({"ids": ids, "documents": documents, "metadatas": metadatas, "params": params}, f)
+        os.replace(directory / "records.tmp.json", directory / "records.json")
+        return cls(directory)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the matrix scanned by every search"""
+        return self.vectors.nbytes + self.norms.nbytes
+
+    def _mask(self, where: Optional[dict]) -> Optional[np.ndarray]:
+        if not where:
+            return None
+        return np.array(
+            [all(_matches(metadata.get(key), value) for key, value in where.items()) for metadata in self.metadatas],
+            dtype=bool,
+        )
+
+    def search(
+        self, queries: np.ndarray, k: int, where: Optional[dict] = None, rescore_factor: int = 4
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        The k nearest rows to each query, as (row, squared L2 distance) pairs nearest first.
+
+        Args:
+            queries: (m, d) matrix of query vectors
+            where: metadata values rows must equal, or be one of for `{"$in": [...]}`
+            rescore_factor: candidates shortlisted per result from a compressed matrix before rescoring
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if not len(self):
+            return [[] for _ in queries]
+        stored_queries = self.projection.apply(queries) if self.projection is not None else queries
+        # An int8 row times the per-dimension scales is the vector it quantises
+        scaled_queries = stored_queries * self.scales if self.scales is not None else stored_queries
+        products = np.empty((len(self), len(queries)), dtype=np.float32)
+        for start in range(0, len(self), BLOCK_ROWS):
+            block = np.asarray(self.vectors[start : start + BLOCK_ROWS], dtype=np.float32)
+            products[start : start + BLOCK_ROWS] = block @ scaled_queries.T
+        distances = np.asarray(self.norms)[:, None] - 2 * products + (stored_queries**2).sum(axis=1)[None, :]
+
+        mask = self._mask(where)
+        if mask is not None:
+            distances[~mask] = np.inf
+        candidates = int(mask.sum()) if mask is not None else len(self)
+        k = min(k, candidates)
+        if k <= 0:
+            return [[] for _ in queries]
+        shortlist = min(k * rescore_factor, candidates) if self.compressed else k
+
+        results = []
+        for query, column in zip(queries, distances.T):
+            top = np.argpartition(column, shortlist - 1)[:shortlist]
+            if self.compressed:
+                # Full-precision distances for the shortlist only, read from disk row by row
+                rows = np.sort(top)
+                exact = ((np.asarray(self.full[rows], dtype=np.float32) - query) ** 2).sum(axis=1)
+                order = np.argsort(exact)[:k]
+                results.append([(int(rows[i]), float(exact[i])) for i in order])
+            else:
+                top = top[np.argsort(column[top])]
+                results.append([(int(row), float(max(column[row], 0.0))) for row in top])
+        return results
+
+    def document(self, row: int) -> Document:
+        return Document(page_content=self.documents[row], metadata=dict(self.metadatas[row] or {}))
+
+
+def _matches(stored: Any, wanted: Any) -> bool:
+    if isinstance(wanted, dict):
+        return stored in wanted["$in"]
+    return stored == wanted
+
+
+def _save(path: Path, array: np.ndarray) -> None:
+    """Save an array under a temporary name and move it into place"""
+    temporary = path.with_suffix(".tmp.npy")
+    np.save(temporary, array)
+    os.replace(temporary, path)
+
+
+class ExactVectorStore(VectorStore):
+    """Read-only vector store answering searches exactly from an `ExactIndex`"""
+
+    def __init__(self, index: ExactIndex, embedding_function: Embeddings):
+        self.index = index
+        self.embedding_function = embedding_function
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding_function
+
+    def similarity_search_by_vectors_with_relevance_scores(
+        self, embeddings: List[List[float]], k: int = 4, filter: Optional[dict] = None
+    ) -> List[List[Tuple[Document, float]]]:
+        """Search for several query vectors at once, returning each one's documents and distances"""
+        return [
+            [(self.index.document(row), distance) for row, distance in hits]
+            for hits in self.index.search(np.asarray(embeddings, dtype=np.float32), k, where=filter)
+        ]
+
+    def similarity_search_by_vector_with_relevance_scores(
+        self, embedding: List[float], k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vectors_with_relevance_scores([embedding], k, filter)[0]
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_relevance_scores(embedding, k, filter)]
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_relevance_scores(
+            self.embedding_function.embed_query(query), k, filter
+        )
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        return self._euclidean_relevance_score_fn
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, **kwargs: Any) -> List[str]:
+        raise NotImplementedError("ExactVectorStore is read-only; add texts to the collection it is built from")
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None, **kwargs):
+        raise NotImplementedError("ExactVectorStore is built from a collection's stored embeddings")
+
+
+def supports_exact_filter(where: Optional[dict]) -> bool:
+    """Whether a Chroma filter is metadata equality or `$in` a list, which `ExactIndex` can apply"""
+    return all(
+        not key.startswith("$") and (not isinstance(value, dict) or list(value) == ["$in"])
+        for key, value in (where or {}).items()
+    )
+
+
+_build_lock = threading.Lock()
+
+
+def open_exact_index(
+    directory: Path,
+    count: int,
+    load: Callable[[], dict],
+    dtype: str = "float32",
+    projection: Optional[Projection] = None,
+) -> ExactIndex:
+    """
+    Open the exact index at `directory` if it holds `count` rows stored as asked, otherwise rebuild it from
+    `load()`, which returns a Chroma `get` result with ids, embeddings, documents and metadatas
+    """
+    with _build_lock:
+        try:
+            index = ExactIndex(directory)
+            if len(index) == count and (not count or index.params == _index_params(dtype, projection)):
+                return index
+        except (OSError, ValueError, KeyError):
+            pass
+        records = load()
+        return ExactIndex.build(
+            directory,
+            list(records["ids"]),
+            records["embeddings"],
+            list(records["documents"]),
+            [metadata or {} for metadata in records["metadatas"]],
+            dtype=dtype,
+            projection=projection,
+        )
@@ -0,0 +1,153 @@
+import os
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from sqlalchemy import select, text, update
+from sqlalchemy.orm import Session
+
+from scout.DataIngest.models.schemas import Chunk as PyChunk
+from scout.DataIngest.models.schemas import ChunkCreate
+from scout.utils.storage.postgres_database import SessionLocal
+from scout.utils.storage.postgres_models import Chunk as SqChunk
+from scout.utils.storage.postgres_models import File as SqFile
+
+
+class PgVectorStore(VectorStore):
+    """
+    Vector store over the `embedding` column of the chunk table, searched with pgvector's cosine distance
+    and its HNSW index.
+
+    Chunk rows are the only copy of each chunk, so every backend worker sees the same vectors and nothing
+    can drift out of step with the database. Filters are applied in SQL: `project` matches the chunk's file's
+    project and `parent_doc_uuid` its file, or with `{"$in": [...]}` any of several files.
+    """
+
+    def __init__(
+        self,
+        embedding_function: Embeddings,
+        session_factory: Callable[[], Session] = SessionLocal,
+        ef_search: int = None,
+    ):
+        self.embedding_function = embedding_function
+        self.session_factory = session_factory
+        # Candidates the HNSW scan considers; headroom over k keeps filtered searches from coming up short
+        self.ef_search = ef_search or int(os.getenv("SCOUT_HNSW_SEARCH_EF", "100"))
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding_function
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        """Embed texts and save the vectors on their existing chunk rows, by chunk ID, in one transaction"""
+        texts = list(texts)
+        if ids is None:
+            ids = [metadata["uuid"] for metadata in metadatas or []]
+        if len(ids) != len(texts):
+            raise ValueError("PgVectorStore needs the chunk ID of every text")
+        vectors = self.embedding_function.embed_documents(texts)
+        with self.session_factory() as db:
+            db.execute(
+                update(SqChunk),
+                [{"id": UUID(str(chunk_id)), "embedding": vector} for chunk_id, vector in zip(ids, vectors)],
+            )
+            db.commit()
+        return [str(chunk_id) for chunk_id in ids]
+
+    def add_chunks(self, chunks: List[ChunkCreate]) -> List[PyChunk]:
+        """Embed chunks and write their rows with their vectors in one transaction"""
+        vectors = self.embedding_function.embed_documents([chunk.text for chunk in chunks])
+        with self.session_factory() as db:
+            rows = [
+                SqChunk(
+                    idx=chunk.idx, text=chunk.text, page_num=chunk.page_num, file_id=chunk.file.id, embedding=vector
+                )
+                for chunk, vector in zip(chunks, vectors)
+            ]
+            db.add_all(rows)
+            db.commit()
+            return [PyChunk.model_validate(row) for row in rows]
+
+    def similarity_search_by_vector_with_relevance_scores(
+        self, embedding: List[float], k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        """The k nearest chunks with their cosine distances"""
+        distance = SqChunk.embedding.cosine_distance(embedding).label("distance")
+        query = (
+            select(
+                SqChunk.id, SqChunk.idx, SqChunk.text, SqChunk.page_num, SqChunk.file_id, SqFile.project_id, distance
+            )
+            .join(SqFile, SqChunk.file_id == SqFile.id)
+            .where(SqChunk.embedding.is_not(None))
+        )
+        filter = filter or {}
+        if filter.get("project") is not None:
+            query = query.where(SqFile.project_id == UUID(str(filter["project"])))
+        if isinstance(filter.get("parent_doc_uuid"), dict):
+            file_ids = [UUID(str(file_id)) for file_id in filter["parent_doc_uuid"]["$in"]]
+            query = query.where(SqChunk.file_id.in_(file_ids))
+        elif filter.get("parent_doc_uuid") is not None:
+            query = query.where(SqChunk.file_id == UUID(str(filter["parent_doc_uuid"])))
+        query = query.order_by(distance).limit(k)
+
+        with self.session_factory() as db:
+            # SET LOCAL lasts for this transaction only
+            db.execute(text(f"SET LOCAL hnsw.ef_search = {max(int(self.ef_search), k)}"))
+            if filter:
+                # Filters apply after the scan, so keep scanning until k chunks pass them (pgvector >= 0.8)
+                db.execute(text("SET LOCAL hnsw.iterative_scan = strict_order"))
+            rows = db.execute(query).all()
+        return [(_row_to_document(row), row.distance) for row in rows]
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_relevance_scores(embedding, k, filter)]
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_relevance_scores(
+            self.embedding_function.embed_query(query), k, filter
+        )
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        return self._cosine_relevance_score_fn
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> "PgVectorStore":
+        store = cls(embedding_function=embedding, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
+
+
+def _row_to_document(row) -> Document:
+    # The same metadata as add_chunks_to_vector_store gives Chroma documents
+    return Document(
+        page_content=row.text,
+        metadata={
+            "uuid": str(row.id),
+            "project": str(row.project_id),
+            "parent_doc_uuid": str(row.file_id),
+            "idx": row.idx,
+            "page_num": row.page_num,
+        },
+    )
@@ -1,18 +1,20 @@
 from datetime import datetime
 import logging
 from uuid import UUID
-from typing import Generator
+from typing import Generator, Optional
 
 from decorator import contextmanager
 from sqlalchemy import or_
 from sqlalchemy.orm import Session
-from sqlalchemy import select, insert
+from sqlalchemy import cast, func, select, insert, tuple_, update, Text
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert, TSQUERY
 
 from scout.DataIngest.models.schemas import AuditLogCreate, Chunk as PyChunk
 from scout.DataIngest.models.schemas import ChunkCreate
 from scout.DataIngest.models.schemas import ChunkFilter
+from scout.DataIngest.models.schemas import ChunkSearchResult
+from scout.DataIngest.models.schemas import ChunkText
 from scout.DataIngest.models.schemas import ChunkUpdate
 from scout.DataIngest.models.schemas import Criterion as PyCriterion
 from scout.DataIngest.models.schemas import CriterionCreate
@@ -21,6 +23,7 @@ from scout.DataIngest.models.schemas import CriterionUpdate
 from scout.DataIngest.models.schemas import File as PyFile
 from scout.DataIngest.models.schemas import FileCreate
 from scout.DataIngest.models.schemas import FileFilter
+from scout.DataIngest.models.schemas import FileMetadata
 from scout.DataIngest.models.schemas import FileUpdate
 from scout.DataIngest.models.schemas import Project as PyProject
 from scout.DataIngest.models.schemas import ProjectCreate
@@ -45,6 +48,7 @@ from scout.DataIngest.models.schemas import Role as PyRole
 from scout.DataIngest.models.schemas import RoleEnum
 from scout.utils.storage.filesystem import S3StorageHandler
 from scout.utils.storage.postgres_database import SessionLocal
+from scout.utils.storage.postgres_models import CategorySummary as SqCategorySummary
 from scout.utils.storage.postgres_models import Chunk as SqChunk
 from scout.utils.storage.postgres_models import Criterion as SqCriterion
 from scout.utils.storage.postgres_models import CriterionGate
@@ -55,6 +59,7 @@ from scout.utils.storage.postgres_models import project_users
 from scout.utils.storage.postgres_models import Rating as SqRating
 from scout.utils.storage.postgres_models import Result as SqResult
 from scout.utils.storage.postgres_models import result_chunks
+from scout.utils.storage.postgres_models import TEXT_SEARCH_CONFIG
 from scout.utils.storage.postgres_models import User as SqUser
 from scout.utils.storage.postgres_models import AuditLog as SqAuditLog
 from scout.utils.storage.postgres_models import Role as SqRole
@@ -174,6 +179,170 @@ def get_by_id(
             logger.exception(f"Failed to get item by id, {model}, {object_id}")
 
 
+def update_criterion_clusters(cluster_ids: dict[UUID, Optional[int]]) -> int:
+    """Set the cluster of each criterion, or None for criteria outside any cluster. Returns the number updated."""
+    if not cluster_ids:
+        return 0
+    with SessionManager() as db:
+        try:
+            db.execute(
+                update(SqCriterion),
+                [{"id": criterion_id, "cluster_id": cluster_id} for criterion_id, cluster_id in cluster_ids.items()],
+            )
+            db.commit()
+            return len(cluster_ids)
+        except Exception as _:
+            db.rollback()
+            logger.exception("Failed to update criterion clusters")
+            raise
+
+
+def get_chunk_set_version(project_id: UUID) -> Optional[int]:
+    """The version of a project's chunk set, 0 for an unknown project, or None if it cannot be read."""
+    with SessionManager() as db:
+        try:
+            version = db.execute(
+                select(SqProject.chunk_set_version).where(SqProject.id == project_id)
+            ).scalar_one_or_none()
+            return version or 0
+        except Exception as _:
+            logger.exception(f"Failed to get the chunk set version of project {project_id}")
+            return None
+
+
+def bump_chunk_set_version(project_id: UUID) -> int:
+    """Increment a project's chunk set version, returning the new version."""
+    with SessionManager() as db:
+        try:
+            version = db.execute(
+                update(SqProject)
+                .where(SqProject.id == project_id)
+                .values(chunk_set_version=SqProject.chunk_set_version + 1)
+                .returning(SqProject.chunk_set_version)
+            ).scalar_one_or_none()
+            db.commit()
+            return version or 0
+        except Exception as _:
+            db.rollback()
+            logger.exception(f"Failed to bump the chunk set version of project {project_id}")
+            raise
+
+
+def get_category_summary(project_id: UUID, category: str, input_hash: str) -> Optional[str]:
+    """A project's stored summary of a category for these inputs, or None if there is none."""
+    with SessionManager() as db:
+        try:
+            return db.execute(
+                select(SqCategorySummary.summary).where(
+                    SqCategorySummary.project_id == project_id,
+                    SqCategorySummary.category == category,
+                    SqCategorySummary.input_hash == input_hash,
+                )
+            ).scalar_one_or_none()
+        except Exception as _:
+            logger.exception(f"Failed to get the {category} summary of project {project_id}")
+            return None
+
+
+def save_category_summary(project_id: UUID, category: str, input_hash: str, summary: str) -> None:
+    """Store a project's summary of a category, keeping the existing one if another process stored it first."""
+    with SessionManager() as db:
+        try:
+            db.execute(
+                pg_insert(SqCategorySummary)
+                .values(project_id=project_id, category=category, input_hash=input_hash, summary=summary)
+                .on_conflict_do_nothing()
+            )
+            db.commit()
+        except Exception as _:
+            db.rollback()
+            logger.exception(f"Failed to save the {category} summary of project {project_id}")
+            raise
+
+
+def get_file_metadata(file_ids: list[UUID]) -> list[FileMetadata]:
+    """Read the prompt-relevant fields for a list of files in a single query."""
+    if not file_ids:
+        return []
+    with SessionManager() as db:
+        try:
+            rows = db.execute(
+                select(
+                    SqFile.id,
+                    SqFile.name,
+                    SqFile.clean_name,
+                    SqFile.source,
+                    SqFile.summary,
+                    SqFile.published_date,
+                ).where(SqFile.id.in_(list(set(file_ids))))
+            ).all()
+            return [FileMetadata.model_validate(row._asdict()) for row in rows]
+        except Exception as _:
+            logger.exception(f"Failed to get file metadata, {file_ids}")
+            return []
+
+
+def get_chunks_by_position(positions: list[tuple[UUID, int]]) -> list[ChunkText]:
+    """Read the chunks at a list of (file id, index) positions in a single query."""
+    if not positions:
+        return []
+    with SessionManager() as db:
+        try:
+            rows = db.execute(
+                select(
+                    SqChunk.id,
+                    SqChunk.file_id,
+                    SqChunk.idx,
+                    SqChunk.page_num,
+                    SqChunk.text,
+                ).where(tuple_(SqChunk.file_id, SqChunk.idx).in_(list(set(positions))))
+            ).all()
+            return [ChunkText.model_validate(row._asdict()) for row in rows]
+        except Exception as _:
+            logger.exception(f"Failed to get chunks by position, {positions}")
+            return []
+
+
+def search_chunks_text(
+    query: str,
+    limit: int,
+    project_id: Optional[UUID] = None,
+    file_ids: Optional[list[UUID]] = None,
+) -> list[ChunkSearchResult]:
+    """
+    Full-text search of chunk text, best matches first. A chunk matches if it contains any of the query's
+    terms, and is ranked by ts_rank_cd, which favours chunks with more of the terms close together.
+    """
+    # plainto_tsquery joins every term with &, so swap in | to match chunks holding any of them
+    all_terms = cast(func.plainto_tsquery(TEXT_SEARCH_CONFIG, query), Text)
+    any_term = cast(func.replace(all_terms, "&", "|"), TSQUERY)
+    rank = func.ts_rank_cd(SqChunk.text_search, any_term, 1).label("rank")
+    statement = (
+        select(
+            SqChunk.id,
+            SqChunk.file_id,
+            SqChunk.idx,
+            SqChunk.page_num,
+            SqChunk.text,
+            SqFile.project_id,
+            rank,
+        )
+        .join(SqFile, SqChunk.file_id == SqFile.id)
+        .where(SqChunk.text_search.op("@@")(any_term))
+    )
+    if project_id is not None:
+        statement = statement.where(SqFile.project_id == project_id)
+    if file_ids is not None:
+        statement = statement.where(SqChunk.file_id.in_(file_ids))
+    with SessionManager() as db:
+        try:
+            rows = db.execute(statement.order_by(rank.desc()).limit(limit)).all()
+            return [ChunkSearchResult.model_validate(row._asdict()) for row in rows]
+        except Exception as _:
+            logger.exception(f"Failed to search chunk text, {query}")
+            return []
+
+
 def get_or_create_item(
     model: CriterionCreate | ChunkCreate | FileCreate | ProjectCreate | ResultCreate | UserCreate | RatingCreate | AuditLogCreate,
 ) -> PyProject | PyResult | PyUser | PyChunk | PyFile | PyCriterion | PyRating | PyAuditLog:
@@ -402,6 +571,7 @@ def _get_or_create_result(
     item_to_add = sq_model(
         answer=model.answer,
         full_text=model.full_text,
+        evidence_fingerprint=model.evidence_fingerprint,
         project_id=model.project,  # Now using UUID directly
         criterion_id=model.criterion,  # Now using UUID directly
     )
@@ -706,9 +876,12 @@ def _update_result(model: ResultUpdate, db: Session) -> PyResult | None:
         return None
     item.answer = model.answer
     item.full_text = model.full_text
+    item.evidence_fingerprint = model.evidence_fingerprint
     if model.project is not None:
-        item.project_id = model.project.id
-    item.criterion_id = model.criterion.id if model.criterion else None
+        item.project_id = model.project
+    item.criterion_id = model.criterion
+    if model.chunks:
+        item.chunks = [chunk for chunk in (db.get(SqChunk, chunk_id) for chunk_id in model.chunks) if chunk]
 
     db.commit()
     db.flush()  # Refresh updated item
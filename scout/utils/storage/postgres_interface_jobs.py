@@ -0,0 +1,420 @@
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from uuid import UUID
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from scout.DataIngest.models.schemas import EvaluationEvent as PyEvaluationEvent
+from scout.DataIngest.models.schemas import EvaluationJob as PyEvaluationJob
+from scout.DataIngest.models.schemas import EvaluationJobCreate
+from scout.DataIngest.models.schemas import EvaluationTask as PyEvaluationTask
+from scout.DataIngest.models.schemas import JobStatus as PyJobStatus
+from scout.utils.llm_formats import merge_stage_stats
+from scout.utils.storage.postgres_models import EvaluationEvent as SqEvaluationEvent
+from scout.utils.storage.postgres_models import EvaluationJob as SqEvaluationJob
+from scout.utils.storage.postgres_models import EvaluationTask as SqEvaluationTask
+from scout.utils.storage.postgres_models import JobStatus
+from scout.utils.storage.postgres_models import RateBudget as SqRateBudget
+
+UNFINISHED_STATUSES = (JobStatus.QUEUED, JobStatus.RUNNING)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def create_evaluation_job(db: Session, job: EvaluationJobCreate) -> PyEvaluationJob:
+    """
+    Queue a new evaluation job.
+    """
+    sq_job = SqEvaluationJob(
+        project_id=job.project_id,
+        user_id=job.user_id,
+        parameters=job.parameters,
+        status=JobStatus.QUEUED,
+    )
+    db.add(sq_job)
+    db.commit()
+    db.refresh(sq_job)
+    return PyEvaluationJob.model_validate(sq_job)
+
+
+def get_evaluation_job(db: Session, job_id: UUID) -> Optional[PyEvaluationJob]:
+    """
+    Get an evaluation job by its ID.
+    """
+    job = db.execute(select(SqEvaluationJob).where(SqEvaluationJob.id == job_id)).scalar_one_or_none()
+    if job:
+        return PyEvaluationJob.model_validate(job)
+    return None
+
+
+def claim_evaluation_job(
+    db: Session, worker_id: str, stale_after: timedelta, max_attempts: int = 3
+) -> Optional[PyEvaluationJob]:
+    """
+    Claim the oldest queued job for a worker, so it can be split into tasks.
+
+    A running job that was never split into tasks and whose worker has not sent a heartbeat within
+    `stale_after` is assumed to belong to a worker that died, and is claimed again. Rows are locked
+    with SKIP LOCKED, so concurrent workers never block on, or claim, the same job.
+    """
+    stale_before = _now() - stale_after
+    job = (
+        db.execute(
+            select(SqEvaluationJob)
+            .where(
+                or_(
+                    SqEvaluationJob.status == JobStatus.QUEUED,
+                    and_(
+                        SqEvaluationJob.status == JobStatus.RUNNING,
+                        SqEvaluationJob.total_criteria.is_(None),
+                        SqEvaluationJob.heartbeat_datetime < stale_before,
+                    ),
+                ),
+                SqEvaluationJob.attempts < max_attempts,
+            )
+            .order_by(SqEvaluationJob.created_datetime)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        .scalars()
+        .first()
+    )
+    if job is None:
+        db.rollback()
+        return None
+
+    now = _now()
+    job.status = JobStatus.RUNNING
+    job.worker_id = worker_id
+    job.attempts += 1
+    job.heartbeat_datetime = now
+    job.started_datetime = job.started_datetime or now
+    db.commit()
+    db.refresh(job)
+    return PyEvaluationJob.model_validate(job)
+
+
+def fail_abandoned_evaluation_jobs(db: Session, stale_after: timedelta, max_attempts: int = 3) -> int:
+    """
+    Mark stale jobs that have used all their attempts without being split into tasks as failed,
+    so they are not left running forever.
+    """
+    jobs = (
+        db.execute(
+            select(SqEvaluationJob)
+            .where(
+                SqEvaluationJob.status == JobStatus.RUNNING,
+                SqEvaluationJob.total_criteria.is_(None),
+                SqEvaluationJob.heartbeat_datetime < _now() - stale_after,
+                SqEvaluationJob.attempts >= max_attempts,
+            )
+            .with_for_update(skip_locked=True)
+        )
+        .scalars()
+        .all()
+    )
+    for job in jobs:
+        job.status = JobStatus.FAILED
+        job.error = f"Abandoned after {job.attempts} attempts"
+        job.finished_datetime = _now()
+    db.commit()
+    return len(jobs)
+
+
+def split_evaluation_job(db: Session, job_id: UUID, criterion_ids: List[UUID]) -> PyEvaluationJob:
+    """
+    Split a claimed job into one task per criterion. A job with no criteria is completed at once.
+    """
+    job = db.execute(select(SqEvaluationJob).where(SqEvaluationJob.id == job_id).with_for_update()).scalar_one()
+    # A reclaimed job may have been partly split before its worker died
+    db.query(SqEvaluationTask).filter(SqEvaluationTask.job_id == job.id).delete()
+    db.add_all(
+        [
+            SqEvaluationTask(job_id=job.id, project_id=job.project_id, criterion_id=criterion_id)
+            for criterion_id in dict.fromkeys(criterion_ids)
+        ]
+    )
+    job.total_criteria = len(set(criterion_ids))
+    job.processed_criteria = 0
+    job.heartbeat_datetime = _now()
+    if not criterion_ids:
+        job.status = JobStatus.COMPLETED
+        job.finished_datetime = _now()
+    db.commit()
+    db.refresh(job)
+    return PyEvaluationJob.model_validate(job)
+
+
+def _advance_job(db: Session, job: SqEvaluationJob) -> None:
+    """
+    Update a job from the state of its tasks: record progress, queue the summary task once every
+    criterion task has finished, and finish the job once the summary is done.
+    Must be called with the job row locked, so only one worker ever queues the summary.
+    """
+    counts = dict(
+        db.execute(
+            select(SqEvaluationTask.status, func.count())
+            .where(SqEvaluationTask.job_id == job.id, SqEvaluationTask.kind == "criterion")
+            .group_by(SqEvaluationTask.status)
+        ).all()
+    )
+    unfinished = sum(counts.get(status, 0) for status in UNFINISHED_STATUSES)
+    job.processed_criteria = sum(counts.values()) - unfinished
+    job.heartbeat_datetime = _now()
+    if unfinished or job.status != JobStatus.RUNNING:
+        return
+
+    if job.cancel_requested:
+        job.status = JobStatus.CANCELLED
+        job.finished_datetime = _now()
+        return
+
+    summary_task = db.execute(
+        select(SqEvaluationTask).where(SqEvaluationTask.job_id == job.id, SqEvaluationTask.kind == "summary")
+    ).scalar_one_or_none()
+    if summary_task is None:
+        db.add(SqEvaluationTask(job_id=job.id, project_id=job.project_id, kind="summary"))
+        return
+    if summary_task.status in UNFINISHED_STATUSES:
+        return
+
+    failed = counts.get(JobStatus.FAILED, 0)
+    if summary_task.status == JobStatus.FAILED:
+        job.status, job.error = JobStatus.FAILED, f"Summary failed: {summary_task.error}"
+    elif failed:
+        job.status, job.error = JobStatus.FAILED, f"{failed} of {job.total_criteria} criteria failed"
+    else:
+        job.status = JobStatus.COMPLETED
+    job.finished_datetime = _now()
+
+
+def _lock_job(db: Session, job_id: UUID) -> SqEvaluationJob:
+    return db.execute(select(SqEvaluationJob).where(SqEvaluationJob.id == job_id).with_for_update()).scalar_one()
+
+
+def claim_evaluation_task(
+    db: Session, worker_id: str, stale_after: timedelta, max_attempts: int = 3
+) -> Optional[PyEvaluationTask]:
+    """
+    Claim the oldest queued task for a worker, or a running task whose worker has stopped sending heartbeats.
+    """
+    task = (
+        db.execute(
+            select(SqEvaluationTask)
+            .where(
+                or_(
+                    SqEvaluationTask.status == JobStatus.QUEUED,
+                    and_(
+                        SqEvaluationTask.status == JobStatus.RUNNING,
+                        SqEvaluationTask.heartbeat_datetime < _now() - stale_after,
+                    ),
+                ),
+                SqEvaluationTask.attempts < max_attempts,
+            )
+            .order_by(SqEvaluationTask.created_datetime)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        .scalars()
+        .first()
+    )
+    if task is None:
+        db.rollback()
+        return None
+
+    task.status = JobStatus.RUNNING
+    task.worker_id = worker_id
+    task.attempts += 1
+    task.heartbeat_datetime = _now()
+    db.commit()
+    db.refresh(task)
+    return PyEvaluationTask.model_validate(task)
+
+
+def heartbeat_evaluation_task(db: Session, task_id: UUID, worker_id: str) -> bool:
+    """
+    Refresh the heartbeat of a task the worker is running, so it is not reclaimed as abandoned.
+    Returns False if the task is no longer running under this worker.
+    """
+    updated = db.execute(
+        update(SqEvaluationTask)
+        .where(
+            SqEvaluationTask.id == task_id,
+            SqEvaluationTask.worker_id == worker_id,
+            SqEvaluationTask.status == JobStatus.RUNNING,
+        )
+        .values(heartbeat_datetime=_now())
+    ).rowcount
+    db.commit()
+    return updated > 0
+
+
+def complete_evaluation_task(
+    db: Session, task_id: UUID, result_id: Optional[UUID] = None, stage_stats: Optional[dict] = None
+) -> PyEvaluationJob:
+    """
+    Mark a task as done and advance its job, queueing the summary after the last criterion.
+    The task's LLM usage per stage is added to the job's.
+    """
+    task = db.get(SqEvaluationTask, task_id)
+    job = _lock_job(db, task.job_id)
+    if stage_stats:
+        job.stage_stats = merge_stage_stats(job.stage_stats, stage_stats)
+    task.status = JobStatus.COMPLETED
+    task.result_id = result_id
+    task.error = None
+    task.finished_datetime = _now()
+    db.flush()
+    _advance_job(db, job)
+    db.commit()
+    db.refresh(job)
+    return PyEvaluationJob.model_validate(job)
+
+
+def fail_evaluation_task(
+    db: Session, task_id: UUID, error: str, max_attempts: int = 3, stage_stats: Optional[dict] = None
+) -> PyEvaluationJob:
+    """
+    Record a task failure. The task is queued again until it has used all its attempts.
+    """
+    task = db.get(SqEvaluationTask, task_id)
+    job = _lock_job(db, task.job_id)
+    if stage_stats:
+        job.stage_stats = merge_stage_stats(job.stage_stats, stage_stats)
+    task.error = error
+    if task.attempts < max_attempts and not job.cancel_requested:
+        task.status = JobStatus.QUEUED
+    else:
+        task.status = JobStatus.FAILED
+        task.finished_datetime = _now()
+    db.flush()
+    _advance_job(db, job)
+    db.commit()
+    db.refresh(job)
+    return PyEvaluationJob.model_validate(job)
+
+
+def fail_abandoned_evaluation_tasks(db: Session, stale_after: timedelta, max_attempts: int = 3) -> int:
+    """
+    Mark stale tasks that have used all their attempts as failed, advancing their jobs.
+    """
+    tasks = (
+        db.execute(
+            select(SqEvaluationTask)
+            .where(
+                SqEvaluationTask.status == JobStatus.RUNNING,
+                SqEvaluationTask.heartbeat_datetime < _now() - stale_after,
+                SqEvaluationTask.attempts >= max_attempts,
+            )
+            .with_for_update(skip_locked=True)
+        )
+        .scalars()
+        .all()
+    )
+    for task in tasks:
+        task.status = JobStatus.FAILED
+        task.error = f"Abandoned after {task.attempts} attempts"
+        task.finished_datetime = _now()
+    db.flush()
+    for job_id in {task.job_id for task in tasks}:
+        _advance_job(db, _lock_job(db, job_id))
+    db.commit()
+    return len(tasks)
+
+
+def request_evaluation_job_cancellation(db: Session, job_id: UUID) -> Optional[PyEvaluationJob]:
+    """
+    Cancel a job. Queued jobs and tasks are cancelled at once; running tasks finish their current criterion.
+    """
+    job = db.execute(select(SqEvaluationJob).where(SqEvaluationJob.id == job_id).with_for_update()).scalar_one_or_none()
+    if job is None:
+        return None
+    if job.status == JobStatus.QUEUED:
+        job.status = JobStatus.CANCELLED
+        job.finished_datetime = _now()
+    elif job.status == JobStatus.RUNNING:
+        job.cancel_requested = True
+        db.query(SqEvaluationTask).filter(
+            SqEvaluationTask.job_id == job.id, SqEvaluationTask.status == JobStatus.QUEUED
+        ).update({SqEvaluationTask.status: JobStatus.CANCELLED, SqEvaluationTask.finished_datetime: _now()})
+        db.flush()
+        if job.total_criteria is not None:
+            _advance_job(db, job)
+    db.commit()
+    db.refresh(job)
+    return PyEvaluationJob.model_validate(job)
+
+
+def finish_evaluation_job(
+    db: Session, job_id: UUID, status: PyJobStatus, error: Optional[str] = None
+) -> Optional[PyEvaluationJob]:
+    """
+    Record the final status of a job.
+    """
+    job = db.get(SqEvaluationJob, job_id)
+    if job is None:
+        return None
+    job.status = JobStatus(PyJobStatus(status).value)
+    job.error = error
+    job.finished_datetime = _now()
+    db.commit()
+    db.refresh(job)
+    return PyEvaluationJob.model_validate(job)
+
+
+def acquire_rate_budget(db: Session, name: str, capacity: float, refill_per_second: float, cost: float = 1.0) -> float:
+    """
+    Take `cost` tokens from a token bucket shared by every worker.
+
+    The bucket refills at `refill_per_second` up to `capacity`. Returns 0 if the tokens were taken,
+    or the number of seconds to wait before there will be enough.
+    """
+    db.execute(
+        pg_insert(SqRateBudget).values(name=name, tokens=capacity, updated_datetime=_now()).on_conflict_do_nothing()
+    )
+    budget = db.execute(select(SqRateBudget).where(SqRateBudget.name == name).with_for_update()).scalar_one()
+    now = _now()
+    elapsed = max((now - budget.updated_datetime).total_seconds(), 0.0)
+    tokens = min(capacity, budget.tokens + elapsed * refill_per_second)
+
+    wait = 0.0
+    if tokens >= cost:
+        tokens -= cost
+    else:
+        wait = (cost - tokens) / refill_per_second
+    budget.tokens = tokens
+    budget.updated_datetime = now
+    db.commit()
+    return wait
+
+
+def record_evaluation_event(db: Session, job_id: UUID, stage: str, **details) -> PyEvaluationEvent:
+    """
+    Record a progress event for a job. Details may include task_id, criterion_id, result_id and message.
+    """
+    event = SqEvaluationEvent(job_id=job_id, stage=stage, **details)
+    db.add(event)
+    db.commit()
+    db.refresh(event)
+    return PyEvaluationEvent.model_validate(event)
+
+
+def get_evaluation_events(db: Session, job_id: UUID, after_id: int = 0, limit: int = 500) -> List[PyEvaluationEvent]:
+    """
+    Get a job's events in the order they were recorded, starting after the event with ID `after_id`.
+    """
+    events = (
+        db.execute(
+            select(SqEvaluationEvent)
+            .where(SqEvaluationEvent.job_id == job_id, SqEvaluationEvent.id > after_id)
+            .order_by(SqEvaluationEvent.id)
+            .limit(limit)
+        )
+        .scalars()
+        .all()
+    )
+    return [PyEvaluationEvent.model_validate(event) for event in events]
@@ -1,13 +1,23 @@
 import enum
+import os
 import uuid
 
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String, Table, func, JSON, Text, UniqueConstraint
-from sqlalchemy.dialects.postgresql import ENUM, UUID, JSONB
-from sqlalchemy.orm import relationship
+from sqlalchemy import BigInteger, Boolean, Column, Computed, DateTime, Float, ForeignKey, Index, Integer, String, Table, func, JSON, Text, UniqueConstraint
+from sqlalchemy.dialects.postgresql import ENUM, TSVECTOR, UUID, JSONB
+from sqlalchemy.orm import deferred, relationship
+from pgvector.sqlalchemy import Vector
 
 from scout.utils.storage.postgres_database import Base
 from scout.utils.storage.postgres_models_llm import LLMModel
 
+# Dimension of the embedding model's vectors, fixed by the chunk.embedding column
+EMBEDDING_DIMENSION = int(os.getenv("SCOUT_EMBEDDING_DIMENSION", "1024"))
+# Build parameters of the chunk.embedding HNSW index, see scripts/benchmark_hnsw.py
+HNSW_M = int(os.getenv("SCOUT_HNSW_M", "16"))
+HNSW_CONSTRUCTION_EF = int(os.getenv("SCOUT_HNSW_CONSTRUCTION_EF", "200"))
+# Text search configuration of the chunk.text_search column, which queries must match to use its index
+TEXT_SEARCH_CONFIG = "english"
+
 project_users = Table(
     "project_users",
     Base.metadata,
@@ -123,6 +133,7 @@ class Criterion(Base):
     category = Column(String, nullable=False)
     question = Column(String, nullable=False)
     evidence = Column(String, nullable=False)
+    cluster_id = Column(Integer, nullable=True, index=True)  # Cluster of similar criteria, set by cluster_criteria
     created_datetime = Column(DateTime(timezone=True), server_default=func.now())
     updated_datetime = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -143,6 +154,8 @@ class Result(Base):
     id = Column(UUID(as_uuid=True), default=uuid.uuid4, primary_key=True)
     answer = Column(String, nullable=False)
     full_text = Column(String, nullable=False)
+    # Hash of the chunk IDs and contents the answer was based on, used for incremental re-evaluation
+    evidence_fingerprint = Column(String, nullable=True)
     created_datetime = Column(DateTime(timezone=True), server_default=func.now())
     updated_datetime = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -174,6 +187,10 @@ class File(Base):
     updated_datetime = Column(DateTime(timezone=True), onupdate=func.now())
     # TODO add back in file hash to avoid double uploads, do it the way redbox does
 
+    # Embedding of the file's name and summary, searched to pick the files whose chunks a query searches.
+    # Only filled when SCOUT_SUMMARY_FILE_K is above 0, but always present
+    summary_embedding = deferred(Column(Vector(EMBEDDING_DIMENSION), nullable=True))
+
     project_id = Column(UUID, ForeignKey("project.id"))
     project = relationship("Project", back_populates="files")
 
@@ -190,11 +207,30 @@ class Chunk(Base):
     created_datetime = Column(DateTime(timezone=True), server_default=func.now())
     updated_datetime = Column(DateTime(timezone=True), onupdate=func.now())
 
+    # Deferred so reading chunks does not load their vectors. Present whatever the vector store, so Postgres
+    # always needs the pgvector extension
+    embedding = deferred(Column(Vector(EMBEDDING_DIMENSION), nullable=True))
+    # Generated by Postgres from the text as chunks are written, for lexical search
+    text_search = deferred(Column(TSVECTOR, Computed(f"to_tsvector('{TEXT_SEARCH_CONFIG}', text)", persisted=True)))
+
     file_id = Column(UUID, ForeignKey("file.id"))
     file = relationship("File", back_populates="chunks")
 
     results = relationship("Result", secondary="result_chunks", back_populates="chunks")
 
+    __table_args__ = (
+        # Neighbouring chunks are looked up by their position in a file
+        Index("ix_chunk_file_id_idx", "file_id", "idx"),
+        Index(
+            "ix_chunk_embedding_hnsw",
+            "embedding",
+            postgresql_using="hnsw",
+            postgresql_with={"m": HNSW_M, "ef_construction": HNSW_CONSTRUCTION_EF},
+            postgresql_ops={"embedding": "vector_cosine_ops"},
+        ),
+        Index("ix_chunk_text_search", "text_search", postgresql_using="gin"),
+    )
+
 
 class Project(Base):
     __tablename__ = "project"
@@ -205,6 +241,8 @@ class Project(Base):
     created_datetime = Column(DateTime(timezone=True), server_default=func.now())
     updated_datetime = Column(DateTime(timezone=True), onupdate=func.now())
     knowledgebase_id = Column(String, nullable=True)
+    # Bumped whenever the project's chunks change, so every process can tell its cached retrievals are stale
+    chunk_set_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     files = relationship("File", back_populates="project")
     criterions = relationship("Criterion", secondary="project_criterions", back_populates="projects")
@@ -213,6 +251,18 @@ class Project(Base):
     ratings = relationship("Rating", back_populates="project")
 
 
+class CategorySummary(Base):
+    """The summary of a project's answers in one criterion category, keyed by a hash of the answers and prompt"""
+
+    __tablename__ = "category_summary"
+
+    project_id = Column(UUID(as_uuid=True), ForeignKey("project.id", ondelete="CASCADE"), primary_key=True)
+    category = Column(String, primary_key=True)
+    input_hash = Column(String, primary_key=True)
+    summary = Column(Text, nullable=False)
+    created_datetime = Column(DateTime(timezone=True), server_default=func.now())
+
+
 class AuditLog(Base):
     __tablename__ = "audit_log"
 
@@ -245,3 +295,87 @@ class ChatSession(Base):
     project = relationship("Project")
     user = relationship("User", back_populates="chat_sessions")
     audit_logs = relationship("AuditLog", back_populates="chat_session")
+
+
+class JobStatus(enum.Enum):
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    COMPLETED = "COMPLETED"
+    FAILED = "FAILED"
+    CANCELLED = "CANCELLED"
+
+
+class EvaluationJob(Base):
+    __tablename__ = "evaluation_job"
+
+    id = Column(UUID(as_uuid=True), default=uuid.uuid4, primary_key=True)
+    status = Column(ENUM(JobStatus, name="job_status_enum", create_type=False), nullable=False, default=JobStatus.QUEUED)
+    parameters = Column(JSONB, nullable=True)  # The request the job was created from
+    total_criteria = Column(Integer, nullable=True)
+    processed_criteria = Column(Integer, nullable=False, default=0)
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    worker_id = Column(String, nullable=True)
+    stage_stats = Column(JSONB, nullable=True)  # LLM calls, latency, tokens and cost of each stage
+    heartbeat_datetime = Column(DateTime(timezone=True), nullable=True)
+    started_datetime = Column(DateTime(timezone=True), nullable=True)
+    finished_datetime = Column(DateTime(timezone=True), nullable=True)
+    created_datetime = Column(DateTime(timezone=True), server_default=func.now())
+    updated_datetime = Column(DateTime(timezone=True), onupdate=func.now())
+
+    project_id = Column(UUID(as_uuid=True), ForeignKey("project.id"), nullable=False)
+    project = relationship("Project")
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("user.id"), nullable=True)
+    user = relationship("User")
+
+    tasks = relationship("EvaluationTask", back_populates="job")
+
+
+class EvaluationTask(Base):
+    __tablename__ = "evaluation_task"
+
+    id = Column(UUID(as_uuid=True), default=uuid.uuid4, primary_key=True)
+    kind = Column(String, nullable=False, default="criterion")  # "criterion", or "summary" once all criteria are done
+    status = Column(ENUM(JobStatus, name="job_status_enum", create_type=False), nullable=False, default=JobStatus.QUEUED)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    worker_id = Column(String, nullable=True)
+    heartbeat_datetime = Column(DateTime(timezone=True), nullable=True)
+    finished_datetime = Column(DateTime(timezone=True), nullable=True)
+    created_datetime = Column(DateTime(timezone=True), server_default=func.now())
+    updated_datetime = Column(DateTime(timezone=True), onupdate=func.now())
+
+    job_id = Column(UUID(as_uuid=True), ForeignKey("evaluation_job.id"), nullable=False)
+    job = relationship("EvaluationJob", back_populates="tasks")
+
+    project_id = Column(UUID(as_uuid=True), ForeignKey("project.id"), nullable=False)
+    criterion_id = Column(UUID(as_uuid=True), ForeignKey("criterion.id"), nullable=True)
+    result_id = Column(UUID(as_uuid=True), ForeignKey("result.id"), nullable=True)
+
+
+class RateBudget(Base):
+    """A token bucket shared by every worker, e.g. for the Bedrock request quota"""
+
+    __tablename__ = "rate_budget"
+
+    name = Column(String, primary_key=True)
+    tokens = Column(Float, nullable=False)
+    updated_datetime = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+
+class EvaluationEvent(Base):
+    """A progress event for one criterion of an evaluation job, streamed to the frontend"""
+
+    __tablename__ = "evaluation_event"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    stage = Column(String, nullable=False)  # started, no_evidence, retrieval_done, llm_done, saved, unchanged or error
+    message = Column(Text, nullable=True)
+    created_datetime = Column(DateTime(timezone=True), server_default=func.now())
+
+    job_id = Column(UUID(as_uuid=True), ForeignKey("evaluation_job.id"), nullable=False, index=True)
+    task_id = Column(UUID(as_uuid=True), ForeignKey("evaluation_task.id"), nullable=True)
+    criterion_id = Column(UUID(as_uuid=True), ForeignKey("criterion.id"), nullable=True)
+    result_id = Column(UUID(as_uuid=True), ForeignKey("result.id"), nullable=True)
@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, DateTime, ForeignKey, String, Boolean, func
+from sqlalchemy import Column, DateTime, Float, ForeignKey, String, Boolean, func
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
@@ -14,5 +14,7 @@ class LLMModel(Base):
     model_id = Column(String, nullable=False, unique=True)  # The actual model ID used with Bedrock
     description = Column(String, nullable=True)
     is_default = Column(Boolean, default=False)
+    input_cost_per_1k_tokens = Column(Float, nullable=True)  # USD, used to report the cost of evaluation jobs
+    output_cost_per_1k_tokens = Column(Float, nullable=True)
     created_datetime = Column(DateTime(timezone=True), server_default=func.now())
     updated_datetime = Column(DateTime(timezone=True), onupdate=func.now())
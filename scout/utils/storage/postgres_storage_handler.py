@@ -1,9 +1,14 @@
+from typing import Dict
 from typing import List
+from typing import Optional
+from typing import Tuple
 from uuid import UUID
 
 from scout.DataIngest.models.schemas import Chunk as PyChunk
 from scout.DataIngest.models.schemas import ChunkCreate
 from scout.DataIngest.models.schemas import ChunkFilter
+from scout.DataIngest.models.schemas import ChunkSearchResult
+from scout.DataIngest.models.schemas import ChunkText
 from scout.DataIngest.models.schemas import ChunkUpdate
 from scout.DataIngest.models.schemas import Criterion as PyCriterion
 from scout.DataIngest.models.schemas import CriterionCreate
@@ -12,6 +17,7 @@ from scout.DataIngest.models.schemas import CriterionUpdate
 from scout.DataIngest.models.schemas import File as PyFile
 from scout.DataIngest.models.schemas import FileCreate
 from scout.DataIngest.models.schemas import FileFilter
+from scout.DataIngest.models.schemas import FileMetadata
 from scout.DataIngest.models.schemas import FileUpdate
 from scout.DataIngest.models.schemas import Project as PyProject
 from scout.DataIngest.models.schemas import ProjectCreate
@@ -29,7 +35,11 @@ from scout.utils.storage.postgres_interface import delete_item
 from scout.utils.storage.postgres_interface import filter_items
 from scout.utils.storage.postgres_interface import get_all
 from scout.utils.storage.postgres_interface import get_by_id
+from scout.utils.storage.postgres_interface import get_chunks_by_position
+from scout.utils.storage.postgres_interface import get_file_metadata
 from scout.utils.storage.postgres_interface import get_or_create_item
+from scout.utils.storage.postgres_interface import search_chunks_text
+from scout.utils.storage.postgres_interface import update_criterion_clusters
 from scout.utils.storage.postgres_interface import update_item
 from scout.utils.storage.postgres_models import Chunk as SqChunk
 from scout.utils.storage.postgres_models import Criterion as SqCriterion
@@ -74,6 +84,24 @@ class PostgresStorageHandler(BaseStorageHandler):
         """Read a list of objects from a data store"""
         return [get_by_id(model=model, object_id=object_id) for model, object_id in zip(models, object_ids)]
 
+    def read_file_metadata(self, file_ids: List[UUID]) -> Dict[UUID, FileMetadata]:
+        """Read the prompt-relevant metadata for a list of files in one query, keyed by file id"""
+        return {file.id: file for file in get_file_metadata(file_ids)}
+
+    def read_chunks_by_position(self, positions: List[Tuple[UUID, int]]) -> Dict[Tuple[UUID, int], ChunkText]:
+        """Read the chunks at (file id, index) positions in one query, keyed by position"""
+        return {(chunk.file_id, chunk.idx): chunk for chunk in get_chunks_by_position(positions)}
+
+    def search_chunks_text(
+        self, query: str, limit: int, project_id: Optional[UUID] = None, file_ids: Optional[List[UUID]] = None
+    ) -> List[ChunkSearchResult]:
+        """Full-text search of chunk text using the GIN-indexed text_search column, best matches first"""
+        return search_chunks_text(query, limit, project_id=project_id, file_ids=file_ids)
+
+    def update_criterion_clusters(self, cluster_ids: Dict[UUID, Optional[int]]) -> int:
+        """Set the cluster of each criterion in one bulk update"""
+        return update_criterion_clusters(cluster_ids)
+
     def update_item(
         self,
         model: CriterionUpdate | ChunkUpdate | FileUpdate | ProjectUpdate | ResultUpdate | UserUpdate,
@@ -0,0 +1,340 @@
+"""
+Chroma vector store with a collection per project.
+
+    python -m scout.utils.storage.project_vector_store --vector-store-dir <dir> stats
+    python -m scout.utils.storage.project_vector_store --vector-store-dir <dir> drop <project id>
+"""
+
+import argparse
+import json
+import os
+import shutil
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import chromadb
+from dotenv import load_dotenv
+from langchain_community.vectorstores import Chroma
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from scout.LLMFlag.cache import retrieval_cache
+from scout.utils.storage.exact_vector_store import (
+    ExactIndex,
+    ExactVectorStore,
+    Projection,
+    load_projection,
+    open_exact_index,
+    supports_exact_filter,
+)
+from scout.Pipelines.utils import (
+    DEFAULT_COLLECTION_NAME,
+    embedding_dimension,
+    embedding_fingerprint,
+    fingerprint_matches,
+    get_embedding_function,
+    open_vector_store,
+)
+from scout.utils.utils import logger
+
+PROJECT_COLLECTION_PREFIX = "project_"
+
+
+def project_collection_name(project_id: Any) -> str:
+    return f"{PROJECT_COLLECTION_PREFIX}{project_id}"
+
+
+class ProjectVectorStore(VectorStore):
+    """
+    Chroma vector store keeping each project's chunks in a collection of its own, so a search only walks
+    the HNSW graph of its project rather than filtering one graph holding every project's chunks.
+
+    Documents are routed by their "project" metadata and searches by their "project" filter, so callers
+    use it as they would a single collection. Dropping a project deletes its collection.
+
+    Projects with at most `exact_max_chunks` chunks, which is most of them, are searched exactly rather
+    than through HNSW: their embeddings are kept as one memory-mapped matrix beside the collection and
+    scored with a matrix product. Larger projects use the collection's HNSW index. The matrix can be
+    stored as float16 or int8 and reduced with a PCA projection fitted for the deployment, see
+    scripts/benchmark_quantisation.py, in which case its shortlist is rescored at full precision.
+    """
+
+    def __init__(
+        self,
+        persist_directory: Path,
+        embedding_function: Embeddings,
+        model_id: str,
+        exact_max_chunks: int = None,
+        exact_dtype: str = None,
+        exact_projection: Optional[Projection] = None,
+    ):
+        self.persist_directory = Path(persist_directory)
+        self.embedding_function = embedding_function
+        self.model_id = model_id
+        self.exact_max_chunks = (
+            exact_max_chunks
+            if exact_max_chunks is not None
+            else int(os.getenv("SCOUT_EXACT_SEARCH_MAX_CHUNKS", "20000"))
+        )
+        self.exact_dtype = exact_dtype or os.getenv("SCOUT_EXACT_SEARCH_DTYPE", "float32")
+        if exact_projection is None and os.getenv("SCOUT_EXACT_SEARCH_PCA"):
+            exact_projection = load_projection(os.getenv("SCOUT_EXACT_SEARCH_PCA"))
+        self.exact_projection = exact_projection
+        self._exact_indexes: Dict[str, ExactIndex] = {}
+        os.makedirs(self.persist_directory, exist_ok=True)
+        self.client = chromadb.PersistentClient(path=str(self.persist_directory))
+        self.dimension = embedding_dimension(embedding_function)
+        self._collections: Dict[str, Chroma] = {}
+        self._lock = threading.Lock()
+        self.split_shared_collection()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding_function
+
+    def for_project(self, project_id: Any) -> Chroma:
+        """The project's collection, created on first use"""
+        name = project_collection_name(project_id)
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = open_vector_store(
+                    self.persist_directory,
+                    self.embedding_function,
+                    self.model_id,
+                    collection_name=name,
+                    client=self.client,
+                    dimension=self.dimension,
+                )
+            return self._collections[name]
+
+    def _route(self, filter: Optional[dict], exact: bool = True) -> Tuple[VectorStore, Optional[dict]]:
+        """
+        The store for a search's project filter, and the rest of the filter: an exact store for small
+        projects, where `exact` allows, or else the project's collection
+        """
+        filter = dict(filter or {})
+        project_id = filter.pop("project", None)
+        if project_id is None:
+            raise ValueError("Searches of a ProjectVectorStore must filter on a project")
+        store = self.for_project(project_id)
+        if exact and self.exact_max_chunks and supports_exact_filter(filter):
+            count = store._collection.count()
+            if count <= self.exact_max_chunks:
+                return ExactVectorStore(self._exact_index(project_id, store, count), self.embedding_function), filter
+        # Chroma rejects an empty filter
+        return store, filter or None
+
+    def _exact_index(self, project_id: Any, store: Chroma, count: int) -> ExactIndex:
+        """The project's exact index, rebuilt from its collection's embeddings when the chunk count changes"""
+        name = project_collection_name(project_id)
+        index = self._exact_indexes.get(name)
+        if index is None or len(index) != count:
+            index = open_exact_index(
+                self.persist_directory / "exact" / name,
+                count,
+                lambda: store._collection.get(include=["embeddings", "documents", "metadatas"]),
+                dtype=self.exact_dtype,
+                projection=self.exact_projection,
+            )
+            self._exact_indexes[name] = index
+        return index
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        by_project: Dict[str, List[int]] = {}
+        for i, metadata in enumerate(metadatas):
+            if metadata.get("project") is None:
+                raise ValueError("Texts added to a ProjectVectorStore need a project in their metadata")
+            by_project.setdefault(str(metadata["project"]), []).append(i)
+        for project_id, indices in by_project.items():
+            self.for_project(project_id).add_texts(
+                [texts[i] for i in indices], metadatas=[metadatas[i] for i in indices], ids=[ids[i] for i in indices]
+            )
+        return ids
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs: Any) -> List[Document]:
+        store, filter = self._route(filter)
+        return store.similarity_search(query, k=k, filter=filter, **kwargs)
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        store, filter = self._route(filter)
+        return store.similarity_search_with_score(query, k=k, filter=filter, **kwargs)
+
+    def similarity_search_with_relevance_scores(
+        self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        store, filter = self._route(filter)
+        return store.similarity_search_with_relevance_scores(query, k=k, filter=filter, **kwargs)
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> List[Document]:
+        store, filter = self._route(filter)
+        return store.similarity_search_by_vector(embedding, k=k, filter=filter, **kwargs)
+
+    def similarity_search_by_vector_with_relevance_scores(
+        self, embedding: List[float], k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        store, filter = self._route(filter)
+        return store.similarity_search_by_vector_with_relevance_scores(embedding, k=k, filter=filter, **kwargs)
+
+    def similarity_search_by_vectors_with_relevance_scores(
+        self, embeddings: List[List[float]], k: int = 4, filter: Optional[dict] = None
+    ) -> List[List[Tuple[Document, float]]]:
+        """Search for several query vectors at once, in one matrix product for exactly searched projects"""
+        store, filter = self._route(filter)
+        if isinstance(store, ExactVectorStore):
+            return store.similarity_search_by_vectors_with_relevance_scores(embeddings, k=k, filter=filter)
+        return [
+            store.similarity_search_by_vector_with_relevance_scores(vector, k=k, filter=filter) for vector in embeddings
+        ]
+
+    def max_marginal_relevance_search(
+        self,
+        query: str,
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        filter: Optional[dict] = None,
+        **kwargs,
+    ) -> List[Document]:
+        store, filter = self._route(filter, exact=False)
+        return store.max_marginal_relevance_search(query, k, fetch_k, lambda_mult, filter=filter, **kwargs)
+
+    def max_marginal_relevance_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        filter: Optional[dict] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        store, filter = self._route(filter, exact=False)
+        return store.max_marginal_relevance_search_by_vector(
+            embedding, k, fetch_k, lambda_mult, filter=filter, **kwargs
+        )
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        # Project collections use Chroma's default L2 space
+        return self._euclidean_relevance_score_fn
+
+    def drop_project(self, project_id: Any) -> bool:
+        """Delete a project's collection, returning whether it had one"""
+        name = project_collection_name(project_id)
+        with self._lock:
+            self._collections.pop(name, None)
+            self._exact_indexes.pop(name, None)
+            shutil.rmtree(self.persist_directory / "exact" / name, ignore_errors=True)
+            if name not in self._collection_names():
+                return False
+            self.client.delete_collection(name)
+        retrieval_cache.invalidate_project(project_id)
+        return True
+
+    def collection_stats(self) -> List[dict]:
+        """Chunk count, search method, embedding model and HNSW settings of each project's collection"""
+        stats = []
+        for name in self._collection_names():
+            if not name.startswith(PROJECT_COLLECTION_PREFIX):
+                continue
+            collection = self.client.get_collection(name)
+            metadata = collection.metadata or {}
+            count = collection.count()
+            stats.append(
+                {
+                    "project": name[len(PROJECT_COLLECTION_PREFIX) :],
+                    "chunks": count,
+                    "search": "exact" if self.exact_max_chunks and count <= self.exact_max_chunks else "hnsw",
+                    "embedding_model": metadata.get("embedding_model"),
+                    "embedding_dimension": metadata.get("embedding_dimension"),
+                    "hnsw_m": metadata.get("hnsw:M"),
+                }
+            )
+        return stats
+
+    def split_shared_collection(self, name: str = DEFAULT_COLLECTION_NAME, batch_size: int = 1000) -> int:
+        """
+        Move the chunks of a collection shared by every project into per-project collections, copying their
+        embeddings rather than embedding them again, then delete it. Returns the number of chunks moved.
+        """
+        if name not in self._collection_names():
+            return 0
+        shared = self.client.get_collection(name)
+        if not fingerprint_matches(shared.metadata, embedding_fingerprint(self.model_id, self.dimension)):
+            logger.warning(f"Not splitting vector store collection {name}, built with another embedding model")
+            return 0
+
+        moved = 0
+        offset = 0
+        while True:
+            batch = shared.get(include=["embeddings", "documents", "metadatas"], limit=batch_size, offset=offset)
+            if not batch["ids"]:
+                break
+            offset += len(batch["ids"])
+            by_project: Dict[str, List[int]] = {}
+            for i, metadata in enumerate(batch["metadatas"]):
+                if (metadata or {}).get("project") is not None:
+                    by_project.setdefault(str(metadata["project"]), []).append(i)
+            for project_id, indices in by_project.items():
+                self.for_project(project_id)._collection.upsert(
+                    ids=[batch["ids"][i] for i in indices],
+                    embeddings=[batch["embeddings"][i] for i in indices],
+                    documents=[batch["documents"][i] for i in indices],
+                    metadatas=[batch["metadatas"][i] for i in indices],
+                )
+                moved += len(indices)
+        self.client.delete_collection(name)
+        logger.info(f"Moved {moved} chunks from vector store collection {name} into per-project collections")
+        return moved
+
+    def _collection_names(self) -> List[str]:
+        # chromadb 0.5 lists collections, later versions list their names
+        return [getattr(collection, "name", collection) for collection in self.client.list_collections()]
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> "ProjectVectorStore":
+        store = cls(embedding_function=embedding, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Inspect or drop per-project vector store collections")
+    parser.add_argument("--vector-store-dir", required=True, help="Persisted Chroma directory")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("stats", help="Print each project collection's size and settings")
+    drop_parser = subparsers.add_parser("drop", help="Delete a project's collection")
+    drop_parser.add_argument("project_id")
+    args = parser.parse_args()
+
+    vector_store = ProjectVectorStore(
+        args.vector_store_dir, get_embedding_function(), os.getenv("AWS_BEDROCK_EMBEDDING_MODEL_ID")
+    )
+    if args.command == "stats":
+        print(json.dumps(vector_store.collection_stats(), indent=2))
+    elif vector_store.drop_project(args.project_id):
+        logger.info(f"Dropped the vector store collection of project {args.project_id}")
+    else:
+        logger.info(f"Project {args.project_id} has no vector store collection")
@@ -1,7 +1,11 @@
+import re
 from abc import ABC
 from abc import abstractmethod
+from typing import Dict
 from typing import Generic
 from typing import List
+from typing import Optional
+from typing import Tuple
 from typing import TypeVar
 from typing import Union
 from uuid import UUID
@@ -9,6 +13,8 @@ from uuid import UUID
 from scout.DataIngest.models.schemas import Chunk as PyChunk
 from scout.DataIngest.models.schemas import ChunkCreate
 from scout.DataIngest.models.schemas import ChunkFilter
+from scout.DataIngest.models.schemas import ChunkSearchResult
+from scout.DataIngest.models.schemas import ChunkText
 from scout.DataIngest.models.schemas import ChunkUpdate
 from scout.DataIngest.models.schemas import Criterion as PyCriterion
 from scout.DataIngest.models.schemas import CriterionCreate
@@ -17,6 +23,7 @@ from scout.DataIngest.models.schemas import CriterionUpdate
 from scout.DataIngest.models.schemas import File as PyFile
 from scout.DataIngest.models.schemas import FileCreate
 from scout.DataIngest.models.schemas import FileFilter
+from scout.DataIngest.models.schemas import FileMetadata
 from scout.DataIngest.models.schemas import FileUpdate
 from scout.DataIngest.models.schemas import Project as PyProject
 from scout.DataIngest.models.schemas import ProjectCreate
@@ -117,3 +124,48 @@ class BaseStorageHandler(ABC, Generic[T]):
     @abstractmethod
     def get_item_by_attribute(self, model: FilterT) -> List[PyT]:
         """Get items by attribute from a data store"""
+
+    def read_file_metadata(self, file_ids: List[UUID]) -> Dict[UUID, FileMetadata]:
+        """Read the prompt-relevant metadata for a list of files, keyed by file id"""
+        files = [self.read_item(object_id=file_id, model=PyFile) for file_id in set(file_ids)]
+        return {file.id: FileMetadata.model_validate(file) for file in files if file is not None}
+
+    def read_chunks_by_position(self, positions: List[Tuple[UUID, int]]) -> Dict[Tuple[UUID, int], ChunkText]:
+        """Read the chunks at (file id, index) positions, keyed by position"""
+        wanted = set(positions)
+        return {
+            (chunk.file.id, chunk.idx): ChunkText(
+                id=chunk.id, file_id=chunk.file.id, idx=chunk.idx, page_num=chunk.page_num, text=chunk.text
+            )
+            for chunk in self.read_all_items(PyChunk)
+            if chunk.file is not None and (chunk.file.id, chunk.idx) in wanted
+        }
+
+    def search_chunks_text(
+        self, query: str, limit: int, project_id: Optional[UUID] = None, file_ids: Optional[List[UUID]] = None
+    ) -> List[ChunkSearchResult]:
+        """Chunks containing any of the query's words, ranked by how many times they occur"""
+        terms = set(re.findall(r"\w+", query.lower()))
+        projects = {file.id: file.project.id for file in self.read_all_items(PyFile) if file.project is not None}
+        results = []
+        for chunk in self.read_all_items(PyChunk):
+            if chunk.file is None or chunk.file.id not in projects:
+                continue
+            if (project_id is not None and projects[chunk.file.id] != project_id) or (
+                file_ids is not None and chunk.file.id not in file_ids
+            ):
+                continue
+            rank = sum(1 for word in re.findall(r"\w+", chunk.text.lower()) if word in terms)
+            if rank:
+                results.append(
+                    ChunkSearchResult(
+                        id=chunk.id,
+                        file_id=chunk.file.id,
+                        idx=chunk.idx,
+                        page_num=chunk.page_num,
+                        text=chunk.text,
+                        project_id=projects[chunk.file.id],
+                        rank=rank,
+                    )
+                )
+        return sorted(results, key=lambda result: result.rank, reverse=True)[:limit]
@@ -0,0 +1,95 @@
+"""
+Index of file summaries, embedded once per file, used to pick the files whose chunks a query searches.
+
+    python -m scout.utils.storage.summary_index [--project-id <id>]
+
+embeds the summaries of files ingested before the index existed.
+"""
+
+import argparse
+from typing import Any, Callable, List, Optional, Tuple
+from uuid import UUID
+
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from scout.Pipelines.utils import get_embedding_function
+from scout.utils.storage.postgres_database import SessionLocal
+from scout.utils.storage.postgres_models import File as SqFile
+from scout.utils.utils import logger
+
+
+def summary_text(file: Any) -> str:
+    """The text embedded for a file: its name, which often says what it is, and its LLM-generated summary"""
+    name = getattr(file, "clean_name", None) or file.name
+    summary = getattr(file, "summary", None) or ""
+    return f"{name}\n{summary}".strip()
+
+
+class FileSummaryIndex:
+    """
+    File summary embeddings on the `summary_embedding` column of the file table.
+
+    A project has at most hundreds of files, so searches scan its files' vectors with pgvector's cosine
+    distance rather than keeping an approximate index. The index lives with the files whatever vector store
+    holds their chunks.
+    """
+
+    def __init__(self, embedding_function: Embeddings, session_factory: Callable[[], Session] = SessionLocal):
+        self.embedding_function = embedding_function
+        self.session_factory = session_factory
+
+    def add_files(self, files: List[Any]) -> int:
+        """Embed the summaries of files, e.g. as `add_llm_generated_file_info` returns them, in one batch"""
+        files = [file for file in files if file is not None]
+        if not files:
+            return 0
+        vectors = self.embedding_function.embed_documents([summary_text(file) for file in files])
+        with self.session_factory() as db:
+            db.execute(
+                update(SqFile),
+                [{"id": UUID(str(file.id)), "summary_embedding": vector} for file, vector in zip(files, vectors)],
+            )
+            db.commit()
+        return len(files)
+
+    def backfill(self, project_id: Optional[UUID] = None, batch_size: int = 100) -> int:
+        """Embed every file, or every file of a project, that has no summary embedding yet"""
+        query = select(SqFile).where(SqFile.summary_embedding.is_(None))
+        if project_id is not None:
+            query = query.where(SqFile.project_id == project_id)
+        with self.session_factory() as db:
+            files = db.execute(query).scalars().all()
+        for start in range(0, len(files), batch_size):
+            self.add_files(files[start : start + batch_size])
+        return len(files)
+
+    def top_files(self, embedding: List[float], project_id: UUID, k: int) -> List[Tuple[UUID, float]]:
+        """A project's k files whose summaries are nearest a query vector, with their cosine distances"""
+        distance = SqFile.summary_embedding.cosine_distance(embedding).label("distance")
+        query = (
+            select(SqFile.id, distance)
+            .where(SqFile.project_id == project_id, SqFile.summary_embedding.is_not(None))
+            .order_by(distance)
+            .limit(k)
+        )
+        with self.session_factory() as db:
+            return [(row.id, row.distance) for row in db.execute(query).all()]
+
+    def unindexed_files(self, project_id: UUID) -> List[UUID]:
+        """A project's files with no summary embedding yet, which `top_files` cannot pick"""
+        query = select(SqFile.id).where(SqFile.project_id == project_id, SqFile.summary_embedding.is_(None))
+        with self.session_factory() as db:
+            return list(db.execute(query).scalars().all())
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Embed the summaries of files missing from the summary index")
+    parser.add_argument("--project-id", type=UUID, default=None, help="Only embed this project's files")
+    args = parser.parse_args()
+
+    embedded = FileSummaryIndex(get_embedding_function()).backfill(args.project_id)
+    logger.info(f"Embedded the summaries of {embedded} files")
@@ -8,7 +8,6 @@ from sqlalchemy import create_engine, text
 from typing import List, Tuple
 import dotenv
 from langchain_community.llms.sagemaker_endpoint import LLMContentHandler
-from langchain_community.vectorstores import Chroma
 from langchain_aws import ChatBedrock, BedrockEmbeddings
 from botocore.exceptions import ClientError
 from tenacity import retry
@@ -226,38 +225,10 @@ def init_session_state(
         persist_directory = os.path.join(
             session_state.persistency_folder_path, "VectorStore")
 
-        # Check if an existing vector store exists and handle dimension mismatch
-        if os.path.exists(persist_directory) and os.path.isdir(persist_directory):
-            import shutil
+        from scout.Pipelines.utils import get_vector_store
 
-            logger.warning(
-                "Existing vector store found. Recreating with new embedding model to avoid dimension mismatch. "
-                "This will delete your existing embeddings!"
-            )
-
-            # Remove the existing vector store directory
-            shutil.rmtree(persist_directory)
-
-        # Check if an existing vector store exists and handle dimension mismatch
-        if os.path.exists(persist_directory) and os.path.isdir(persist_directory):
-            import shutil
-            
-            logger.warning(
-                "Existing vector store found. Recreating with new embedding model to avoid dimension mismatch. "
-                "This will delete your existing embeddings!"
-            )
-            
-            # Remove the existing vector store directory
-            shutil.rmtree(persist_directory)
-            
-        # Create directory
-        if not os.path.exists(persist_directory):
-            os.makedirs(persist_directory)
-
-        session_state.vector_store = Chroma(
-            embedding_function=session_state.embedding_function,
-            persist_directory=persist_directory,
-        )
+        # Embeddings are kept across restarts unless the embedding model has changed
+        session_state.vector_store = get_vector_store(persist_directory, session_state.embedding_function)
         logger.info("Vector store initialized")
 
     logger.info("Session state initialization completed")
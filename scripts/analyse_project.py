@@ -22,9 +22,8 @@ from typing import List, Dict, Any
 from langchain_aws import ChatBedrock
 from langchain_community.retrievers import AmazonKnowledgeBasesRetriever
 
-from scout.DataIngest.models.schemas import Chunk, ChunkCreate, CriterionGate, FileCreate, ProjectCreate
 from scout.Pipelines.ingest_criteria import ingest_criteria_from_local_dir
-from scout.LLMFlag.evaluation import MainEvaluator
+from scout.LLMFlag.kb_evaluator import KBMainEvaluator
 from scout.utils.storage.postgres_storage_handler import PostgresStorageHandler
 from scout.utils.utils import logger
 
@@ -108,82 +107,11 @@ def evaluate_kb_against_criteria(
     criteria = storage_handler.get_item_by_attribute(filter)
     logger.info(f"{len(criteria)} criteria loaded")
 
-    # Create custom MainEvaluator that uses KB for retrieval
-    class KBMainEvaluator(MainEvaluator):
-        def semantic_search(self, query: str, k: int, filters: dict):
-            # Use LangChain retriever instead of custom KB implementation
-            documents = retriever.get_relevant_documents(query)
-
-            # Format into expected prompt structure
-            prompt = "Document extracts relevant to the query:\n\n"
-            formatted_docs = []
-
-            for i, doc in enumerate(documents):
-
-                # Extract source_metadata dictionary
-                source_metadata = doc.metadata.get('source_metadata', {})
-                source_uri = source_metadata.get('x-amz-bedrock-kb-source-uri')
-
-                # Parse the S3 URI
-                bucket_name = source_uri.split('/')[2]
-                object_key = '/'.join(source_uri.split('/')[3:])
-                if not bucket_name or not object_key:
-                    print("S3 bucket or key not found in metadata.")
-                    return None
-
-                file_name = object_key.split("/")[-1]
-
-                file_create = FileCreate(
-                    name=file_name,
-                    s3_key=object_key,
-                    type=os.path.splitext(file_name)[1],
-                    project=project,
-                    s3_bucket=os.environ["BUCKET_NAME"],
-                )
-                file = self.storage_handler.write_item(file_create)
-
-                chunk = ChunkCreate(
-                    file=file,
-                    idx=0,
-                    text=object_key,
-                    page_num=0,
-                )
-
-                created_chunk = self.storage_handler.write_item(chunk)
-
-                source = doc.metadata.get('source', 'Unknown')
-                content = doc.page_content
-
-                # Create document ID from source or use a default
-                doc_id = source.split('/')[-1] if source else f"document_{i+1}"
-
-                prompt += f"Document {i+1}: {doc_id}\n"
-                prompt += f"Content: {content}\n\n"
-
-                # Format documents for return value
-                formatted_docs.append({
-                    'content': content,
-                    'metadata': {
-                        'uuid': created_chunk.id,  # str(uuid.uuid4()),
-                        'source': source,
-                        'document_id': doc_id,
-                        'score': doc.metadata.get('score', 0),
-                        'file_id': file.id
-                    }
-                })
-
-            return prompt, formatted_docs
-
-        def get_llm_response(self, messages):
-            # Override to use the LangChain LLM
-            response = llm.invoke(messages)
-            return response.content
-
-    # Initialize evaluator
+    # Initialize evaluator, retrieving from the Knowledge Base
     evaluator = KBMainEvaluator(
+        retriever=retriever,
+        chat_llm=llm,
         project=project,
-        vector_store=None,  # Not used with KB
-        llm=llm,  # Use the LangChain LLM we initialized
         storage_handler=storage_handler
     )
 
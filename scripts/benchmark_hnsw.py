@@ -0,0 +1,105 @@
+"""
+Benchmarks Chroma HNSW settings on the embeddings of a persisted vector store.
+
+The stored embeddings are copied into in-memory collections built with each combination of M and
+search_ef, and a sample of them is used as queries. For each setting the script reports build time,
+recall@k against an exact NumPy search, mean query latency and the approximate size of the graph's links,
+which grows with M. Use the results to choose SCOUT_HNSW_M, SCOUT_HNSW_CONSTRUCTION_EF and
+SCOUT_HNSW_SEARCH_EF.
+
+    python scripts/benchmark_hnsw.py --vector-store-dir .data/<project>/VectorStore [--collection <name>]
+"""
+
+import argparse
+import time
+import uuid
+from typing import Dict, List
+
+import chromadb
+import numpy as np
+
+
+def exact_neighbours(embeddings: np.ndarray, queries: np.ndarray, k: int) -> List[set]:
+    """The true k nearest stored vectors of each query by L2 distance, Chroma's default space"""
+    distances = (queries**2).sum(axis=1)[:, None] - 2 * queries @ embeddings.T + (embeddings**2).sum(axis=1)[None, :]
+    return [set(np.argsort(row)[:k]) for row in distances]
+
+
+def benchmark_setting(
+    embeddings: np.ndarray, queries: np.ndarray, truth: List[set], k: int, m: int, construction_ef: int, search_ef: int
+) -> Dict:
+    client = chromadb.EphemeralClient()
+    collection = client.create_collection(
+        f"benchmark_{uuid.uuid4().hex}",
+        metadata={"hnsw:M": m, "hnsw:construction_ef": construction_ef, "hnsw:search_ef": search_ef},
+    )
+    ids = [str(i) for i in range(len(embeddings))]
+    start = time.perf_counter()
+    for batch_start in range(0, len(ids), 5000):
+        collection.add(
+            ids=ids[batch_start : batch_start + 5000],
+            embeddings=embeddings[batch_start : batch_start + 5000].tolist(),
+        )
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    found = collection.query(query_embeddings=queries.tolist(), n_results=k, include=[])["ids"]
+    query_seconds = (time.perf_counter() - start) / len(queries)
+    client.delete_collection(collection.name)
+
+    recall = np.mean([len({int(i) for i in result} & expected) / k for result, expected in zip(found, truth)])
+    return {
+        "build_seconds": build_seconds,
+        "recall_at_k": float(recall),
+        "query_ms": query_seconds * 1000,
+        # Each node keeps up to 2 * M neighbour ids on the bottom layer
+        "link_mb": len(embeddings) * 2 * m * 4 / 1e6,
+    }
+
+
+def main(
+    vector_store_dir: str,
+    collection_name: str,
+    k: int,
+    sample: int,
+    m_values: List[int],
+    ef_values: List[int],
+    construction_ef: int,
+):
+    client = chromadb.PersistentClient(path=vector_store_dir)
+    if collection_name is None:
+        # The largest collection, e.g. the biggest project's
+        collections = [client.get_collection(getattr(c, "name", c)) for c in client.list_collections()]
+        collection = max(collections, key=lambda collection: collection.count())
+    else:
+        collection = client.get_collection(collection_name)
+    embeddings = np.array(collection.get(include=["embeddings"])["embeddings"], dtype=np.float32)
+    rng = np.random.default_rng(0)
+    queries = embeddings[rng.choice(len(embeddings), size=min(sample, len(embeddings)), replace=False)]
+    truth = exact_neighbours(embeddings, queries, k)
+
+    print(
+        f"{collection.name}: {len(embeddings)} vectors of {embeddings.shape[1]} dimensions, "
+        f"{len(queries)} queries, k={k}"
+    )
+    print(f"{'M':>4} {'search_ef':>9} {'recall@k':>9} {'query ms':>9} {'build s':>8} {'links MB':>9}")
+    for m in m_values:
+        for search_ef in ef_values:
+            result = benchmark_setting(embeddings, queries, truth, k, m, construction_ef, search_ef)
+            print(
+                f"{m:>4} {search_ef:>9} {result['recall_at_k']:>9.3f} {result['query_ms']:>9.2f} "
+                f"{result['build_seconds']:>8.1f} {result['link_mb']:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report recall, latency and size for Chroma HNSW settings")
+    parser.add_argument("--vector-store-dir", required=True, help="Persisted Chroma directory to read embeddings from")
+    parser.add_argument("--collection", default=None, help="Collection to read, by default the largest")
+    parser.add_argument("--k", type=int, default=9, help="Neighbours per query, e.g. 3 * the evaluator's k")
+    parser.add_argument("--sample", type=int, default=200, help="Stored vectors used as queries")
+    parser.add_argument("--m", type=int, nargs="+", default=[8, 16, 32, 64])
+    parser.add_argument("--search-ef", type=int, nargs="+", default=[20, 50, 100, 200])
+    parser.add_argument("--construction-ef", type=int, default=200)
+    args = parser.parse_args()
+    main(args.vector_store_dir, args.collection, args.k, args.sample, args.m, args.search_ef, args.construction_ef)
@@ -0,0 +1,115 @@
+"""
+Compares compressed storage modes of the exact search matrix on a project's chunks.
+
+Every question and evidence point of the criteria in the database is embedded and searched against the
+project's embeddings stored as float32, float16 and int8, each with and without PCA reduction. For each
+mode the script reports the size of the scanned matrix, the memory saved against float32, and recall@k
+against full-precision exact search, both from the compressed matrix alone and after rescoring its
+shortlist at full precision.
+
+    python scripts/benchmark_quantisation.py --vector-store-dir .data/VectorStore --project-id <id>
+
+With --save-pca, a projection fitted on the chunks of every project in the store is saved for use as
+SCOUT_EXACT_SEARCH_PCA:
+
+    python scripts/benchmark_quantisation.py --vector-store-dir .data/VectorStore --save-pca pca.npz --pca-dims 256
+"""
+
+import argparse
+import os
+import tempfile
+from pathlib import Path
+from typing import List
+
+import numpy as np
+from dotenv import load_dotenv
+
+from scout.DataIngest.models.schemas import Criterion
+from scout.LLMFlag.embeddings import embed_queries, get_query_embedding_cache
+from scout.LLMFlag.evaluation import collect_criteria_queries
+from scout.Pipelines.utils import get_embedding_function
+from scout.utils.storage.exact_vector_store import STORAGE_DTYPES, ExactIndex, fit_pca, save_projection
+from scout.utils.storage.postgres_storage_handler import PostgresStorageHandler
+from scout.utils.storage.project_vector_store import PROJECT_COLLECTION_PREFIX, ProjectVectorStore
+
+
+def recall_at_k(results: List[List[tuple]], truth: List[List[tuple]]) -> float:
+    recalls = [
+        len({row for row, _ in found} & {row for row, _ in expected}) / max(len(expected), 1)
+        for found, expected in zip(results, truth)
+    ]
+    return float(np.mean(recalls))
+
+
+def save_deployment_pca(vector_store: ProjectVectorStore, dimensions: int, path: Path) -> None:
+    embeddings = []
+    for name in vector_store._collection_names():
+        if name.startswith(PROJECT_COLLECTION_PREFIX):
+            embeddings.extend(vector_store.client.get_collection(name).get(include=["embeddings"])["embeddings"])
+    save_projection(path, fit_pca(np.asarray(embeddings, dtype=np.float32), dimensions))
+    print(f"Saved a {dimensions}-dimension projection fitted on {len(embeddings)} chunks to {path}")
+
+
+def main(vector_store_dir: str, project_id: str, k: int, pca_dims: List[int], rescore_factor: int) -> None:
+    embedding_function = get_embedding_function()
+    vector_store = ProjectVectorStore(vector_store_dir, embedding_function, os.getenv("AWS_BEDROCK_EMBEDDING_MODEL_ID"))
+    records = vector_store.for_project(project_id)._collection.get(include=["embeddings", "documents", "metadatas"])
+    embeddings = np.asarray(records["embeddings"], dtype=np.float32)
+
+    criteria = PostgresStorageHandler().read_all_items(Criterion)
+    queries = collect_criteria_queries(criteria)
+    query_embeddings = embed_queries(queries, embedding_function=embedding_function, cache=get_query_embedding_cache())
+    query_matrix = np.asarray([query_embeddings[query] for query in queries], dtype=np.float32)
+
+    with tempfile.TemporaryDirectory() as directory:
+
+        def build(name: str, dtype: str, projection=None) -> ExactIndex:
+            return ExactIndex.build(
+                Path(directory) / name,
+                records["ids"],
+                embeddings,
+                records["documents"],
+                records["metadatas"],
+                dtype=dtype,
+                projection=projection,
+            )
+
+        reference = build("reference", "float32")
+        truth = reference.search(query_matrix, k)
+        print(f"{len(embeddings)} chunks of {embeddings.shape[1]} dimensions, {len(queries)} queries, k={k}")
+        print(f"{'mode':>14} {'matrix MB':>10} {'saved':>7} {'recall@k':>9} {'rescored':>9}")
+        for dims in pca_dims:
+            projection = fit_pca(embeddings, dims) if dims else None
+            for dtype in STORAGE_DTYPES:
+                if dtype == "float32" and projection is None:
+                    continue
+                index = build(f"{dtype}_{dims}", dtype, projection)
+                shortlist_only = recall_at_k(index.search(query_matrix, k, rescore_factor=1), truth)
+                rescored = recall_at_k(index.search(query_matrix, k, rescore_factor=rescore_factor), truth)
+                mode = f"{dtype}" + (f"/pca{dims}" if dims else "")
+                print(
+                    f"{mode:>14} {index.nbytes / 1e6:>10.2f} {1 - index.nbytes / reference.nbytes:>7.1%} "
+                    f"{shortlist_only:>9.3f} {rescored:>9.3f}"
+                )
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Report memory saved and recall@k lost by compressed storage")
+    parser.add_argument("--vector-store-dir", required=True, help="Persisted Chroma directory")
+    parser.add_argument("--project-id", help="Project whose chunks are benchmarked")
+    parser.add_argument("--k", type=int, default=9, help="Neighbours per query, e.g. 3 * the evaluator's k")
+    parser.add_argument("--pca-dims", type=int, nargs="+", default=[0, 256, 128], help="0 for no reduction")
+    parser.add_argument("--rescore-factor", type=int, default=4, help="Candidates rescored per result")
+    parser.add_argument("--save-pca", type=Path, default=None, help="Fit a projection on every project and save it")
+    args = parser.parse_args()
+
+    if args.save_pca:
+        vector_store = ProjectVectorStore(
+            args.vector_store_dir, get_embedding_function(), os.getenv("AWS_BEDROCK_EMBEDDING_MODEL_ID")
+        )
+        save_deployment_pca(vector_store, max(args.pca_dims), args.save_pca)
+    else:
+        if not args.project_id:
+            parser.error("--project-id is required to benchmark")
+        main(args.vector_store_dir, args.project_id, args.k, args.pca_dims, args.rescore_factor)
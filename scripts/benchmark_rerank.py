@@ -0,0 +1,104 @@
+"""
+Compares the rerank tiers a ReRankRetriever can choose between under a latency budget.
+
+For every question and evidence point of the criteria in the database, the project's vector store is
+searched for 3 * k candidates, which are then ordered by each tier: "none" (the vector store's order),
+"tiny" and "full". Each tier's recall@k is the share of the full reranker's top k it also keeps, and is
+reported with its mean rerank time per query. With --margin, the share of queries whose order would be
+treated as settled, and their recall without reranking, are reported too.
+
+    python scripts/benchmark_rerank.py --vector-store-dir .data/<project>/vector_store --project-id <id>
+"""
+
+import argparse
+import time
+from typing import Dict, List
+
+from dotenv import load_dotenv
+from langchain_core.vectorstores import VectorStore
+
+from scout.DataIngest.models.schemas import Criterion
+from scout.LLMFlag.evaluation import collect_criteria_queries
+from scout.LLMFlag.reranker import RERANK_TIERS, get_ranker, get_rerank_model, rerank
+from scout.Pipelines.utils import get_embedding_function, get_vector_store
+from scout.utils.storage.postgres_storage_handler import PostgresStorageHandler
+
+
+def recall_at_k(kept: List[int], reference: List[int]) -> float:
+    return len(set(kept) & set(reference)) / len(reference) if reference else 1.0
+
+
+def benchmark(vector_store: VectorStore, queries: List[str], project_id: str, k: int, margin: float = None) -> Dict:
+    models = {tier: get_rerank_model(tier) for tier in RERANK_TIERS}
+    for model_name in models.values():
+        if model_name is not None:
+            # Load models before timing
+            get_ranker(model_name)
+
+    seconds = {tier: 0.0 for tier in models}
+    recall = {tier: 0.0 for tier in models}
+    settled, settled_recall, measured = 0, 0.0, 0
+    for query in queries:
+        docs_and_scores = vector_store.similarity_search_with_relevance_scores(
+            query, k=k * 3, filter={"project": project_id}
+        )
+        if len(docs_and_scores) <= k:
+            continue
+        measured += 1
+        passages = [{"id": idx, "text": doc.page_content} for idx, (doc, _) in enumerate(docs_and_scores)]
+
+        kept = {}
+        for tier, model_name in models.items():
+            start = time.perf_counter()
+            if model_name is None:
+                kept[tier] = [passage["id"] for passage in passages[:k]]
+            else:
+                kept[tier] = [result["id"] for result in rerank(query, [dict(p) for p in passages], model_name)[:k]]
+            seconds[tier] += time.perf_counter() - start
+
+        for tier in models:
+            recall[tier] += recall_at_k(kept[tier], kept["full"])
+        if margin is not None and docs_and_scores[k - 1][1] - docs_and_scores[k][1] >= margin:
+            settled += 1
+            settled_recall += recall_at_k(kept["none"], kept["full"])
+
+    results = {
+        tier: {"recall_at_k": recall[tier] / max(measured, 1), "mean_seconds": seconds[tier] / max(measured, 1)}
+        for tier in models
+    }
+    results["queries"] = measured
+    if margin is not None:
+        results["settled_share"] = settled / max(measured, 1)
+        results["settled_recall_at_k"] = settled_recall / settled if settled else None
+    return results
+
+
+def main(vector_store_dir: str, project_id: str, k: int = 3, margin: float = None) -> None:
+    vector_store = get_vector_store(vector_store_dir, get_embedding_function())
+    criteria = PostgresStorageHandler().read_all_items(Criterion)
+    queries = collect_criteria_queries(criteria)
+
+    results = benchmark(vector_store, queries, project_id, k=k, margin=margin)
+    print(f"{results['queries']} queries, recall@{k} against the full reranker")
+    for tier in RERANK_TIERS:
+        print(
+            f"{tier:>5}: recall@{k} {results[tier]['recall_at_k']:.3f}, "
+            f"{results[tier]['mean_seconds'] * 1000:.1f} ms per query"
+        )
+    if margin is not None:
+        print(f"Margin {margin}: {results['settled_share']:.1%} of queries skip reranking", end="")
+        if results["settled_recall_at_k"] is not None:
+            print(f", keeping recall@{k} {results['settled_recall_at_k']:.3f}")
+        else:
+            print()
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Report recall@k and rerank time for each rerank tier")
+    parser.add_argument("--vector-store-dir", required=True, help="Persisted Chroma directory")
+    parser.add_argument("--project-id", required=True, help="Project whose chunks are searched")
+    parser.add_argument("--k", type=int, default=3, help="Extracts kept per query")
+    parser.add_argument("--margin", type=float, default=None, help="Similarity margin to report skipping for")
+    args = parser.parse_args()
+    main(args.vector_store_dir, args.project_id, k=args.k, margin=args.margin)
@@ -0,0 +1,37 @@
+import uuid
+from types import SimpleNamespace
+
+from langchain_core.embeddings import Embeddings
+
+from scout.Pipelines.cluster_criteria import cluster_criteria
+
+
+class TopicEmbeddings(Embeddings):
+    """Embeds texts about finance and about people in two tight, well separated groups"""
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        offset = len(text) % 7 / 100
+        return [1.0, offset, 0.0] if "budget" in text else [0.0, offset, 1.0]
+
+
+def test_similar_criteria_share_a_cluster():
+    questions = [
+        "Is the budget approved?",
+        "Has the budget been agreed?",
+        "Is there an approved budget?",
+        "Is the SRO in post?",
+        "Has an SRO been appointed?",
+        "Is the senior responsible owner named?",
+    ]
+    criteria = [SimpleNamespace(id=uuid.uuid4(), question=question, evidence="") for question in questions]
+
+    cluster_ids = cluster_criteria(criteria, TopicEmbeddings(), min_cluster_size=2)
+
+    finance = {cluster_ids[criterion.id] for criterion in criteria[:3]}
+    people = {cluster_ids[criterion.id] for criterion in criteria[3:]}
+    assert len(finance) == 1 and None not in finance
+    assert len(people) == 1 and None not in people
+    assert finance != people
@@ -0,0 +1,99 @@
+import io
+import json
+import threading
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from scout.LLMFlag.embeddings import QueryEmbeddingCache, embed_queries
+
+
+class RecordingEmbeddings(Embeddings):
+    """Embeds text by its length and vowel count, recording which texts were embedded and how"""
+
+    def __init__(self):
+        self.queries = []
+        self.documents = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def vector(text: str) -> list[float]:
+        return [float(len(text)), float(sum(text.count(vowel) for vowel in "aeiou"))]
+
+    def embed_query(self, text: str) -> list[float]:
+        with self._lock:
+            self.queries.append(text)
+        return self.vector(text)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.documents.extend(texts)
+        return [self.vector(text) for text in texts]
+
+
+def test_embed_queries_uses_query_input_type_and_keeps_order() -> None:
+    embedding_function = RecordingEmbeddings()
+    queries = ["Is there a business case?", "Approved OBC", "Is there a business case?", "Benefits register"]
+
+    embeddings = embed_queries(queries, embedding_function=embedding_function, batch_size=2)
+
+    assert list(embeddings) == ["Is there a business case?", "Approved OBC", "Benefits register"]
+    assert embeddings["Approved OBC"] == RecordingEmbeddings.vector("Approved OBC")
+    assert sorted(embedding_function.queries) == sorted(embeddings)
+    assert embedding_function.documents == []
+
+
+class CohereBedrockClient:
+    """Stands in for the Bedrock runtime client, embedding a batch of texts per call"""
+
+    def __init__(self):
+        self.bodies = []
+
+    def invoke_model(self, body, modelId, accept, contentType):
+        body = json.loads(body)
+        self.bodies.append(body)
+        embeddings = [RecordingEmbeddings.vector(text) for text in body["texts"]]
+        return {"body": io.BytesIO(json.dumps({"embeddings": embeddings}).encode())}
+
+
+class CohereBedrockEmbeddings(RecordingEmbeddings):
+    model_id = "cohere.embed-english-v3"
+
+    def __init__(self):
+        super().__init__()
+        self.client = CohereBedrockClient()
+
+
+def test_embed_queries_batches_cohere_calls_on_bedrock() -> None:
+    embedding_function = CohereBedrockEmbeddings()
+    queries = [f"Is requirement {i} met?" for i in range(150)]
+
+    embeddings = embed_queries(queries, embedding_function=embedding_function, batch_size=150)
+
+    # Two calls of at most 96 texts each, rather than one call per query
+    assert [len(body["texts"]) for body in embedding_function.client.bodies] == [96, 54]
+    assert {body["input_type"] for body in embedding_function.client.bodies} == {"search_query"}
+    assert embedding_function.queries == []
+    assert embeddings["Is requirement 7 met?"] == RecordingEmbeddings.vector("Is requirement 7 met?")
+
+
+def test_embed_queries_only_embeds_cache_misses(tmp_path) -> None:
+    cache = QueryEmbeddingCache(tmp_path / "embeddings.db")
+    embed_queries(["Approved OBC", "Benefits register"], embedding_function=RecordingEmbeddings(), cache=cache)
+
+    embedding_function = RecordingEmbeddings()
+    embeddings = embed_queries(
+        ["Funding letter", "Approved OBC", "Benefits register"], embedding_function=embedding_function, cache=cache
+    )
+
+    assert embedding_function.queries == ["Funding letter"]
+    assert list(embeddings) == ["Funding letter", "Approved OBC", "Benefits register"]
+    # Vectors round-trip through the cache as float32
+    assert embeddings["Benefits register"] == pytest.approx(RecordingEmbeddings.vector("Benefits register"))
+
+
+def test_query_embedding_cache_separates_models(tmp_path) -> None:
+    cache = QueryEmbeddingCache(tmp_path / "embeddings.db")
+    cache.set_many("model-a", {"Approved OBC": [1.0, 2.0]})
+
+    assert cache.get_many("model-a", ["Approved OBC", "Funding letter"]) == {"Approved OBC": [1.0, 2.0]}
+    assert cache.get_many("model-b", ["Approved OBC"]) == {}
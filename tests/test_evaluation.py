@@ -0,0 +1,317 @@
+import io
+import json
+import threading
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+from scout.DataIngest.models.schemas import (
+    CriterionCreate,
+    CriterionGate,
+    CriterionRating,
+    Project,
+    ProjectCreate,
+    ResultUpdate,
+)
+from scout.LLMFlag.cache import LocalCategorySummaries, summary_cache
+from scout.LLMFlag.embeddings import QueryEmbeddingCache
+from scout.LLMFlag.evaluation import (
+    QUESTION_SYSTEM_BLOCKS,
+    MainEvaluator,
+    compute_evidence_fingerprint,
+    group_criteria_into_batches,
+    max_rerank_score,
+    parse_batch_answers,
+    parse_criterion_answer,
+    split_rating,
+)
+from scout.LLMFlag.prompt_builder import count_tokens
+from scout.LLMFlag.prompts import REDUCE_SUMMARIES_PROMPT
+from scout.LLMFlag.reranker import get_rerank_model
+
+
+def test_parse_criterion_answer_accepts_fenced_json() -> None:
+    text = """Here is my answer:
+```json
+{"justification": "The SRO is in post.", "rating": "[Positive]", "hypotheses": ["a", "b", "c"]}
+```"""
+
+    answer = parse_criterion_answer(text)
+
+    assert answer is not None
+    assert answer.rating == CriterionRating.POSITIVE
+    assert answer.hypotheses == ["a", "b", "c"]
+
+
+def test_parse_criterion_answer_rejects_malformed_output() -> None:
+    assert parse_criterion_answer("The project is on track [Positive]") is None
+    assert parse_criterion_answer('{"justification": "x", "rating": "maybe", "hypotheses": ["a"]}') is None
+
+
+def test_max_rerank_score_ignores_unscored_extracts() -> None:
+    extracts = [
+        {"content": "a", "metadata": {"rerank_score": 0.002}},
+        {"content": "b", "metadata": {"rerank_score": 0.4}},
+        {"content": "c", "metadata": {}},
+    ]
+
+    assert max_rerank_score(extracts) == 0.4
+    assert max_rerank_score(extracts[2:]) is None
+
+
+def test_relevance_threshold_only_judges_full_reranker_scores(tmp_path) -> None:
+    evaluator = MainEvaluator(
+        project=ProjectCreate(name="relevance"),
+        vector_store=None,
+        llm=RecordingLLM(),
+        storage_handler=None,
+        query_embedding_cache=QueryEmbeddingCache(tmp_path / "embeddings.db"),
+        relevance_threshold=0.1,
+    )
+    full = [{"content": "a", "metadata": {"rerank_score": 0.002, "rerank_model": get_rerank_model("full")}}]
+    tiny = [{"content": "a", "metadata": {"rerank_score": 0.002, "rerank_model": get_rerank_model("tiny")}}]
+    unranked = [{"content": "a", "metadata": {"similarity_score": 0.002}}]
+
+    assert not evaluator.has_relevant_evidence(full)
+    # Other rerankers score on other scales, so their extracts are not judged by the threshold
+    assert evaluator.has_relevant_evidence(tiny)
+    assert evaluator.has_relevant_evidence(unranked)
+    assert not evaluator.has_relevant_evidence([])
+
+    evaluator.relevance_threshold = None
+    assert evaluator.has_relevant_evidence(full)
+
+
+def test_parse_batch_answers_keeps_valid_items() -> None:
+    text = """```json
+[
+    {"criterion": 1, "justification": "The SRO is in post.", "rating": "[Positive]"},
+    {"criterion": 2, "justification": "No plan", "rating": "maybe"},
+    {"criterion": 3, "justification": "Benefits are not tracked.", "rating": "Negative"}
+]
+```"""
+
+    answers = parse_batch_answers(text)
+
+    assert set(answers) == {1, 3}
+    assert answers[1].rating == CriterionRating.POSITIVE
+    assert answers[3].rating == CriterionRating.NEGATIVE
+    assert parse_batch_answers("I cannot answer these questions") == {}
+
+
+def test_group_criteria_into_batches_by_category() -> None:
+    criteria = [
+        CriterionCreate(gate=CriterionGate.GATE_0, category=category, question=f"Question {i}", evidence="")
+        for i, category in enumerate(["Finance", "People", "Finance", "Finance", "People"])
+    ]
+
+    assert group_criteria_into_batches(criteria, batch_size=2) == [[0, 2], [3], [1, 4]]
+
+
+def test_split_rating() -> None:
+    assert split_rating("The SRO is in post [Positive]") == ("Positive", "The SRO is in post")
+    assert split_rating("Unclear") == ("None", "Unclear")
+
+
+class RecordingLLM:
+    """Stands in for the Bedrock client, recording each request and reporting a cache hit"""
+
+    def __init__(self):
+        self.requests = []
+
+    def invoke_model(self, modelId, body):
+        self.requests.append((modelId, json.loads(body)))
+        response = {
+            "content": [{"text": "The SRO is in post [Positive]"}],
+            "usage": {"input_tokens": 50, "output_tokens": 10, "cache_read_input_tokens": 1200},
+        }
+        return {"body": io.BytesIO(json.dumps(response).encode())}
+
+
+def test_question_requests_cache_their_static_prefix(tmp_path) -> None:
+    llm = RecordingLLM()
+    evaluator = MainEvaluator(
+        project=ProjectCreate(name="prompt caching"),
+        vector_store=None,
+        llm=llm,
+        storage_handler=None,
+        query_embedding_cache=QueryEmbeddingCache(tmp_path / "embeddings.db"),
+        stage_model_ids={"question": "anthropic.claude-3-7-sonnet-20250219-v1:0"},
+    )
+    evaluator.hypotheses = "The project is well governed"
+
+    evaluator._answer("Is the SRO in post?")
+
+    model_id, body = llm.requests[-1]
+    assert model_id == "anthropic.claude-3-7-sonnet-20250219-v1:0"
+    # The static persona, examples and hypothesis instructions come first, ending in a cache breakpoint
+    assert [block["text"] for block in body["system"]] == QUESTION_SYSTEM_BLOCKS
+    assert body["system"][-1]["cache_control"] == {"type": "ephemeral"}
+    # The hypotheses change between calls, so they follow the cached prefix
+    assert "The project is well governed" in body["messages"][0]["content"]
+    assert evaluator.stage_stats["question"]["cache_read_tokens"] == 1200
+
+
+class SummaryLLM:
+    """Stands in for the Bedrock client, replying to every prompt with the same summary and recording the prompts"""
+
+    def __init__(self, reply: str = "The project is on track."):
+        self.reply = reply
+        self.prompts = []
+        self._lock = threading.Lock()
+
+    def invoke_model(self, modelId, body):
+        with self._lock:
+            self.prompts.append(json.loads(body)["messages"][0]["content"])
+        response = {"content": [{"text": self.reply}], "usage": {"input_tokens": 100, "output_tokens": 10}}
+        return {"body": io.BytesIO(json.dumps(response).encode())}
+
+
+def summary_evaluator(tmp_path, llm, summary_token_budget=12000, category_summaries=None) -> MainEvaluator:
+    summary_cache.clear()
+    return MainEvaluator(
+        project=ProjectCreate(name="summaries"),
+        vector_store=None,
+        llm=llm,
+        storage_handler=None,
+        query_embedding_cache=QueryEmbeddingCache(tmp_path / "embeddings.db"),
+        category_summaries=category_summaries or LocalCategorySummaries(),
+        summary_token_budget=summary_token_budget,
+        stage_model_ids={"summary": "anthropic.claude-3-haiku-20240307-v1:0"},
+    )
+
+
+def test_generate_summary_of_nothing_calls_no_llm(tmp_path) -> None:
+    llm = SummaryLLM()
+    evaluator = summary_evaluator(tmp_path, llm)
+
+    assert evaluator.generate_summary([]) == ""
+    assert llm.prompts == []
+
+
+def test_generate_summary_map_reduces_within_the_token_budget(tmp_path) -> None:
+    llm = SummaryLLM()
+    evaluator = summary_evaluator(tmp_path, llm, summary_token_budget=250)
+    qa_pairs = [
+        (f"Is milestone {idx} funded?", f"Yes, milestone {idx} has approved funding [Positive]") for idx in range(20)
+    ]
+
+    summary = evaluator.generate_summary(qa_pairs)
+
+    assert summary == "The project is on track."
+    assert all(count_tokens(prompt) <= 250 for prompt in llm.prompts)
+    # The answers are summarised in batches, whose summaries are then reduced into one
+    assert len(llm.prompts) > 2
+    assert llm.prompts[-1].startswith(REDUCE_SUMMARIES_PROMPT.split("{")[0])
+
+
+def test_generate_summary_trims_summaries_too_long_to_reduce_together(tmp_path) -> None:
+    llm = SummaryLLM(reply=" ".join(["milestone"] * 150))
+    evaluator = summary_evaluator(tmp_path, llm, summary_token_budget=250)
+    qa_pairs = [(f"Is milestone {idx} funded?", "Yes [Positive]", f"Category {idx}") for idx in range(4)]
+
+    summary = evaluator.generate_summary(qa_pairs)
+
+    assert summary == llm.reply
+    assert all(count_tokens(prompt) <= 250 for prompt in llm.prompts)
+
+
+def test_generate_summary_reuses_stored_category_summaries(tmp_path) -> None:
+    category_summaries = LocalCategorySummaries()
+    qa_pairs = [
+        ("Is there a business case?", "Yes [Positive]", "Strategic"),
+        ("Is the SRO in post?", "Yes [Positive]", "Governance"),
+    ]
+    summary_evaluator(tmp_path, SummaryLLM(), category_summaries=category_summaries).generate_summary(qa_pairs)
+
+    # A new process, after one governance answer has changed
+    llm = SummaryLLM()
+    evaluator = summary_evaluator(tmp_path, llm, category_summaries=category_summaries)
+    evaluator.generate_summary([qa_pairs[0], ("Is the SRO in post?", "No [Negative]", "Governance")])
+
+    # Only the changed category and the final reduction are summarised again
+    assert len(llm.prompts) == 2
+    assert '"Governance"' in llm.prompts[0]
+    assert llm.prompts[1].startswith(REDUCE_SUMMARIES_PROMPT.split("{")[0])
+
+
+def test_summaries_are_reused_only_by_the_same_summary_model(tmp_path) -> None:
+    llm = SummaryLLM()
+    evaluator = summary_evaluator(tmp_path, llm)
+
+    evaluator._summarise("Summarise the project")
+    evaluator._summarise("Summarise the project")
+    assert len(llm.prompts) == 1
+
+    # Routed to another model, the same prompt is summarised again
+    evaluator.stage_model_ids["summary"] = "anthropic.claude-3-7-sonnet-20250219-v1:0"
+    evaluator._summarise("Summarise the project")
+    assert len(llm.prompts) == 2
+
+
+class ResultStorageHandler:
+    """Records the results written and updated"""
+
+    def __init__(self):
+        self.written = []
+        self.updated = []
+
+    def write_item(self, item):
+        self.written.append(item)
+        return item
+
+    def update_item(self, item):
+        self.updated.append(item)
+        return item
+
+
+def reevaluation_evaluator(tmp_path, extracts: list) -> MainEvaluator:
+    """An evaluator whose retrieval returns `extracts` and whose model answers without calling an LLM"""
+    evaluator = MainEvaluator(
+        project=Project(id=uuid.uuid4(), name="reevaluation", created_datetime=datetime.now(), updated_datetime=None),
+        vector_store=None,
+        llm=SummaryLLM(),
+        storage_handler=ResultStorageHandler(),
+        query_embedding_cache=QueryEmbeddingCache(tmp_path / "embeddings.db"),
+    )
+    evaluator.retrieve_extracts = lambda query, k, filters: extracts
+    evaluator.answered = []
+
+    def model(criterion, k=3):
+        evaluator.answered.append(criterion.id)
+        return "Positive", "The SRO is in post", [], compute_evidence_fingerprint(extracts)
+
+    evaluator.model = model
+    return evaluator
+
+
+def test_reevaluate_question_skips_unchanged_evidence(tmp_path) -> None:
+    extracts = [{"content": "The SRO was appointed in May", "metadata": {"uuid": str(uuid.uuid4())}}]
+    evaluator = reevaluation_evaluator(tmp_path, extracts)
+    events = []
+    evaluator.event_callback = lambda stage, **details: events.append(stage)
+    criterion = SimpleNamespace(id=uuid.uuid4(), question="Is the SRO in post?", evidence="")
+    existing = SimpleNamespace(id=uuid.uuid4(), evidence_fingerprint=compute_evidence_fingerprint(extracts))
+
+    assert evaluator.reevaluate_question(criterion, existing) is None
+    assert evaluator.answered == []
+    assert evaluator.storage_handler.updated == []
+    assert events == ["unchanged"]
+
+
+def test_reevaluate_question_rewrites_result_when_evidence_changes(tmp_path) -> None:
+    chunk_id = str(uuid.uuid4())
+    before = [{"content": "The SRO post is vacant", "metadata": {"uuid": chunk_id}}]
+    after = [{"content": "The SRO was appointed in May", "metadata": {"uuid": chunk_id}}]
+    evaluator = reevaluation_evaluator(tmp_path, after)
+    criterion = SimpleNamespace(id=uuid.uuid4(), question="Is the SRO in post?", evidence="")
+    existing = SimpleNamespace(id=uuid.uuid4(), evidence_fingerprint=compute_evidence_fingerprint(before))
+
+    result = evaluator.reevaluate_question(criterion, existing)
+
+    assert evaluator.answered == [criterion.id]
+    assert isinstance(result, ResultUpdate) and result.id == existing.id
+    assert result.evidence_fingerprint == compute_evidence_fingerprint(after)
+    # The existing result is updated in place rather than a second result written
+    assert evaluator.storage_handler.updated == [result]
+    assert evaluator.storage_handler.written == []
@@ -0,0 +1,76 @@
+import uuid
+from datetime import timedelta
+
+from scout.DataIngest.models.schemas import EvaluationJobCreate, JobStatus, ProjectCreate
+from scout.utils.storage.postgres_database import SessionLocal
+from scout.utils.storage.postgres_interface_jobs import (
+    claim_evaluation_job,
+    create_evaluation_job,
+    finish_evaluation_job,
+    request_evaluation_job_cancellation,
+)
+from scout.utils.storage.postgres_models import EvaluationJob as SqEvaluationJob
+from scout.utils.storage.postgres_storage_handler import PostgresStorageHandler
+
+STALE_AFTER = timedelta(minutes=15)
+
+
+def create_project():
+    storage_handler = PostgresStorageHandler()
+    return storage_handler.write_item(ProjectCreate(name=f"job_test_project_{uuid.uuid4()}"))
+
+
+def claim_until(db, job_id, worker_id):
+    """Claim jobs until the given one is claimed, as other tests' jobs may still be queued"""
+    while (job := claim_evaluation_job(db, worker_id, STALE_AFTER)) is not None:
+        if job.id == job_id:
+            return job
+        finish_evaluation_job(db, job.id, JobStatus.CANCELLED)
+    return None
+
+
+def test_job_is_claimed_once():
+    project = create_project()
+    with SessionLocal() as db:
+        job = create_evaluation_job(db, EvaluationJobCreate(project_id=project.id, parameters={"incremental": False}))
+        assert job.status == JobStatus.QUEUED
+
+        claimed = claim_until(db, job.id, "worker-1")
+        assert claimed is not None
+        assert claimed.status == JobStatus.RUNNING
+        assert claimed.worker_id == "worker-1"
+        assert claimed.attempts == 1
+
+        # A running job with a recent heartbeat is not claimed by another worker
+        assert claim_until(db, job.id, "worker-2") is None
+
+
+def test_stale_job_is_reclaimed():
+    project = create_project()
+    with SessionLocal() as db:
+        job = create_evaluation_job(db, EvaluationJobCreate(project_id=project.id))
+        claim_until(db, job.id, "worker-1")
+
+        # Simulate the first worker dying
+        sq_job = db.get(SqEvaluationJob, job.id)
+        sq_job.heartbeat_datetime = sq_job.heartbeat_datetime - STALE_AFTER * 2
+        db.commit()
+
+        reclaimed = claim_until(db, job.id, "worker-2")
+        assert reclaimed is not None
+        assert reclaimed.worker_id == "worker-2"
+        assert reclaimed.attempts == 2
+
+
+def test_cancellation():
+    project = create_project()
+    with SessionLocal() as db:
+        queued_job = create_evaluation_job(db, EvaluationJobCreate(project_id=project.id))
+        assert request_evaluation_job_cancellation(db, queued_job.id).status == JobStatus.CANCELLED
+
+        running_job = create_evaluation_job(db, EvaluationJobCreate(project_id=project.id))
+        claim_until(db, running_job.id, "worker-1")
+
+        cancelled = request_evaluation_job_cancellation(db, running_job.id)
+        assert cancelled.status == JobStatus.RUNNING
+        assert cancelled.cancel_requested
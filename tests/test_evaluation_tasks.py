@@ -0,0 +1,230 @@
+import hashlib
+import io
+import json
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from scout.DataIngest.models.schemas import (
+    CriterionCreate,
+    CriterionGate,
+    EvaluationJobCreate,
+    JobStatus,
+    Project,
+    ProjectCreate,
+    ResultCreate,
+    ResultFilter,
+)
+from scout.LLMFlag.evaluation import MainEvaluator
+from scout.Pipelines.evaluation_worker import EvaluationWorker, TaskHeartbeat
+from scout.utils.storage.postgres_database import SessionLocal
+from scout.utils.storage.postgres_interface_jobs import (
+    acquire_rate_budget,
+    claim_evaluation_task,
+    create_evaluation_job,
+    finish_evaluation_job,
+    get_evaluation_events,
+    get_evaluation_job,
+    split_evaluation_job,
+)
+from scout.utils.storage.postgres_models import EvaluationJob as SqEvaluationJob
+from scout.utils.storage.postgres_models import EvaluationTask as SqEvaluationTask
+from scout.utils.storage.postgres_models import JobStatus as SqJobStatus
+from scout.utils.storage.postgres_storage_handler import PostgresStorageHandler
+
+
+class StubLLM:
+    """Stands in for the Bedrock client, answering every prompt positively"""
+
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def invoke_model(self, modelId, body):
+        with self._lock:
+            self.calls += 1
+        prompt = json.loads(body)["messages"][-1]["content"]
+        # Results are deduplicated on their text, so make each answer unique to its prompt
+        text = f"Answer {hashlib.sha256(prompt.encode()).hexdigest()[:12]} [Positive]"
+        return {"body": io.BytesIO(json.dumps({"content": [{"text": text}]}).encode())}
+
+
+class StubEvaluator(MainEvaluator):
+    def retrieve_extracts(self, query: str, k: int, filters: dict):
+        return []
+
+
+def test_tasks_are_shared_between_workers():
+    storage_handler = PostgresStorageHandler()
+    project = storage_handler.write_item(ProjectCreate(name=f"task_test_project_{uuid.uuid4()}"))
+    criteria = [
+        storage_handler.write_item(
+            CriterionCreate(
+                gate=CriterionGate.GATE_0,
+                category=f"Category {i % 2}",
+                question=f"Is requirement {i} of {project.id} met?",
+                evidence="First evidence point_Second evidence point",
+            )
+        )
+        for i in range(6)
+    ]
+
+    with SessionLocal() as db:
+        job = create_evaluation_job(db, EvaluationJobCreate(project_id=project.id))
+        db.get(SqEvaluationJob, job.id).status = SqJobStatus.RUNNING
+        db.commit()
+        split_evaluation_job(db, job.id, [criterion.id for criterion in criteria])
+
+    llm = StubLLM()
+
+    def evaluator_factory(project: Project, storage_handler: PostgresStorageHandler, parameters: dict):
+        return StubEvaluator(project=project, vector_store=None, llm=llm, storage_handler=storage_handler)
+
+    workers = [
+        threading.Thread(
+            target=EvaluationWorker(worker_id=f"test-worker-{i}", evaluator_factory=evaluator_factory).run,
+            kwargs={"once": True},
+        )
+        for i in range(2)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    with SessionLocal() as db:
+        finished_job = get_evaluation_job(db, job.id)
+    assert finished_job.status == JobStatus.COMPLETED
+    assert finished_job.processed_criteria == len(criteria)
+    # LLM usage is recorded per stage on the job. The stub retrieves no extracts, so every evidence point
+    # is answered "no evidence" without calling the LLM
+    assert finished_job.stage_stats["evidence"]["skipped_calls"] == 2 * len(criteria)
+    assert "calls" not in finished_job.stage_stats["evidence"]
+    assert {"question", "summary"} <= set(finished_job.stage_stats)
+
+    for criterion in criteria:
+        results = storage_handler.get_item_by_attribute(ResultFilter(project=project.id, criterion=criterion.id))
+        assert len(results) == 1
+        assert results[0].answer == "Positive"
+
+    # The summary task ran once every criterion was done
+    assert storage_handler.read_item(project.id, Project).results_summary
+    assert llm.calls > len(criteria)
+
+    # Each criterion reported its progress in order, ending with the ID of its saved result
+    with SessionLocal() as db:
+        events = get_evaluation_events(db, job.id)
+    for criterion in criteria:
+        criterion_events = [event for event in events if event.criterion_id == criterion.id]
+        assert [event.stage for event in criterion_events] == [
+            "started",
+            "no_evidence",
+            "no_evidence",
+            "retrieval_done",
+            "llm_done",
+            "saved",
+        ]
+        assert criterion_events[-1].result_id is not None
+    assert events[-1].stage == "summary_done"
+
+
+def test_rate_budget():
+    name = f"test-budget-{uuid.uuid4()}"
+    with SessionLocal() as db:
+        assert acquire_rate_budget(db, name, capacity=2, refill_per_second=0.01) == 0
+        assert acquire_rate_budget(db, name, capacity=2, refill_per_second=0.01) == 0
+        # The bucket is empty, so the next request must wait for it to refill
+        assert acquire_rate_budget(db, name, capacity=2, refill_per_second=0.01) > 0
+
+
+def test_running_task_keeps_its_heartbeat():
+    storage_handler = PostgresStorageHandler()
+    project = storage_handler.write_item(ProjectCreate(name=f"task_test_project_{uuid.uuid4()}"))
+    criterion = storage_handler.write_item(
+        CriterionCreate(
+            gate=CriterionGate.GATE_0, category="Heartbeat", question=f"Is {project.id} on track?", evidence=""
+        )
+    )
+    stale_after = timedelta(minutes=15)
+    with SessionLocal() as db:
+        job = create_evaluation_job(db, EvaluationJobCreate(project_id=project.id))
+        db.get(SqEvaluationJob, job.id).status = SqJobStatus.RUNNING
+        db.commit()
+        split_evaluation_job(db, job.id, [criterion.id])
+        # Claim tasks until this job's is claimed, as other tests' tasks may still be queued
+        while (task := claim_evaluation_task(db, "worker-1", stale_after)) is not None and task.job_id != job.id:
+            finish_evaluation_job(db, task.job_id, JobStatus.CANCELLED)
+        assert task is not None
+        # The task has run for longer than the stale period, e.g. while waiting on the rate budget
+        sq_task = db.get(SqEvaluationTask, task.id)
+        sq_task.heartbeat_datetime = sq_task.heartbeat_datetime - stale_after * 2
+        db.commit()
+
+    with TaskHeartbeat(task.id, "worker-1", interval=0.05):
+        time.sleep(0.3)
+
+    with SessionLocal() as db:
+        # The heartbeat was refreshed, so no other worker reclaims the task
+        reclaimed = claim_evaluation_task(db, "worker-2", stale_after)
+        assert reclaimed is None or reclaimed.id != task.id
+        assert db.get(SqEvaluationTask, task.id).worker_id == "worker-1"
+
+
+def test_requested_criterion_is_evaluated_again():
+    storage_handler = PostgresStorageHandler()
+    project = storage_handler.write_item(ProjectCreate(name=f"task_test_project_{uuid.uuid4()}"))
+    criterion = storage_handler.write_item(
+        CriterionCreate(
+            gate=CriterionGate.GATE_0, category="Rerun", question=f"Is {project.id} funded?", evidence="Funding letter"
+        )
+    )
+    existing_result = storage_handler.write_item(
+        ResultCreate(criterion=criterion.id, project=project.id, answer="Negative", full_text="Not yet funded")
+    )
+    stale_after = timedelta(minutes=15)
+    with SessionLocal() as db:
+        job = create_evaluation_job(
+            db, EvaluationJobCreate(project_id=project.id, parameters={"criterion_id": str(criterion.id)})
+        )
+        db.get(SqEvaluationJob, job.id).status = SqJobStatus.RUNNING
+        db.commit()
+        split_evaluation_job(db, job.id, [criterion.id])
+        # Claim tasks until this job's is claimed, as other tests' tasks may still be queued
+        while (task := claim_evaluation_task(db, "worker-1", stale_after)) is not None and task.job_id != job.id:
+            finish_evaluation_job(db, task.job_id, JobStatus.CANCELLED)
+        assert task is not None
+
+    llm = StubLLM()
+
+    def evaluator_factory(project: Project, storage_handler: PostgresStorageHandler, parameters: dict):
+        return StubEvaluator(project=project, vector_store=None, llm=llm, storage_handler=storage_handler)
+
+    result_id = EvaluationWorker(worker_id="worker-1", evaluator_factory=evaluator_factory).run_task(task)
+
+    # The existing result is rewritten in place rather than kept as it was
+    assert result_id == existing_result.id
+    assert llm.calls > 0
+    results = storage_handler.get_item_by_attribute(ResultFilter(project=project.id, criterion=criterion.id))
+    assert [(result.id, result.answer) for result in results] == [(existing_result.id, "Positive")]
+
+
+def test_worker_keeps_only_recent_evaluators():
+    def evaluator_factory(project: Project, storage_handler: PostgresStorageHandler, parameters: dict):
+        return StubEvaluator(project=project, vector_store=None, llm=StubLLM(), storage_handler=storage_handler)
+
+    worker = EvaluationWorker(
+        worker_id="worker-1", storage_handler=object(), evaluator_factory=evaluator_factory, max_evaluators=2
+    )
+    projects = [
+        Project(id=uuid.uuid4(), name=f"project {i}", created_datetime=datetime.now(), updated_datetime=None)
+        for i in range(3)
+    ]
+
+    first = worker.get_evaluator(projects[0], {})
+    worker.get_evaluator(projects[1], {})
+    assert worker.get_evaluator(projects[0], {}) is first
+    worker.get_evaluator(projects[2], {})
+
+    # The least recently used project's evaluator is dropped
+    assert [key[0] for key in worker.evaluators] == [projects[0].id, projects[2].id]
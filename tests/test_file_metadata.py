@@ -0,0 +1,69 @@
+import uuid
+
+from scout.DataIngest.models.schemas import FileCreate, FileMetadata, ProjectCreate
+from scout.LLMFlag.evaluation import MainEvaluator
+from scout.utils.storage.postgres_storage_handler import PostgresStorageHandler
+
+
+def test_read_file_metadata_reads_files_in_bulk_and_skips_missing() -> None:
+    storage_handler = PostgresStorageHandler()
+    project = storage_handler.write_item(ProjectCreate(name=f"file_metadata_test_{uuid.uuid4()}"))
+    files = [
+        storage_handler.write_item(
+            FileCreate(name=name, type=".pdf", project_id=project.id, clean_name=clean_name, source="IPA")
+        )
+        for name, clean_name in [("obc_v3.pdf", "Outline Business Case"), ("plan.pdf", None)]
+    ]
+    missing_id = uuid.uuid4()
+
+    metadata = storage_handler.read_file_metadata([files[0].id, files[1].id, files[0].id, missing_id])
+
+    assert set(metadata) == {files[0].id, files[1].id}
+    assert metadata[files[0].id].name == "obc_v3.pdf"
+    assert metadata[files[0].id].clean_name == "Outline Business Case"
+    assert metadata[files[0].id].source == "IPA"
+    assert storage_handler.read_file_metadata([]) == {}
+
+
+class StubLLM:
+    def invoke_model(self, modelId, body):
+        raise AssertionError("No LLM call expected")
+
+
+class CountingStorageHandler:
+    """Serves file metadata from a dict, recording each bulk read"""
+
+    def __init__(self, files: dict):
+        self.files = files
+        self.reads = []
+
+    def read_file_metadata(self, file_ids):
+        self.reads.append(sorted(file_ids))
+        return {file_id: self.files[file_id] for file_id in file_ids if file_id in self.files}
+
+
+def test_evaluator_caches_file_metadata_between_lookups(tmp_path) -> None:
+    known_id, other_id, missing_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    storage_handler = CountingStorageHandler(
+        {
+            known_id: FileMetadata(id=known_id, name="obc_v3.pdf"),
+            other_id: FileMetadata(id=other_id, name="plan.pdf"),
+        }
+    )
+    evaluator = MainEvaluator(
+        project=ProjectCreate(name="file metadata"),
+        vector_store=None,
+        llm=StubLLM(),
+        storage_handler=storage_handler,
+        query_embedding_cache=object(),
+    )
+
+    first = evaluator.get_file_metadata([known_id, missing_id])
+    second = evaluator.get_file_metadata([known_id, other_id])
+    third = evaluator.get_file_metadata([known_id, other_id, missing_id])
+
+    assert first[known_id].name == "obc_v3.pdf" and first[missing_id] is None
+    assert second[known_id].name == "obc_v3.pdf" and second[other_id].name == "plan.pdf"
+    assert third[missing_id] is None
+    # Each file is read once it is cached; a missing one is looked up again, as it may have been added since
+    assert storage_handler.reads == [sorted([known_id, missing_id]), [other_id], [missing_id]]
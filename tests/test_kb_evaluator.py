@@ -0,0 +1,79 @@
+import io
+import json
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+from scout.DataIngest.models.schemas import FileBase, FileCreate, FileMetadata, Project
+from scout.LLMFlag.cache import RetrievalCache
+from scout.LLMFlag.embeddings import QueryEmbeddingCache
+from scout.LLMFlag.evaluation import compute_evidence_fingerprint
+from scout.LLMFlag.kb_evaluator import KBMainEvaluator
+
+
+class CountingRetriever:
+    """Stands in for the Knowledge Base retriever, recording each query"""
+
+    def __init__(self):
+        self.queries = []
+
+    def get_relevant_documents(self, query):
+        self.queries.append(query)
+        uri = "s3://kb-bucket/reports/obc.pdf"
+        return [
+            SimpleNamespace(
+                page_content="The SRO was appointed in May",
+                metadata={"source_metadata": {"x-amz-bedrock-kb-source-uri": uri}, "source": uri, "score": 0.8},
+            )
+        ]
+
+
+class KBStorageHandler:
+    """Registers files and chunks in memory"""
+
+    def __init__(self):
+        self.files = {}
+        self.chunks = 0
+
+    def write_item(self, item):
+        if isinstance(item, FileCreate):
+            file = FileBase(
+                id=uuid.uuid4(), created_datetime=datetime.now(), updated_datetime=None, type=item.type, name=item.name
+            )
+            self.files[file.id] = file
+            return file
+        self.chunks += 1
+        return SimpleNamespace(id=uuid.uuid4())
+
+    def read_file_metadata(self, file_ids):
+        return {file_id: FileMetadata(id=file_id, name=self.files[file_id].name) for file_id in file_ids}
+
+
+class StubLLM:
+    def invoke_model(self, modelId, body):
+        response = {"content": [{"text": "The SRO is in post [Positive]"}]}
+        return {"body": io.BytesIO(json.dumps(response).encode())}
+
+
+def test_kb_evaluator_answers_from_the_retrieval_it_fingerprinted(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("BUCKET_NAME", "scout-bucket")
+    project = Project(id=uuid.uuid4(), name="kb project", created_datetime=datetime.now(), updated_datetime=None)
+    retriever = CountingRetriever()
+    storage_handler = KBStorageHandler()
+    evaluator = KBMainEvaluator(
+        retriever=retriever,
+        chat_llm=StubLLM(),
+        project=project,
+        storage_handler=storage_handler,
+        retrieval_cache=RetrievalCache(),
+        query_embedding_cache=QueryEmbeddingCache(tmp_path / "embeddings.db"),
+    )
+
+    fingerprint = evaluator.evidence_fingerprint("Is the SRO in post?")
+    prompt, extracts = evaluator.semantic_search("Is the SRO in post?", k=3, filters={"project": str(project.id)})
+
+    # The Knowledge Base is queried, and its documents registered, once
+    assert retriever.queries == ["Is the SRO in post?"]
+    assert len(storage_handler.files) == 1 and storage_handler.chunks == 1
+    assert compute_evidence_fingerprint(extracts) == fingerprint
+    assert "obc.pdf" in prompt and "The SRO was appointed in May" in prompt
@@ -0,0 +1,72 @@
+from scout.utils.llm_formats import (
+    add_stage_costs,
+    format_messages_body,
+    get_stage_model_id,
+    merge_stage_stats,
+    parse_llm_response,
+)
+
+MESSAGES = [
+    {"role": "system", "content": "You extract file information."},
+    {"role": "user", "content": "Some text"},
+]
+
+
+def test_stage_model_falls_back_to_default(monkeypatch):
+    monkeypatch.setenv("AWS_BEDROCK_MODEL_ID", "anthropic.claude-3-sonnet-20240229-v1:0")
+    monkeypatch.setenv("SCOUT_EVIDENCE_MODEL_ID", "anthropic.claude-3-haiku-20240307-v1:0")
+    monkeypatch.delenv("SCOUT_QUESTION_MODEL_ID", raising=False)
+    assert get_stage_model_id("evidence") == "anthropic.claude-3-haiku-20240307-v1:0"
+    assert get_stage_model_id("question") == "anthropic.claude-3-sonnet-20240229-v1:0"
+
+
+def test_claude_body_takes_system_prompt():
+    body = format_messages_body("anthropic.claude-3-haiku-20240307-v1:0", MESSAGES)
+    assert body["system"] == "You extract file information."
+    assert body["messages"] == [{"role": "user", "content": "Some text"}]
+
+
+def test_system_blocks_are_cached_where_supported():
+    body = format_messages_body("anthropic.claude-3-7-sonnet-20250219-v1:0", MESSAGES, system_blocks=["Persona"])
+    assert body["system"] == [
+        {"type": "text", "text": "Persona", "cache_control": {"type": "ephemeral"}},
+        {"type": "text", "text": "You extract file information."},
+    ]
+
+    # Older models take the same blocks without a cache breakpoint
+    body = format_messages_body("anthropic.claude-3-sonnet-20240229-v1:0", MESSAGES, system_blocks=["Persona"])
+    assert "cache_control" not in body["system"][0]
+
+
+def test_llama_body_and_response():
+    body = format_messages_body("meta.llama3-70b-instruct-v1:0", MESSAGES)
+    assert body["prompt"] == "You extract file information.\n\nSome text"
+
+    response = parse_llm_response(
+        "meta.llama3-70b-instruct-v1:0",
+        {"generation": "Hello", "prompt_token_count": 12, "generation_token_count": 3},
+    )
+    assert (response.text, response.input_tokens, response.output_tokens) == ("Hello", 12, 3)
+
+
+def test_stage_stats_are_merged_and_priced():
+    call = {
+        "evidence": {
+            "model_id": "small",
+            "calls": 1,
+            "latency_seconds": 0.5,
+            "input_tokens": 1000,
+            "output_tokens": 100,
+        }
+    }
+    stats = merge_stage_stats(merge_stage_stats({}, call), call)
+    assert stats["evidence"]["calls"] == 2
+    assert stats["evidence"]["input_tokens"] == 2000
+
+    priced = add_stage_costs(stats, {"small": (0.25, 1.25)})
+    assert priced["evidence"]["cost"] == 0.75
+
+
+def test_cached_tokens_are_priced_separately():
+    stats = {"question": {"model_id": "large", "input_tokens": 1000, "cache_read_tokens": 10000, "output_tokens": 0}}
+    assert add_stage_costs(stats, {"large": (3.0, 15.0)})["question"]["cost"] == 6.0
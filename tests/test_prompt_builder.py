@@ -0,0 +1,49 @@
+from uuid import uuid4
+
+from langchain_core.documents import Document
+
+from scout.DataIngest.models.schemas import FileMetadata
+from scout.LLMFlag.prompt_builder import PromptBuilder, count_tokens, deduplicate_extracts, render_extracts
+from scout.LLMFlag.prompts import USER_EVIDENCE_POINTS_PROMPT
+
+
+def test_render_extracts_deduplicates_by_chunk_id() -> None:
+    file = FileMetadata(id=uuid4(), name="obc.pdf", clean_name="Outline Business Case", summary="The OBC.")
+    chunk_id = str(uuid4())
+    extracts = [
+        Document(page_content="The SRO is in post.", metadata={"uuid": chunk_id, "parent_doc_uuid": str(file.id)}),
+        Document(page_content="The SRO is in post.", metadata={"uuid": chunk_id, "parent_doc_uuid": str(file.id)}),
+        Document(page_content="Funding is agreed.", metadata={"uuid": str(uuid4()), "parent_doc_uuid": str(file.id)}),
+    ]
+
+    assert len(deduplicate_extracts(extracts)) == 2
+    blocks = render_extracts(extracts, {file.id: file})
+    assert len(blocks) == 2
+    assert "The OBC." in blocks[0]
+    assert "The OBC." not in blocks[1]
+
+
+def test_deduplicate_extracts_keeps_knowledge_base_passages_sharing_a_chunk() -> None:
+    file_id, chunk_id = uuid4(), uuid4()
+    metadata = {"uuid": chunk_id, "parent_doc_uuid": file_id, "source": "s3://kb-bucket/reports/obc.pdf"}
+    extracts = [
+        {"content": "The SRO was appointed in May.", "metadata": metadata},
+        {"content": "Funding is agreed to Gate 3.", "metadata": metadata},
+        {"content": "The SRO was appointed in May.", "metadata": metadata},
+    ]
+
+    assert [extract["content"] for extract in deduplicate_extracts(extracts)] == [
+        "The SRO was appointed in May.",
+        "Funding is agreed to Gate 3.",
+    ]
+
+
+def test_prompt_builder_fits_token_budget() -> None:
+    blocks = [f"\n[{i}] extract\n" + "word " * 200 for i in range(10)]
+    builder = PromptBuilder(token_budget=500)
+
+    prompt = builder.build(USER_EVIDENCE_POINTS_PROMPT, blocks, question="Is the SRO in post?")
+
+    assert count_tokens(prompt) <= 500
+    assert "[0] extract" in prompt
+    assert "[9] extract" not in prompt
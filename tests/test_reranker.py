@@ -0,0 +1,44 @@
+import pytest
+
+from scout.LLMFlag.reranker import (
+    choose_rerank_model,
+    estimate_rerank_seconds,
+    get_ranker,
+    get_rerank_model,
+    rerank,
+    rerank_many,
+)
+
+PASSAGES = [
+    {"id": 0, "text": "The senior responsible owner was appointed in March and is in post full time."},
+    {"id": 1, "text": "The cost plan follows HM Treasury guidance and has been approved."},
+    {"id": 2, "text": "Benefits will be tracked quarterly by the programme board."},
+]
+
+
+def test_ranker_is_shared():
+    assert get_ranker() is get_ranker()
+
+
+def test_rerank_many_matches_rerank():
+    queries = ["Is the SRO in post?", "Is the budget approved?"]
+
+    batched = rerank_many([(query, PASSAGES) for query in queries], batch_size=4)
+
+    for query, results in zip(queries, batched):
+        single = rerank(query, [dict(passage) for passage in PASSAGES])
+        assert [result["id"] for result in results] == [result["id"] for result in single]
+        assert [result["score"] for result in results] == pytest.approx(
+            [float(result["score"]) for result in single], rel=1e-4
+        )
+    assert batched[0][0]["id"] == 0
+    assert batched[1][0]["id"] == 1
+
+
+def test_choose_rerank_model_fits_budget():
+    assert choose_rerank_model(30) == get_rerank_model("full")
+    # Generous budgets keep the full model, tight ones fall back to the tiny model and then to none
+    assert choose_rerank_model(30, latency_budget=60) == get_rerank_model("full")
+    tiny_seconds = estimate_rerank_seconds(get_rerank_model("tiny"), 30)
+    assert choose_rerank_model(30, latency_budget=tiny_seconds) == get_rerank_model("tiny")
+    assert choose_rerank_model(30, latency_budget=0) is None
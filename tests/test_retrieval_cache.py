@@ -0,0 +1,151 @@
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+from langchain_core.embeddings import Embeddings
+
+from scout.DataIngest.models.schemas import Project
+from scout.LLMFlag import evaluation
+from scout.LLMFlag.cache import LocalChunkSetVersions, RetrievalCache
+from scout.LLMFlag.embeddings import QueryEmbeddingCache
+from scout.LLMFlag.evaluation import MainEvaluator, collect_criteria_queries
+
+
+def test_retrieval_cache_normalises_query_and_invalidates_project() -> None:
+    cache = RetrievalCache()
+    filters = {"project": "p1"}
+    cache.set("p1", "Is the SRO  in place?", 3, filters, ["extract"])
+
+    assert cache.get("p1", "is the sro in place?", 3, filters) == ["extract"]
+    assert cache.get("p1", "is the sro in place?", 5, filters) is None
+    assert cache.get("p2", "is the sro in place?", 3, filters) is None
+
+    cache.invalidate_project("p1")
+    assert cache.get("p1", "is the sro in place?", 3, filters) is None
+
+
+def test_retrieval_cache_keys_on_retriever_settings() -> None:
+    cache = RetrievalCache()
+    cache.set("p1", "Is the SRO in place?", 3, None, ["similarity extract"], settings={"search_type": "similarity"})
+
+    assert cache.get("p1", "Is the SRO in place?", 3, None, settings={"search_type": "hybrid"}) is None
+    assert cache.get("p1", "Is the SRO in place?", 3, None, settings={"search_type": "similarity"}) == [
+        "similarity extract"
+    ]
+
+
+def test_retrieval_cache_sees_invalidation_from_another_process() -> None:
+    # Two processes' caches reading the same persisted versions
+    versions = LocalChunkSetVersions()
+    worker, api = RetrievalCache(versions=versions), RetrievalCache(versions=versions)
+    worker.set("p1", "Is the SRO in place?", 3, None, ["old extract"])
+
+    api.invalidate_project("p1")
+
+    assert worker.get("p1", "Is the SRO in place?", 3, None) is None
+
+
+def test_retrieval_started_before_invalidation_is_not_served() -> None:
+    cache = RetrievalCache()
+    version = cache.version("p1")
+    # The chunks change while the retrieval runs
+    cache.invalidate_project("p1")
+    cache.set("p1", "Is the SRO in place?", 3, None, ["stale extract"], version=version)
+
+    assert cache.get("p1", "Is the SRO in place?", 3, None) is None
+
+
+def test_collect_criteria_queries_deduplicates_evidence() -> None:
+    criteria = [
+        SimpleNamespace(question="Is there a business case?", evidence="Approved OBC_Benefits register"),
+        SimpleNamespace(question="Is the budget agreed?", evidence="approved obc_Funding letter"),
+    ]
+
+    queries = collect_criteria_queries(criteria)
+
+    assert queries == [
+        "Is there a business case?",
+        "Approved OBC",
+        "Benefits register",
+        "Is the budget agreed?",
+        "Funding letter",
+    ]
+
+
+class CountingVersions(LocalChunkSetVersions):
+    """Chunk-set versions that count how often they are read, as each Postgres read is a round trip"""
+
+    def __init__(self):
+        super().__init__()
+        self.reads = 0
+
+    def get(self, project_id):
+        self.reads += 1
+        return super().get(project_id)
+
+
+class LengthEmbeddings(Embeddings):
+    def embed_query(self, text: str) -> list[float]:
+        return [float(len(text)), 1.0]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self.embed_query(text) for text in texts]
+
+
+class RecordingRetriever:
+    """Stands in for ReRankRetriever, recording the query vector each search is given"""
+
+    query_vectors = []
+
+    def __init__(self, query_vector=None, **kwargs):
+        RecordingRetriever.query_vectors.append(query_vector)
+
+    def get_relevant_documents(self, query):
+        return [f"extract for {query}"]
+
+
+class StubLLM:
+    def invoke_model(self, modelId, body):
+        raise AssertionError("No LLM call expected")
+
+
+def cached_evaluator(tmp_path, monkeypatch, versions) -> MainEvaluator:
+    monkeypatch.setattr(evaluation, "ReRankRetriever", RecordingRetriever)
+    RecordingRetriever.query_vectors = []
+    return MainEvaluator(
+        project=Project(id=uuid.uuid4(), name="cached", created_datetime=datetime.now(), updated_datetime=None),
+        vector_store=SimpleNamespace(embeddings=LengthEmbeddings()),
+        llm=StubLLM(),
+        storage_handler=None,
+        retrieval_cache=RetrievalCache(versions=versions),
+        query_embedding_cache=QueryEmbeddingCache(tmp_path / "embeddings.db"),
+    )
+
+
+def test_evaluator_reads_chunk_set_version_once_per_run(tmp_path, monkeypatch) -> None:
+    versions = CountingVersions()
+    evaluator = cached_evaluator(tmp_path, monkeypatch, versions)
+    filters = {"project": str(evaluator.project.id)}
+
+    evaluator.start_run()
+    evaluator.retrieve("Is the SRO in place?", k=3, filters=filters)
+    evaluator.retrieve("Is the SRO in place?", k=3, filters=filters)
+    evaluator.retrieve("Is the budget agreed?", k=3, filters=filters)
+    assert versions.reads == 1
+    assert len(RecordingRetriever.query_vectors) == 2
+
+    # Another process changes the chunks; the next run sees the new version and searches again
+    versions.bump(evaluator.project.id)
+    evaluator.start_run()
+    evaluator.retrieve("Is the SRO in place?", k=3, filters=filters)
+    assert versions.reads == 2
+    assert len(RecordingRetriever.query_vectors) == 3
+
+
+def test_evaluator_finds_query_vectors_for_normalised_queries(tmp_path, monkeypatch) -> None:
+    evaluator = cached_evaluator(tmp_path, monkeypatch, LocalChunkSetVersions())
+    evaluator.prepare_query_embeddings(["Approved OBC"])
+
+    evaluator.retrieve("approved  obc", k=3, filters={"project": str(evaluator.project.id)})
+
+    assert RecordingRetriever.query_vectors == [LengthEmbeddings().embed_query("Approved OBC")]
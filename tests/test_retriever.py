@@ -0,0 +1,111 @@
+import uuid
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import FakeEmbeddings
+from langchain_core.vectorstores import InMemoryVectorStore
+
+from scout.DataIngest.models.schemas import ChunkText
+from scout.LLMFlag.retriever import FUSION_SCORE, ReRankRetriever, merge_neighbours, reciprocal_rank_fusion
+
+
+def make_chunk(file_id: uuid.UUID, idx: int) -> ChunkText:
+    return ChunkText(id=uuid.uuid4(), file_id=file_id, idx=idx, page_num=1, text=f"chunk {idx}")
+
+
+def make_doc(file_id: uuid.UUID, idx: int) -> Document:
+    return Document(
+        page_content=f"chunk {idx}",
+        metadata={"uuid": str(uuid.uuid4()), "parent_doc_uuid": str(file_id), "idx": idx},
+    )
+
+
+def test_merge_neighbours_builds_contiguous_passages():
+    file_id, other_file_id = uuid.uuid4(), uuid.uuid4()
+    chunks = {(file_id, idx): make_chunk(file_id, idx) for idx in range(0, 10)}
+    chunks.update({(other_file_id, idx): make_chunk(other_file_id, idx) for idx in (4, 6)})
+    docs = [
+        make_doc(file_id, 5),
+        make_doc(other_file_id, 5),
+        # Its span touches the first document's, so the two become one passage
+        make_doc(file_id, 3),
+        Document(page_content="No position", metadata={}),
+    ]
+
+    passages = merge_neighbours(docs, chunks, window=1)
+
+    assert [passage.page_content for passage in passages] == [
+        "chunk 2\nchunk 3\nchunk 4\nchunk 5\nchunk 6",
+        "chunk 4\nchunk 5\nchunk 6",
+        "No position",
+    ]
+    # The merged passage keeps the best document's metadata
+    assert passages[0].metadata["uuid"] == docs[0].metadata["uuid"]
+    assert (passages[0].metadata["idx_start"], passages[0].metadata["idx_end"]) == (2, 6)
+    assert len(passages[0].metadata["chunk_uuids"]) == 5
+
+
+def test_merge_neighbours_stops_at_missing_chunks():
+    file_id = uuid.uuid4()
+    chunks = {(file_id, 6): make_chunk(file_id, 6)}
+
+    passages = merge_neighbours([make_doc(file_id, 5)], chunks, window=2)
+
+    assert passages[0].page_content == "chunk 5\nchunk 6"
+
+
+def test_merge_neighbours_joins_spans_a_document_bridges():
+    file_id = uuid.uuid4()
+    chunks = {(file_id, idx): make_chunk(file_id, idx) for idx in range(0, 10)}
+    # Spans 0-2 and 4-6, then a document at 3 that touches both
+    docs = [make_doc(file_id, 1), make_doc(file_id, 5), make_doc(file_id, 3)]
+
+    passages = merge_neighbours(docs, chunks, window=1)
+
+    assert [passage.page_content for passage in passages] == ["\n".join(f"chunk {idx}" for idx in range(0, 7))]
+    assert passages[0].metadata["uuid"] == docs[0].metadata["uuid"]
+    assert (passages[0].metadata["idx_start"], passages[0].metadata["idx_end"]) == (0, 6)
+    assert len(passages[0].metadata["chunk_uuids"]) == 7
+
+
+def test_reciprocal_rank_fusion_favours_documents_in_both_lists():
+    file_id = uuid.uuid4()
+    vector_docs = [make_doc(file_id, idx) for idx in range(4)]
+    # A text match the vector search missed entirely, and one on its last document
+    text_docs = [make_doc(file_id, 9), Document(page_content="chunk 3", metadata=dict(vector_docs[3].metadata))]
+
+    fused = reciprocal_rank_fusion([vector_docs, text_docs], limit=3)
+
+    assert [doc.metadata["idx"] for doc in fused] == [3, 0, 9]
+    # The first list's copy is kept
+    assert fused[0] is vector_docs[3]
+    assert fused[0].metadata[FUSION_SCORE] == 1 / 64 + 1 / 62
+
+
+class FakeSummaryIndex:
+    """Ranks a project's indexed files in a fixed order, leaving the rest unindexed"""
+
+    def __init__(self, indexed: list, unindexed: list):
+        self.embedding_function = FakeEmbeddings(size=4)
+        self.indexed = indexed
+        self.unindexed = unindexed
+
+    def top_files(self, embedding, project_id, k):
+        return [(file_id, 0.1 * rank) for rank, file_id in enumerate(self.indexed[:k])]
+
+    def unindexed_files(self, project_id):
+        return self.unindexed
+
+
+def test_narrow_to_files_still_searches_unindexed_files():
+    project_id = uuid.uuid4()
+    indexed, unindexed = [uuid.uuid4() for _ in range(3)], [uuid.uuid4()]
+    retriever = ReRankRetriever(
+        vectorstore=InMemoryVectorStore(FakeEmbeddings(size=4)),
+        summary_index=FakeSummaryIndex(indexed, unindexed),
+        file_k=2,
+    )
+
+    search_filter = retriever._narrow_to_files("Is there a business case?", {"project": str(project_id)})
+
+    assert search_filter["project"] == str(project_id)
+    assert search_filter["parent_doc_uuid"]["$in"] == [str(file_id) for file_id in indexed[:2] + unindexed]
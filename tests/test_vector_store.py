@@ -0,0 +1,170 @@
+import uuid
+
+import numpy as np
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from scout.DataIngest.models.schemas import ChunkCreate, FileCreate, ProjectCreate
+from scout.Pipelines.utils import embedding_fingerprint, fingerprint_matches, open_vector_store
+from scout.utils.storage.exact_vector_store import ExactIndex, fit_pca, supports_exact_filter
+from scout.utils.storage.pgvector_store import PgVectorStore
+from scout.utils.storage.postgres_models import EMBEDDING_DIMENSION
+from scout.utils.storage.postgres_storage_handler import PostgresStorageHandler
+from scout.utils.storage.project_vector_store import ProjectVectorStore
+from scout.utils.storage.summary_index import FileSummaryIndex
+
+
+class KeywordEmbeddings(Embeddings):
+    """Embeds text as a one-hot vector on the first keyword it contains"""
+
+    KEYWORDS = ["budget", "schedule", "risk"]
+
+    def embed_query(self, text: str) -> list[float]:
+        vector = [0.0] * EMBEDDING_DIMENSION
+        for i, keyword in enumerate(self.KEYWORDS):
+            if keyword in text.lower():
+                vector[i] = 1.0
+                break
+        else:
+            vector[-1] = 1.0
+        return vector
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self.embed_query(text) for text in texts]
+
+
+def test_fingerprint_matches():
+    fingerprint = embedding_fingerprint("amazon.titan-embed-text-v2:0", 1024)
+
+    assert fingerprint_matches({"hnsw:M": 16, **fingerprint}, fingerprint)
+    assert not fingerprint_matches(embedding_fingerprint("amazon.titan-embed-text-v2:0", 512), fingerprint)
+    assert not fingerprint_matches(embedding_fingerprint("cohere.embed-english-v3", 1024), fingerprint)
+    # Collections from before fingerprinting are rebuilt
+    assert not fingerprint_matches({"hnsw:M": 2048}, fingerprint)
+    assert not fingerprint_matches(None, fingerprint)
+
+
+def test_pgvector_store_searches_within_project():
+    storage_handler = PostgresStorageHandler()
+    vector_store = PgVectorStore(KeywordEmbeddings())
+    projects = [storage_handler.write_item(ProjectCreate(name=f"pgvector_test_{uuid.uuid4()}")) for _ in range(2)]
+    for project in projects:
+        file = storage_handler.write_item(FileCreate(name="plan.pdf", type=".pdf", project_id=project.id))
+        vector_store.add_chunks(
+            [
+                ChunkCreate(idx=i, text=f"{text} for {project.id}", page_num=1, file=file)
+                for i, text in enumerate(["The budget is approved", "The schedule has slipped", "Risks are logged"])
+            ]
+        )
+
+    results = vector_store.similarity_search_with_relevance_scores(
+        "Is the budget agreed?", k=2, filter={"project": str(projects[0].id)}
+    )
+
+    assert [doc.metadata["project"] for doc, _ in results] == [str(projects[0].id)] * 2
+    assert results[0][0].page_content.startswith("The budget is approved")
+    assert results[0][1] > results[1][1]
+    assert results[0][0].metadata["idx"] == 0
+
+
+def test_search_chunks_text_matches_exact_terms_within_project():
+    storage_handler = PostgresStorageHandler()
+    projects = [storage_handler.write_item(ProjectCreate(name=f"text_search_test_{uuid.uuid4()}")) for _ in range(2)]
+    for project in projects:
+        file = storage_handler.write_item(FileCreate(name="plan.pdf", type=".pdf", project_id=project.id))
+        for i, text in enumerate(["The SRO signed off the OBC", "Gate 2 review is booked", "Nothing of note"]):
+            storage_handler.write_item(ChunkCreate(idx=i, text=text, page_num=1, file=file))
+
+    matches = storage_handler.search_chunks_text("Has the SRO approved the OBC?", 5, project_id=projects[0].id)
+
+    assert [match.text for match in matches] == ["The SRO signed off the OBC"]
+    assert matches[0].project_id == projects[0].id and matches[0].rank > 0
+
+
+def test_file_summary_index_picks_files_within_project():
+    storage_handler = PostgresStorageHandler()
+    summary_index = FileSummaryIndex(KeywordEmbeddings())
+    projects = [storage_handler.write_item(ProjectCreate(name=f"summary_test_{uuid.uuid4()}")) for _ in range(2)]
+    files = {}
+    for project in projects:
+        files[project.id] = [
+            storage_handler.write_item(FileCreate(name=name, type=".pdf", project_id=project.id, summary=summary))
+            for name, summary in [("costs.pdf", "The budget breakdown"), ("plan.pdf", "The delivery schedule")]
+        ]
+        summary_index.add_files(files[project.id])
+
+    top_files = summary_index.top_files(KeywordEmbeddings().embed_query("schedule"), projects[0].id, k=1)
+
+    assert [file_id for file_id, _ in top_files] == [files[projects[0].id][1].id]
+
+
+def test_project_vector_store_routes_by_project(tmp_path):
+    embedding_function = KeywordEmbeddings()
+    project_a, project_b = str(uuid.uuid4()), str(uuid.uuid4())
+    # Chunks from before sharding, in one collection shared by every project
+    shared = open_vector_store(tmp_path, embedding_function, "test-model")
+    shared.add_texts(["The budget is approved"], metadatas=[{"project": project_a}], ids=[str(uuid.uuid4())])
+
+    vector_store = ProjectVectorStore(tmp_path, embedding_function, "test-model")
+    vector_store.add_texts(
+        ["The budget is overspent", "Risks are logged"],
+        metadatas=[{"project": project_b}, {"project": project_a}],
+    )
+
+    results = vector_store.similarity_search("Is the budget agreed?", k=2, filter={"project": project_a})
+    assert [doc.page_content for doc in results] == ["The budget is approved", "Risks are logged"]
+    stats = {stat["project"]: stat["chunks"] for stat in vector_store.collection_stats()}
+    assert stats == {project_a: 2, project_b: 1}
+
+    assert vector_store.drop_project(project_b)
+    assert [stat["project"] for stat in vector_store.collection_stats()] == [project_a]
+
+
+def test_exact_index_matches_brute_force(tmp_path):
+    rng = np.random.default_rng(0)
+    embeddings = rng.normal(size=(500, 16)).astype(np.float32)
+    metadatas = [{"parent_doc_uuid": f"file-{i % 3}"} for i in range(len(embeddings))]
+    index = ExactIndex.build(
+        tmp_path, [str(i) for i in range(len(embeddings))], embeddings, [f"text {i}" for i in range(500)], metadatas
+    )
+    queries = rng.normal(size=(4, 16)).astype(np.float32)
+
+    results = index.search(queries, k=5)
+
+    for query, hits in zip(queries, results):
+        distances = ((embeddings - query) ** 2).sum(axis=1)
+        assert [row for row, _ in hits] == list(np.argsort(distances)[:5])
+        assert [distance for _, distance in hits] == pytest.approx(sorted(distances)[:5], rel=1e-4)
+
+    filtered = index.search(queries[:1], k=5, where={"parent_doc_uuid": "file-1"})[0]
+    assert all(metadatas[row]["parent_doc_uuid"] == "file-1" for row, _ in filtered)
+    # Two-stage retrieval filters on several files at once
+    two_files = {"parent_doc_uuid": {"$in": ["file-0", "file-2"]}}
+    assert supports_exact_filter(two_files)
+    filtered = index.search(queries[:1], k=5, where=two_files)[0]
+    assert len(filtered) == 5 and all(metadatas[row]["parent_doc_uuid"] != "file-1" for row, _ in filtered)
+
+    # float16 storage halves the matrix and keeps the nearest neighbours
+    half = ExactIndex.build(tmp_path / "half", index.ids, embeddings, index.documents, metadatas, dtype="float16")
+    assert half.vectors.dtype == np.float16
+    assert half.search(queries[:1], k=1)[0][0][0] == results[0][0][0]
+
+
+def test_compressed_exact_index_rescores_at_full_precision(tmp_path):
+    rng = np.random.default_rng(1)
+    # Embeddings varying mostly along a few directions, as real ones do
+    embeddings = (rng.normal(size=(400, 8)) @ rng.normal(size=(8, 32))).astype(np.float32)
+    ids, documents, metadatas = [str(i) for i in range(400)], [""] * 400, [{}] * 400
+    queries = embeddings[:10] + rng.normal(scale=0.1, size=(10, 32)).astype(np.float32)
+    truth = ExactIndex.build(tmp_path / "full", ids, embeddings, documents, metadatas).search(queries, k=5)
+
+    index = ExactIndex.build(
+        tmp_path / "int8_pca", ids, embeddings, documents, metadatas, dtype="int8", projection=fit_pca(embeddings, 8)
+    )
+
+    assert index.vectors.dtype == np.int8 and index.vectors.shape == (400, 8)
+    assert index.nbytes < ExactIndex(tmp_path / "full").nbytes / 8
+    results = index.search(queries, k=5, rescore_factor=4)
+    assert [[row for row, _ in hits] for hits in results] == [[row for row, _ in hits] for hits in truth]
+    # Distances come from the full-precision vectors
+    assert results[0][0][1] == pytest.approx(truth[0][0][1], rel=1e-4)